@@ -1,3 +1,43 @@
+from array import array
+from collections import namedtuple
+from hashlib import sha1
+from amitayh.mano.objfile import ObjectFile
+
+# Assembled programs by source hash, see Assembler.translate()
+CACHE_SIZE = 256
+cache = {}
+
+# Diagnostic codes
+MALFORMED_LINE = 'malformed-line'
+UNKNOWN_COMMAND = 'unknown-command'
+MISSING_OPERAND = 'missing-operand'
+INVALID_NUMBER = 'invalid-number'
+DUPLICATE_LABEL = 'duplicate-label'
+UNDEFINED_LABEL = 'undefined-label'
+
+
+class Diagnostic(namedtuple('Diagnostic', 'line column code message')):
+    """
+    An error in a program, at a 1-based line and column
+    """
+    def __str__(self):
+        return '%d:%d: %s (%s)' % (self.line, self.column, self.message,
+                                   self.code)
+
+
+class AssemblerError(SyntaxError):
+    """
+    Raised with all the errors found in a program. The message, lineno and
+    offset are those of the first.
+    """
+    def __init__(self, diagnostics):
+        first = diagnostics[0]
+        super(AssemblerError, self).__init__(first.message)
+        self.lineno = first.line
+        self.offset = first.column
+        self.diagnostics = diagnostics
+
+
 class Assembler(object):
     # Memory reference
     mri = {
@@ -33,62 +73,220 @@ class Assembler(object):
         'SKI': 0xF200,
         'SKO': 0xF100,
         'ION': 0xF080,
-        'IOF': 0xF040
+        'IOF': 0xF040,
+        'SBK': 0xF020,
+        'LBK': 0xF010
     }
 
     def __init__(self, program):
         self.program = program
-        self.address_table = self.create_address_table()
 
-    def create_address_table(self):
-        table = {}
-        location = 0
-        for (label, command, operand, indirect) in self.lines():
-            if command == 'ORG':
-                location = hex_to_int(operand)
-                continue
+    @property
+    def address_table(self):
+        """
+        Address of every label. A copy, as the cached table is shared with
+        other assemblers of the same source.
+        """
+        return dict(self.translate()[2])
+
+    def load(self, memory):
+        program_start, segments = self.assemble()
+        for origin, words in segments:
+            memory.write_block(origin, words)
 
-            if label:
-                table[label] = location
+        return program_start
 
-            location += 1
+    def assemble(self):
+        """
+        Translate the program to (program_start, segments), where each
+        segment is an (origin, words) run of consecutive 16-bit words.
+        The segments are shared with other assemblers of the same source,
+        and must not be modified.
+        """
+        program_start, segments, address_table = self.translate()
 
-        return table
+        return program_start, segments
 
-    def load(self, memory):
+    def object_file(self):
+        """
+        The program as an ObjectFile (see amitayh.mano.objfile)
+        """
+        return ObjectFile.from_assembler(self)
+
+    def translate(self):
+        """
+        (program_start, segments, address_table) of the program, from the
+        cache if the same source was assembled before
+        """
+        key = sha1(self.program.encode('utf-8')).digest()
+        translated = cache.get(key)
+        if translated is None:
+            translated = self.single_pass()
+            if len(cache) >= CACHE_SIZE:
+                cache.clear()
+            cache[key] = translated
+
+        return translated
+
+    def check(self):
+        """
+        All the errors in the program as a list of Diagnostics (empty if
+        the program is valid), found in a single pass
+        """
+        try:
+            self.translate()
+        except AssemblerError as error:
+            return error.diagnostics
+
+        return []
+
+    def single_pass(self):
+        """
+        Assemble in one pass over the source. Forward references are left
+        as zero addresses and patched from a fixup table at the end.
+        Errors are collected (checking only where the program is already
+        taken apart) and raised together as an AssemblerError.
+        """
+        mri, rri, io = self.mri, self.rri, self.io
+        parse_line = self.parse_line
+        address_table = {}
+        fixups = []
+        errors = []
         location = 0
         program_start = None
-        for (label, command, operand, indirect) in self.lines():
-            if command == 'ORG':
-                location = hex_to_int(operand)
-                if program_start is None:
-                    program_start = location
+        segments = []
+        words = None
+        for number, line in enumerate(self.program.split('\n'), 1):
+            line = line.strip()
+            if line == '':
                 continue
+            if line == 'END':
+                break
+
+            try:
+                label, command, operand, indirect = parse_line(line)
+            except IndexError:
+                errors.append((number, None, MALFORMED_LINE,
+                               'Missing command'))
+                continue
+
+            try:
+                if command == 'ORG':
+                    location = hex_to_int(operand)
+                    if program_start is None:
+                        program_start = location
+                    words = None
+                    continue
+
+                if label:
+                    if label in address_table:
+                        errors.append((number, label, DUPLICATE_LABEL,
+                                       "Duplicate label: '%s'" % label))
+                    address_table[label] = location
+
+                reference = None
+                if command in mri:
+                    instruction = mri[command]
+                    if indirect:
+                        instruction |= (1 << 15)
+                    address = address_table.get(operand)
+                    if address is None:
+                        reference = operand or ''
+                    else:
+                        instruction |= address
 
-            elif command == 'HEX':
-                instruction = hex_to_int(operand)
+                elif command in rri:
+                    instruction = rri[command]
 
-            elif command == 'DEC':
-                instruction = int(operand)
+                elif command in io:
+                    instruction = io[command]
 
-            elif command in self.mri:
-                instruction = self.mri[command] | self.address_table[operand]
-                if indirect:
-                    instruction |= (1 << 15)
+                elif command == 'HEX':
+                    instruction = hex_to_int(operand)
 
-            elif command in self.rri:
-                instruction = self.rri[command]
+                elif command == 'DEC':
+                    instruction = int(operand)
 
-            elif command in self.io:
-                instruction = self.io[command]
+                else:
+                    errors.append((number, command, UNKNOWN_COMMAND,
+                                   "Unrecognized command: '%s'" % command))
+                    instruction = 0
 
-            else:
-                raise SyntaxError("Unrecognized command: '%s'" % command)
+            except TypeError:
+                errors.append((number, command, MISSING_OPERAND,
+                               "Missing operand: '%s'" % command))
+                if command == 'ORG':
+                    continue
+                instruction = 0
+            except ValueError:
+                errors.append((number, operand, INVALID_NUMBER,
+                               "Invalid number: '%s'" % operand))
+                if command == 'ORG':
+                    continue
+                instruction = 0
 
-            memory.write(location, instruction)
+            if words is None:
+                words = array('H')
+                segments.append((location, words))
+            words.append(instruction & 0xFFFF)
+            if reference is not None:
+                fixups.append((words, len(words) - 1, reference, number))
             location += 1
 
-        return program_start
+        for words, offset, label, number in fixups:
+            address = address_table.get(label)
+            if address is None:
+                if not label:
+                    errors.append((number, None, MISSING_OPERAND,
+                                   'Missing address'))
+                else:
+                    errors.append((number, label, UNDEFINED_LABEL,
+                                   "Undefined label: '%s'" % label))
+                continue
+            words[offset] = (words[offset] | address) & 0xFFFF
+
+        if errors:
+            raise AssemblerError(self.diagnostics(errors))
+
+        return program_start, segments, address_table
+
+    def line_table(self):
+        """
+        Source line number of every assembled address (of a valid program)
+        """
+        table = {}
+        location = 0
+        for number, line in enumerate(self.program.split('\n'), 1):
+            line = line.strip()
+            if line == '':
+                continue
+            if line == 'END':
+                break
+            label, command, operand, indirect = self.parse_line(line)
+            if command == 'ORG':
+                location = hex_to_int(operand)
+                continue
+            table[location] = number
+            location += 1
+
+        return table
+
+    def diagnostics(self, errors):
+        """
+        Diagnostics, in line order, of (line, token, code, message) errors.
+        The column is where the token is on the line (or its end).
+        """
+        lines = self.program.split('\n')
+        diagnostics = []
+        for number, token, code, message in sorted(
+                errors, key=lambda error: error[0]):
+            line = lines[number - 1]
+            column = line.find(token) if token else -1
+            if column == -1:
+                column = len(line.rstrip())
+            diagnostics.append(Diagnostic(number, column + 1, code, message))
+
+        return diagnostics
 
     def lines(self):
         for line in self.program.split('\n'):
@@ -0,0 +1,209 @@
+"""
+Lockstep emulation of many independent machines with NumPy (required).
+"""
+from collections import namedtuple
+import numpy
+from amitayh.mano.decoder import CYCLES, INTERRUPT_CYCLES
+
+
+BatchResult = namedtuple('BatchResult', 'ac e ram cycles halted')
+
+
+class BatchComputer(object):
+    """
+    N machines sharing a program but not state. RAM is an N x size array
+    and every register is a vector with one entry per machine. Each step
+    executes one instruction on every running machine, with the same
+    semantics as FastComputer; machines may diverge to different PCs.
+    """
+    def __init__(self, n, size=1024 * 4):
+        self.n = n
+        self.ram = numpy.zeros((n, size), dtype=numpy.uint16)
+        self.ar = numpy.zeros(n, dtype=numpy.uint16)
+        self.pc = numpy.zeros(n, dtype=numpy.uint16)
+        self.dr = numpy.zeros(n, dtype=numpy.uint16)
+        self.ac = numpy.zeros(n, dtype=numpy.uint16)
+        self.ir = numpy.zeros(n, dtype=numpy.uint16)
+        self.tr = numpy.zeros(n, dtype=numpy.uint16)
+        self.inpr = numpy.zeros(n, dtype=numpy.uint8)
+        self.outr = numpy.zeros(n, dtype=numpy.uint8)
+        self.e = numpy.zeros(n, dtype=numpy.uint8)
+        self.s = numpy.zeros(n, dtype=numpy.uint8)
+        self.r = numpy.zeros(n, dtype=numpy.uint8)
+        self.ien = numpy.zeros(n, dtype=numpy.uint8)
+        self.fgi = numpy.zeros(n, dtype=numpy.uint8)
+        self.fgo = numpy.zeros(n, dtype=numpy.uint8)
+        self.cycles = numpy.zeros(n, dtype=numpy.int64)
+
+    def load(self, assembler):
+        """
+        Load the assembled program to all machines, return program start
+        """
+        program_start, segments = assembler.assemble()
+        for origin, words in segments:
+            block = numpy.frombuffer(words, dtype=numpy.uint16)
+            self.ram[:, origin:origin + len(block)] = block
+
+        return program_start
+
+    def write(self, address, words):
+        """
+        Write a word per machine (or one word to all) at address
+        """
+        self.ram[:, address] = numpy.asarray(words) & 0xFFFF
+
+    def run(self, program_start, max_instructions=None):
+        self.pc[:] = program_start
+        self.s[:] = 1
+        executed = 0
+        while self.s.any():
+            if max_instructions is not None and executed >= max_instructions:
+                break
+            self.step()
+            executed += 1
+
+        return BatchResult(self.ac, self.e, self.ram, self.cycles,
+                           self.s == 0)
+
+    def step(self):
+        running = numpy.flatnonzero(self.s)
+        pending = self.r[running] == 1
+        if pending.any():
+            self.interrupt_cycle(running[pending])
+            running = running[~pending]
+
+        # Fetch
+        pc = self.pc[running]
+        ir = self.ram[running, pc]
+        pc = (pc + 1) & 0xFFF
+        self.ir[running] = ir
+        self.pc[running] = pc
+
+        # Decode
+        ar = ir & 0xFFF
+        opcode = (ir >> 12) & 7
+        indirect = (opcode != 7) & (ir >> 15 == 1)
+        if indirect.any():
+            ar[indirect] = self.ram[running[indirect], ar[indirect]] & 0xFFF
+        self.ar[running] = ar
+        self.cycles[running] += numpy.take(CYCLES, opcode)
+
+        # Execute
+        for d, execute in enumerate(self.mri):
+            selected = opcode == d
+            if selected.any():
+                execute(self, running[selected], ar[selected])
+
+        selected = opcode == 7
+        if selected.any():
+            rows = running[selected]
+            bits = ir[selected] & 0xFFF
+            io = ir[selected] >> 15 == 1
+            self.execute_rri(rows[~io], bits[~io])
+            self.execute_io(rows[io], bits[io])
+
+    def interrupt_cycle(self, rows):
+        self.ar[rows] = 0
+        self.tr[rows] = self.pc[rows]
+        self.ram[rows, 0] = self.tr[rows]
+        self.pc[rows] = 1
+        self.ien[rows] = 0
+        self.r[rows] = 0
+        self.cycles[rows] += INTERRUPT_CYCLES
+
+    def execute_and(self, rows, ar):
+        self.dr[rows] = self.ram[rows, ar]
+        self.ac[rows] &= self.dr[rows]
+
+    def execute_add(self, rows, ar):
+        self.dr[rows] = self.ram[rows, ar]
+        value = self.ac[rows].astype(numpy.uint32) + self.dr[rows]
+        self.ac[rows] = value & 0xFFFF
+        self.e[rows] = (value >> 16) & 1
+
+    def execute_lda(self, rows, ar):
+        self.dr[rows] = self.ram[rows, ar]
+        self.ac[rows] = self.dr[rows]
+
+    def execute_sta(self, rows, ar):
+        self.ram[rows, ar] = self.ac[rows]
+
+    def execute_bun(self, rows, ar):
+        self.pc[rows] = ar
+
+    def execute_bsa(self, rows, ar):
+        self.ram[rows, ar] = self.pc[rows]
+        ar = (ar + 1) & 0xFFF
+        self.ar[rows] = ar
+        self.pc[rows] = ar
+
+    def execute_isz(self, rows, ar):
+        dr = self.ram[rows, ar] + numpy.uint16(1)
+        self.dr[rows] = dr
+        self.ram[rows, ar] = dr
+        skip = rows[dr == 0]
+        self.pc[skip] = (self.pc[skip] + 1) & 0xFFF
+
+    def execute_rri(self, rows, bits):
+        self.ac[rows[bits == 0x800]] = 0
+        self.e[rows[bits == 0x400]] = 0
+
+        selected = rows[bits == 0x200]
+        self.ac[selected] = ~self.ac[selected]
+
+        selected = rows[bits == 0x100]
+        self.e[selected] ^= 1
+
+        selected = rows[bits == 0x080]
+        ac = self.ac[selected]
+        self.ac[selected] = (ac >> 1) | (self.e[selected].astype(
+            numpy.uint16) << 15)
+        self.e[selected] = ac & 1
+
+        selected = rows[bits == 0x040]
+        ac = self.ac[selected]
+        self.ac[selected] = (ac << 1) | self.e[selected]
+        self.e[selected] = ac >> 15
+
+        selected = rows[bits == 0x020]
+        self.ac[selected] += numpy.uint16(1)
+
+        skip = numpy.concatenate((
+            rows[(bits == 0x010) & (self.ac[rows] & 0x800 == 0)],
+            rows[(bits == 0x008) & (self.ac[rows] & 0x800 != 0)],
+            rows[(bits == 0x004) & (self.ac[rows] == 0)],
+            rows[(bits == 0x002) & (self.e[rows] == 0)]))
+        self.pc[skip] = (self.pc[skip] + 1) & 0xFFF
+
+        self.s[rows[bits == 0x001]] = 0
+
+    def execute_io(self, rows, bits):
+        selected = rows[bits == 0x800]
+        self.ac[selected] = (self.ac[selected] & 0xFF00) | self.inpr[selected]
+        self.fgi[selected] = 0
+
+        selected = rows[bits == 0x400]
+        self.outr[selected] = self.ac[selected] & 0xFF
+        self.fgo[selected] = 0
+
+        skip = numpy.concatenate((
+            rows[(bits == 0x200) & (self.fgi[rows] == 1)],
+            rows[(bits == 0x100) & (self.fgo[rows] == 1)]))
+        self.pc[skip] = (self.pc[skip] + 1) & 0xFFF
+
+        self.ien[rows[bits == 0x080]] = 1
+        self.ien[rows[bits == 0x040]] = 0
+
+        # Memory isn't banked: SBK selects nothing, LBK loads bank 0
+        self.ac[rows[bits == 0x010]] = 0
+
+    # Memory reference instructions, indexed by opcode
+    mri = (
+        execute_and,
+        execute_add,
+        execute_lda,
+        execute_sta,
+        execute_bun,
+        execute_bsa,
+        execute_isz
+    )
@@ -1,10 +1,39 @@
-from math import log
-from amitayh.mano.logger import Logger
+from collections import namedtuple
+from heapq import heappop, heappush
+from timeit import default_timer
+from amitayh.mano.decoder import DECODED
+from amitayh.mano.logger import MICRO_OPERATION, NullLogger
+from amitayh.mano.memory import Memory, memory_hash
+from amitayh.mano.snapshot import REGISTERS, Snapshot
+
+# Reasons for run() to stop
+HALTED = 'halted'
+CYCLE_LIMIT = 'cycle limit'
+INSTRUCTION_LIMIT = 'instruction limit'
+TIMEOUT = 'timeout'
+INFINITE_LOOP = 'infinite loop'
+
+NEVER = float('inf')
+
+# ION instruction word
+ION = 0xF080
+
+# Cycles run between checks of the cycle limit and the timeout
+CHUNK = 1024
+
+
+class RunResult(namedtuple('RunResult', 'reason cycles instructions')):
+    """
+    Why run() stopped, and how many cycles and instructions it executed
+    """
+    @property
+    def halted(self):
+        return self.reason == HALTED
 
 
 class Computer(object):
-    def __init__(self):
-        self.ram = Memory(1024 * 4)     # 4K RAM
+    def __init__(self, logger=None, memory=None):
+        self.ram = memory or Memory(1024 * 4)   # 4K RAM by default
         self.ar = Register(12)          # Address register
         self.pc = Register(12)          # Program counter
         self.dr = Register(16)          # Data register
@@ -20,19 +49,273 @@ class Computer(object):
         self.ien = Register(1)          # Interrupt enable
         self.fgi = Register(1)          # Input register available
         self.fgo = Register(1)          # Output register available
-        self.logger = Logger()          # Default simple logger
+        self.logger = logger or NullLogger()
+        self.cycles = 0                 # Clock cycles since power on
+        self.instructions = 0           # Instructions since power on
+        self.interrupts = 0             # Interrupt cycles since power on
+        self.input_device = None
+        self.output_device = None
+        self.events = []                # Heap of cycles devices are due
+        self.next_event = NEVER         # Cycle of the next boundary check
+        self.polling = None             # Flag an idle SKI / SKO loop waits on
+
+    @property
+    def logger(self):
+        return self._logger
+
+    @logger.setter
+    def logger(self, logger):
+        self._logger = logger
+        if logger.is_enabled_for(MICRO_OPERATION):
+            self.log = logger.log
+        else:
+            self.log = ignore
 
-    def run(self, program_start):
+    def run(self, program_start, max_cycles=None, max_instructions=None,
+            timeout=None):
+        """
+        Execute from program_start until the computer halts, a limit is
+        reached or an infinite loop is detected. Returns a RunResult.
+        """
         self.pc.word = program_start
         self.s.word = 1
-        while self.s.word == 1:
-            self.tick()
+        return self.resume(max_cycles, max_instructions, timeout)
+
+    def resume(self, max_cycles=None, max_instructions=None, timeout=None):
+        """
+        Continue execution from the current state, see run()
+        """
+        cycles = start_cycles = self.cycles
+        instructions = start_instructions = self.instructions
+        cycle_limit = NEVER if max_cycles is None else cycles + max_cycles
+        instruction_limit = NEVER
+        if max_instructions is not None:
+            instruction_limit = instructions + max_instructions
+        deadline = NEVER if timeout is None else default_timer() + timeout
+        boundaries = instructions + self.interrupts
+        tick = self.tick
+        s, sc, ir = self.s, self.sc, self.ir
+
+        reason = HALTED
+        while s.word == 1:
+            if cycles >= cycle_limit:
+                reason = CYCLE_LIMIT
+                break
+            if default_timer() >= deadline:
+                reason = TIMEOUT
+                break
+
+            # Run a chunk of cycles, checking only the cheap conditions
+            # at instruction boundaries
+            chunk = min(CHUNK, cycle_limit - cycles)
+            for ticks in range(1, chunk + 1):
+                tick()
+                if sc.word == 0:
+                    boundaries += 1
+                    if cycles + ticks >= self.next_event:
+                        self.service_events(cycles + ticks)
+                    instructions = boundaries - self.interrupts
+                    if (s.word == 0 or instructions >= instruction_limit or
+                            ir.word & 0xF000 == 0x4000 and
+                            self.is_infinite_loop()):
+                        break
+            cycles += ticks
+            instructions = boundaries - self.interrupts
+
+            if instructions >= instruction_limit:
+                reason = INSTRUCTION_LIMIT
+                break
+            if sc.word == 0 and self.is_infinite_loop():
+                reason = INFINITE_LOOP
+                break
+
+        self.cycles = cycles
+        self.instructions = instructions
+        self.flush_devices()
+
+        return RunResult(reason, cycles - start_cycles,
+                         instructions - start_instructions)
+
+    def attach(self, input_device=None, output_device=None):
+        """
+        Connect character devices (see amitayh.mano.devices). An output
+        device starts out ready for a character (FGO = 1).
+        """
+        if input_device is not None:
+            self.input_device = input_device
+            input_device.ready_at = None
+        if output_device is not None:
+            self.output_device = output_device
+            output_device.ready_at = None
+            self.fgo.word = 1
+        self.next_event = 0
+
+    def schedule(self, cycle):
+        """
+        Check devices and interrupts at the first instruction boundary at
+        or after cycle
+        """
+        heappush(self.events, cycle)
+        self.next_event = min(self.next_event, cycle)
+
+    def service_events(self, cycles):
+        """
+        Called at an instruction boundary once an event is due (or INP,
+        OUT or ION asked for it by setting next_event to 0). Services the
+        devices and raises R if IEN and (FGI or FGO). R isn't raised at the
+        end of ION itself, so the instruction after it (typically the
+        return from an interrupt handler) always runs.
+
+        Returns whether the machine is idle in a polling loop (see
+        FastComputer.skip_polling()).
+        """
+        events = self.events
+        while events and events[0] <= cycles:
+            heappop(events)
+        self.service_devices(cycles)
+        next_event = events[0] if events else NEVER
+
+        if self.ien.word and (self.fgi.word or self.fgo.word):
+            if self.ir.word == ION and self.r.word == 0:
+                next_event = 0
+            else:
+                self.r.word = 1
+
+        self.next_event = next_event
+        polling, self.polling = self.polling, None
+
+        return polling is not None and polling.word == 0 and \
+            self.r.word == 0
+
+    def service_devices(self, cycles):
+        """
+        Move characters between the devices and INPR / OUTR, and schedule
+        the cycle a busy device is ready
+        """
+        device = self.input_device
+        if device is not None and self.fgi.word == 0:
+            if device.ready_at is None:
+                device.schedule(cycles)
+                if device.ready_at != NEVER:
+                    heappush(self.events, device.ready_at)
+            if device.ready_at <= cycles:
+                self.inpr.word = device.read()
+                self.fgi.word = 1
+
+        device = self.output_device
+        if device is not None and self.fgo.word == 0:
+            if device.ready_at is None:
+                device.schedule(cycles)
+                heappush(self.events, device.ready_at)
+            if device.ready_at <= cycles:
+                device.write(self.outr.word)
+                self.fgo.word = 1
+
+    def flush_devices(self):
+        """
+        Write buffered output to its sink. Once the computer halts, a
+        character still in OUTR is written without waiting for the device.
+        """
+        device = self.output_device
+        if device is None:
+            return
+        if self.s.word == 0 and self.fgo.word == 0 and \
+                device.ready_at is not None:
+            device.write(self.outr.word)
+            self.fgo.word = 1
+        device.flush()
+
+    def reset(self):
+        """
+        Return to the power-on state in place: registers and counters
+        cleared, memory zeroed and devices detached. Reusing a machine this
+        way is cheaper than building a new one.
+        """
+        for name in REGISTERS:
+            getattr(self, name).clear()
+        self.cycles = self.instructions = self.interrupts = 0
+        self.input_device = self.output_device = None
+        del self.events[:]
+        self.next_event = NEVER
+        self.polling = None
+        self.ram.clear()
+
+    def snapshot(self):
+        """
+        Capture the full machine state
+        """
+        registers = tuple(getattr(self, name).word for name in REGISTERS)
+        counters = (self.cycles, self.instructions, self.interrupts)
+
+        return Snapshot(registers, counters, self.ram.fork())
+
+    def restore(self, snapshot):
+        """
+        Return to a captured state. The snapshot stays valid and can be
+        restored again.
+        """
+        for name, word in zip(REGISTERS, snapshot.registers):
+            getattr(self, name).word = word
+        self.cycles, self.instructions, self.interrupts = snapshot.counters
+        self.ram = snapshot.memory.fork()
+
+    def fork(self):
+        """
+        Independent copy of the machine (with a disabled logger). Paged
+        memory is shared copy-on-write with the copy.
+        """
+        computer = type(self)(memory=self.ram.fork())
+        for name in REGISTERS:
+            getattr(computer, name).word = getattr(self, name).word
+        computer.cycles = self.cycles
+        computer.instructions = self.instructions
+        computer.interrupts = self.interrupts
+
+        return computer
+
+    def state_hash(self):
+        """
+        Hash of the registers, memory and selected bank. A HashedMemory
+        keeps its hash up to date as it's written, making this O(1); other
+        memories are hashed in full. Equal states hash the same, but equal
+        hashes don't guarantee equal states, see same_state().
+        """
+        memory = getattr(self.ram, 'hash', None)
+        if memory is None:
+            memory = memory_hash(self.ram)
+        registers = tuple(getattr(self, name).word for name in REGISTERS)
+
+        return hash((memory, self.ram.bank) + registers)
+
+    def same_state(self, other):
+        """
+        Whether two machines have the same registers, memory and selected
+        bank. Different hashes tell them apart quickly; equal hashes are
+        confirmed by a full comparison.
+        """
+        if self.state_hash() != other.state_hash():
+            return False
+
+        return (all(getattr(self, name).word == getattr(other, name).word
+                    for name in REGISTERS) and
+                self.ram.bank == other.ram.bank and
+                self.ram.dump() == other.ram.dump())
+
+    def is_infinite_loop(self):
+        """
+        Whether the computer is about to run a BUN to itself (the last
+        instruction executed) with interrupts disabled
+        """
+        pc = self.pc.word
+        ir = self.ir.word
+
+        return (ir & 0xF000 == 0x4000 and ir & 0xFFF == pc and
+                self.ien.word == 0 and self.ram.read(pc) == ir)
 
     def tick(self):
         t = self.sc.word
         r = self.r.word
-        d = self.get_opcode()
-        i = self.get_indirect_bit()
+        d, i, b = DECODED[self.ir.word]
 
         if t < 3 and r == 1:
             self.interrupt(t)
@@ -50,7 +333,6 @@ class Computer(object):
             self.execute_mri(d, t)
 
         if t == 3 and d == 7:
-            b = self.get_instruction_bit()
             if i:
                 self.execute_io(b)
             else:
@@ -72,48 +354,49 @@ class Computer(object):
         """
         Bit in IR(0-11) that specifies the operation
         """
-        return log(self.ir.word & 0xFFF, 2)
+        return DECODED[self.ir.word][2]
 
     def interrupt(self, t):
         if t == 0:
-            self.logger.log("RT0: AR <- 0, TR <- PC")
+            self.log("RT0: AR <- 0, TR <- PC")
             self.ar.clear()
             self.tr.word = self.pc.word
             self.sc.increment()
         elif t == 1:
-            self.logger.log("RT1: M[AR] <- TR, PC <- 0")
+            self.log("RT1: M[AR] <- TR, PC <- 0")
             self.memory_write(self.tr)
             self.pc.clear()
             self.sc.increment()
         elif t == 2:
-            self.logger.log("RT2: PC <- PC + 1, IEN <- 0, R <- 0, SC <- 0")
+            self.log("RT2: PC <- PC + 1, IEN <- 0, R <- 0, SC <- 0")
             self.pc.increment()
             self.ien.clear()
             self.r.clear()
             self.sc.clear()
+            self.interrupts += 1
 
     def instruction_fetch(self, t):
         if t == 0:
-            self.logger.log("R'T0: AR <- PC")
+            self.log("R'T0: AR <- PC")
             self.ar.word = self.pc.word
             self.sc.increment()
         elif t == 1:
-            self.logger.log("R'T1: IR <- M[AR], PC <- PC + 1")
+            self.log("R'T1: IR <- M[AR], PC <- PC + 1")
             self.memory_read(self.ir)
             self.pc.increment()
             self.sc.increment()
 
     def instruction_decode(self):
-        self.logger.log("R'T2: AR <- IR(0-11)")
+        self.log("R'T2: AR <- IR(0-11)")
         self.ar.word = self.ir.word & 0xFFF
         self.sc.increment()
 
     def operand_fetch(self, i):
         if i:
-            self.logger.log("D7'IT3: AR <- M[AR]")
+            self.log("D7'IT3: AR <- M[AR]")
             self.memory_read(self.ar)
         else:
-            self.logger.log("D7'I'T3: NOOP")
+            self.log("D7'I'T3: NOOP")
         self.sc.increment()
 
     def execute_mri(self, d, t):
@@ -173,173 +456,230 @@ class Computer(object):
             self.execute_ion()
         elif b == 6:
             self.execute_iof()
+        elif b == 5:
+            self.execute_sbk()
+        elif b == 4:
+            self.execute_lbk()
 
         self.sc.clear()
 
     def execute_and(self, t):
         if t == 4:
-            self.logger.log("D0T4: DR <- M[AR]")
+            self.log("D0T4: DR <- M[AR]")
             self.memory_read(self.dr)
             self.sc.increment()
         elif t == 5:
-            self.logger.log("D0T5: AC <- AC & DR, SC <- 0")
+            self.log("D0T5: AC <- AC & DR, SC <- 0")
             self.ac.logic_and(self.dr.word)
             self.sc.clear()
 
     def execute_add(self, t):
         if t == 4:
-            self.logger.log("D1T4: DR <- M[AR]")
+            self.log("D1T4: DR <- M[AR]")
             self.memory_read(self.dr)
             self.sc.increment()
         elif t == 5:
-            self.logger.log("D1T5: AC <- AC + DR, E <- Cout, SC <- 0")
+            self.log("D1T5: AC <- AC + DR, E <- Cout, SC <- 0")
             self.e.word = self.ac.add(self.dr.word)
             self.sc.clear()
 
     def execute_lda(self, t):
         if t == 4:
-            self.logger.log("D2T4: DR <- M[AR]")
+            self.log("D2T4: DR <- M[AR]")
             self.memory_read(self.dr)
             self.sc.increment()
         elif t == 5:
-            self.logger.log("D2T4: AC <- DR, SC <- 0")
+            self.log("D2T4: AC <- DR, SC <- 0")
             self.ac.word = self.dr.word
             self.sc.clear()
 
     def execute_sta(self):
-        self.logger.log("D3T4: M[AR] <- AC, SC <- 0")
+        self.log("D3T4: M[AR] <- AC, SC <- 0")
         self.memory_write(self.ac)
         self.sc.clear()
 
     def execute_bun(self):
-        self.logger.log("D4T4: PC <- AR, SC <- 0")
+        self.log("D4T4: PC <- AR, SC <- 0")
         self.pc.word = self.ar.word
         self.sc.clear()
 
     def execute_bsa(self, t):
         if t == 4:
-            self.logger.log("D5T4: M[AR] <- PC, AR <- AR + 1")
+            self.log("D5T4: M[AR] <- PC, AR <- AR + 1")
             self.memory_write(self.pc)
             self.ar.increment()
             self.sc.increment()
         elif t == 5:
-            self.logger.log("D5T5: PC <- AR, SC <- 0")
+            self.log("D5T5: PC <- AR, SC <- 0")
             self.pc.word = self.ar.word
             self.sc.clear()
 
     def execute_isz(self, t):
         if t == 4:
-            self.logger.log("D6T4: DR <- M[AR]")
+            self.log("D6T4: DR <- M[AR]")
             self.memory_read(self.dr)
             self.sc.increment()
         elif t == 5:
-            self.logger.log("D6T5: DR <- DR + 1")
+            self.log("D6T5: DR <- DR + 1")
             self.dr.increment()
             self.sc.increment()
         elif t == 6:
-            self.logger.log("D6T6: M[AR] <- DR, if (DR = 0) then (PC <- PC + 1), SC <- 0")
+            self.log("D6T6: M[AR] <- DR, if (DR = 0) then (PC <- PC + 1), SC <- 0")
             self.memory_write(self.dr)
             if self.dr.word == 0:
                 self.pc.increment()
             self.sc.clear()
 
     def execute_cla(self):
-        self.logger.log("D7I'T3B11: AC <- 0, SC <- 0")
+        self.log("D7I'T3B11: AC <- 0, SC <- 0")
         self.ac.clear()
 
     def execute_cle(self):
-        self.logger.log("D7I'T3B10: E <- 0, SC <- 0")
+        self.log("D7I'T3B10: E <- 0, SC <- 0")
         self.e.clear()
 
     def execute_cma(self):
-        self.logger.log("D7I'T3B9: AC <- AC', SC <- 0")
+        self.log("D7I'T3B9: AC <- AC', SC <- 0")
         self.ac.complement()
 
     def execute_cme(self):
-        self.logger.log("D7I'T3B8: E <- E', SC <- 0")
+        self.log("D7I'T3B8: E <- E', SC <- 0")
         self.e.complement()
 
     def execute_cir(self):
-        self.logger.log("D7I'T3B7: AC <- shr(AC), AC(15) <- E, E <- AC(0), SC <- 0")
+        self.log("D7I'T3B7: AC <- shr(AC), AC(15) <- E, E <- AC(0), SC <- 0")
         self.e.word = self.ac.shift_right(self.e.word)
 
     def execute_cil(self):
-        self.logger.log("D7I'T3B6: AC <- shl(AC), AC(0) <- E, E <- AC(15), SC <- 0")
+        self.log("D7I'T3B6: AC <- shl(AC), AC(0) <- E, E <- AC(15), SC <- 0")
         self.e.word = self.ac.shift_left(self.e.word)
 
     def execute_inc(self):
-        self.logger.log("D7I'T3B5: AC <- AC + 1, SC <- 0")
+        self.log("D7I'T3B5: AC <- AC + 1, SC <- 0")
         self.ac.increment()
 
     def execute_spa(self):
-        self.logger.log("D7I'T3B4: if (AC(15) = 0) then (PC <- PC + 1), SC <- 0")
+        self.log("D7I'T3B4: if (AC(15) = 0) then (PC <- PC + 1), SC <- 0")
         if not self.ac.word & 0x800:
             self.pc.increment()
 
     def execute_sna(self):
-        self.logger.log("D7I'T3B3: if (AC(15) = 1) then (PC <- PC + 1), SC <- 0")
+        self.log("D7I'T3B3: if (AC(15) = 1) then (PC <- PC + 1), SC <- 0")
         if self.ac.word & 0x800:
             self.pc.increment()
 
     def execute_sza(self):
-        self.logger.log("D7I'T3B2: if (AC = 0) then (PC <- PC + 1), SC <- 0")
+        self.log("D7I'T3B2: if (AC = 0) then (PC <- PC + 1), SC <- 0")
         if self.ac.word == 0:
             self.pc.increment()
 
     def execute_sze(self):
-        self.logger.log("D7I'T3B1: if (E = 0) then (PC <- PC + 1), SC <- 0")
+        self.log("D7I'T3B1: if (E = 0) then (PC <- PC + 1), SC <- 0")
         if self.e.word == 0:
             self.pc.increment()
 
     def execute_hlt(self):
-        self.logger.log("D7I'T3B0: S <- 0, SC <- 0")
+        self.log("D7I'T3B0: S <- 0, SC <- 0")
         self.s.word = 0
 
     def execute_inp(self):
-        self.logger.log("D7IT3B11: AC(0-7) <- INPR, FGI <- 0")
+        self.log("D7IT3B11: AC(0-7) <- INPR, FGI <- 0")
         self.ac.word &= 0xFF00
         self.ac.word |= self.inpr.word
         self.fgi.clear()
+        self.next_event = 0
 
     def execute_out(self):
-        self.logger.log("D7IT3B10: OUTR <- AC(0-7), FGO <- 0")
+        self.log("D7IT3B10: OUTR <- AC(0-7), FGO <- 0")
         self.outr.word = self.ac.word & 0xFF
         self.fgo.clear()
+        self.next_event = 0
 
     def execute_ski(self):
-        self.logger.log("D7IT3B9: if (FGI = 1) then (PC <- PC + 1)")
+        self.log("D7IT3B9: if (FGI = 1) then (PC <- PC + 1)")
         if self.fgi.word == 1:
             self.pc.increment()
 
     def execute_sko(self):
-        self.logger.log("D7IT3B8: if (FGO = 1) then (PC <- PC + 1)")
+        self.log("D7IT3B8: if (FGO = 1) then (PC <- PC + 1)")
         if self.fgo.word == 1:
             self.pc.increment()
 
     def execute_ion(self):
-        self.logger.log("D7IT3B7: IEN <- 1")
+        self.log("D7IT3B7: IEN <- 1")
         self.ien.word = 1
+        self.next_event = 0
 
     def execute_iof(self):
-        self.logger.log("D7IT3B6: IEN <- 0")
+        self.log("D7IT3B6: IEN <- 0")
         self.ien.clear()
 
+    def execute_sbk(self):
+        self.log("D7IT3B5: BNK <- AC")
+        self.select_bank(self.ac.word)
+
+    def execute_lbk(self):
+        self.log("D7IT3B4: AC <- BNK")
+        self.ac.word = self.ram.bank
+
+    def select_bank(self, bank):
+        """
+        Map a bank of extended memory to the window (see BankedMemory)
+        """
+        self.ram.select(bank)
+
     def memory_read(self, source_register):
-        source_register.word = self.ram.read(self.ar.word)
+        word = self.ram.read(self.ar.word)
+        source_register.word = word & source_register.mask
 
     def memory_write(self, target_register):
         self.ram.write(self.ar.word, target_register.word)
 
 
+def ignore(message):
+    pass
+
+
+# Marks an attribute that wasn't set on the instance
+MISSING = object()
+
+
+def replace_attributes(instance, **attributes):
+    """
+    Set instance attributes (instrumentation wrapping a machine's methods),
+    returning the ones replaced for restore_attributes(). Instruments that
+    wrap each other this way must be detached in reverse order.
+    """
+    replaced = dict((name, instance.__dict__.get(name, MISSING))
+                    for name in attributes)
+    instance.__dict__.update(attributes)
+
+    return replaced
+
+
+def restore_attributes(instance, replaced):
+    """
+    Put back instance attributes replaced by replace_attributes()
+    """
+    for name, value in replaced.items():
+        if value is MISSING:
+            instance.__dict__.pop(name, None)
+        else:
+            instance.__dict__[name] = value
+
+
 class Register(object):
+    __slots__ = ('bits', 'word', 'max_value', 'mask', 'msb_mask')
+
     def __init__(self, bits):
         self.bits = bits
         self.word = 0
         self.max_value = 1 << self.bits
         self.mask = self.max_value - 1
+        self.msb_mask = self.max_value >> 1
 
     def increment(self):
-        self.word = (self.word + 1) % self.max_value
+        self.word = (self.word + 1) & self.mask
 
     def clear(self):
         self.word = 0
@@ -349,46 +689,25 @@ class Register(object):
 
     def add(self, word):
         value = self.word + word
-        carry = value & self.max_value
-        self.word = value % self.max_value
+        self.word = value & self.mask
 
-        return 1 if carry else 0
+        return (value >> self.bits) & 1
 
     def complement(self):
         self.word = ~self.word & self.mask
 
     def shift_right(self, msb):
-        lsb = self.word & 1
-        self.word >>= 1
-        if msb:
-            msb_mask = self.max_value >> 1
-            self.word |= msb_mask
+        word = self.word
+        self.word = (word >> 1) | (self.msb_mask if msb else 0)
 
-        return lsb
+        return word & 1
 
     def shift_left(self, lsb):
-        msb_mask = self.max_value >> 1
-        msb = 1 if self.word & msb_mask else 0
-        self.word = (self.word << 1) & self.mask
-        if lsb:
-            self.word |= 1
+        word = self.word
+        self.word = ((word << 1) & self.mask) | (1 if lsb else 0)
 
-        return msb
+        return 1 if word & self.msb_mask else 0
 
     def __str__(self):
         return 'Register(word=%s)' % bin(self.word)[2:].zfill(self.bits)
 
-
-class Memory(object):
-    def __init__(self, size):
-        self.size = size
-        self.data = [0] * size
-
-    def write(self, address, word):
-        self.data[address] = word
-
-    def read(self, address):
-        return self.data[address]
-
-    def __str__(self):
-        return 'Memory(size=%dK)' % (self.size / 1024)
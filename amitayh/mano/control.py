@@ -0,0 +1,383 @@
+"""
+Table-driven control unit: the control logic of Computer.tick() compiled
+once into a table of micro-operations, indexed by the control inputs of
+the hardwired control unit (R, SC, D, I and the instruction bit B).
+"""
+from amitayh.mano.computer import Computer, ignore
+from amitayh.mano.decoder import DECODED, build_table
+
+
+class TableComputer(Computer):
+    """
+    Cycle-accurate like Computer, with the same T-states and the same
+    micro-operations logged, but every clock is a single table lookup
+    followed by the micro-operations of the control word it finds. Like
+    the next-address field of a microinstruction, the control word also
+    holds the next value of SC.
+    """
+    def tick(self):
+        sc = self.sc
+        rtl, operations, sc.word = ROWS[self.ir.word][self.r.word][sc.word]
+        if self.log is not ignore and rtl is not None:
+            self.log(rtl)
+        for operation in operations:
+            operation(self)
+
+
+# Micro-operations, applied to a computer
+
+def clear_ar(c):
+    c.ar.word = 0
+
+
+def load_ar_from_pc(c):
+    c.ar.word = c.pc.word
+
+
+def load_ar_from_ir(c):
+    c.ar.word = c.ir.word & 0xFFF
+
+
+def load_tr_from_pc(c):
+    c.tr.word = c.pc.word
+
+
+def load_pc_from_ar(c):
+    c.pc.word = c.ar.word
+
+
+def load_ac_from_dr(c):
+    c.ac.word = c.dr.word
+
+
+def clear_pc(c):
+    c.pc.word = 0
+
+
+def increment_pc(c):
+    c.pc.word = (c.pc.word + 1) & 0xFFF
+
+
+def increment_ar(c):
+    c.ar.word = (c.ar.word + 1) & 0xFFF
+
+
+def increment_dr(c):
+    c.dr.word = (c.dr.word + 1) & 0xFFFF
+
+
+def read_ir(c):
+    c.memory_read(c.ir)
+
+
+def read_ar(c):
+    c.memory_read(c.ar)
+
+
+def read_dr(c):
+    c.memory_read(c.dr)
+
+
+def write_tr(c):
+    c.memory_write(c.tr)
+
+
+def write_ac(c):
+    c.memory_write(c.ac)
+
+
+def write_pc(c):
+    c.memory_write(c.pc)
+
+
+def write_dr(c):
+    c.memory_write(c.dr)
+
+
+def end_interrupt(c):
+    c.ien.word = 0
+    c.r.word = 0
+    c.interrupts += 1
+
+
+def and_dr(c):
+    c.ac.word &= c.dr.word
+
+
+def add_dr(c):
+    c.e.word = c.ac.add(c.dr.word)
+
+
+def skip_if_dr_zero(c):
+    if c.dr.word == 0:
+        c.pc.word = (c.pc.word + 1) & 0xFFF
+
+
+def clear_ac(c):
+    c.ac.word = 0
+
+
+def clear_e(c):
+    c.e.word = 0
+
+
+def complement_ac(c):
+    c.ac.word ^= 0xFFFF
+
+
+def complement_e(c):
+    c.e.word ^= 1
+
+
+def circulate_right(c):
+    c.e.word = c.ac.shift_right(c.e.word)
+
+
+def circulate_left(c):
+    c.e.word = c.ac.shift_left(c.e.word)
+
+
+def increment_ac(c):
+    c.ac.word = (c.ac.word + 1) & 0xFFFF
+
+
+def skip_if_positive(c):
+    if not c.ac.word & 0x800:
+        c.pc.word = (c.pc.word + 1) & 0xFFF
+
+
+def skip_if_negative(c):
+    if c.ac.word & 0x800:
+        c.pc.word = (c.pc.word + 1) & 0xFFF
+
+
+def skip_if_ac_zero(c):
+    if c.ac.word == 0:
+        c.pc.word = (c.pc.word + 1) & 0xFFF
+
+
+def skip_if_e_zero(c):
+    if c.e.word == 0:
+        c.pc.word = (c.pc.word + 1) & 0xFFF
+
+
+def halt(c):
+    c.s.word = 0
+
+
+def input_character(c):
+    c.ac.word = (c.ac.word & 0xFF00) | c.inpr.word
+    c.fgi.word = 0
+    c.next_event = 0
+
+
+def output_character(c):
+    c.outr.word = c.ac.word & 0xFF
+    c.fgo.word = 0
+    c.next_event = 0
+
+
+def skip_on_input(c):
+    if c.fgi.word == 1:
+        c.pc.word = (c.pc.word + 1) & 0xFFF
+
+
+def skip_on_output(c):
+    if c.fgo.word == 1:
+        c.pc.word = (c.pc.word + 1) & 0xFFF
+
+
+def interrupts_on(c):
+    c.ien.word = 1
+    c.next_event = 0
+
+
+def interrupts_off(c):
+    c.ien.word = 0
+
+
+def select_bank(c):
+    c.select_bank(c.ac.word)
+
+
+def load_bank(c):
+    c.ac.word = c.ram.bank
+
+
+# Micro-operation sequences: (RTL statement logged, micro-operations) per
+# clock. The last clock of a sequence ends the instruction (SC <- 0), the
+# others increment SC.
+
+INTERRUPT = (
+    ("RT0: AR <- 0, TR <- PC", (clear_ar, load_tr_from_pc)),
+    ("RT1: M[AR] <- TR, PC <- 0", (write_tr, clear_pc)),
+    ("RT2: PC <- PC + 1, IEN <- 0, R <- 0, SC <- 0",
+     (increment_pc, end_interrupt))
+)
+
+# Fetch and decode (T0-T2), followed by T3 of a memory reference
+# instruction by I
+FETCH = (
+    ("R'T0: AR <- PC", (load_ar_from_pc,)),
+    ("R'T1: IR <- M[AR], PC <- PC + 1", (read_ir, increment_pc)),
+    ("R'T2: AR <- IR(0-11)", (load_ar_from_ir,))
+)
+OPERAND = (
+    ("D7'I'T3: NOOP", ()),
+    ("D7'IT3: AR <- M[AR]", (read_ar,))
+)
+
+# T4 onwards of memory reference instructions, by D
+MRI = (
+    (("D0T4: DR <- M[AR]", (read_dr,)),
+     ("D0T5: AC <- AC & DR, SC <- 0", (and_dr,))),
+    (("D1T4: DR <- M[AR]", (read_dr,)),
+     ("D1T5: AC <- AC + DR, E <- Cout, SC <- 0", (add_dr,))),
+    (("D2T4: DR <- M[AR]", (read_dr,)),
+     ("D2T4: AC <- DR, SC <- 0", (load_ac_from_dr,))),
+    (("D3T4: M[AR] <- AC, SC <- 0", (write_ac,)),),
+    (("D4T4: PC <- AR, SC <- 0", (load_pc_from_ar,)),),
+    (("D5T4: M[AR] <- PC, AR <- AR + 1", (write_pc, increment_ar)),
+     ("D5T5: PC <- AR, SC <- 0", (load_pc_from_ar,))),
+    (("D6T4: DR <- M[AR]", (read_dr,)),
+     ("D6T5: DR <- DR + 1", (increment_dr,)),
+     ("D6T6: M[AR] <- DR, if (DR = 0) then (PC <- PC + 1), SC <- 0",
+      (write_dr, skip_if_dr_zero)))
+)
+
+# T3 (and last clock) of register reference instructions, by B
+RRI = (
+    ("D7I'T3B0: S <- 0, SC <- 0", (halt,)),
+    ("D7I'T3B1: if (E = 0) then (PC <- PC + 1), SC <- 0",
+     (skip_if_e_zero,)),
+    ("D7I'T3B2: if (AC = 0) then (PC <- PC + 1), SC <- 0",
+     (skip_if_ac_zero,)),
+    ("D7I'T3B3: if (AC(15) = 1) then (PC <- PC + 1), SC <- 0",
+     (skip_if_negative,)),
+    ("D7I'T3B4: if (AC(15) = 0) then (PC <- PC + 1), SC <- 0",
+     (skip_if_positive,)),
+    ("D7I'T3B5: AC <- AC + 1, SC <- 0", (increment_ac,)),
+    ("D7I'T3B6: AC <- shl(AC), AC(0) <- E, E <- AC(15), SC <- 0",
+     (circulate_left,)),
+    ("D7I'T3B7: AC <- shr(AC), AC(15) <- E, E <- AC(0), SC <- 0",
+     (circulate_right,)),
+    ("D7I'T3B8: E <- E', SC <- 0", (complement_e,)),
+    ("D7I'T3B9: AC <- AC', SC <- 0", (complement_ac,)),
+    ("D7I'T3B10: E <- 0, SC <- 0", (clear_e,)),
+    ("D7I'T3B11: AC <- 0, SC <- 0", (clear_ac,))
+)
+
+# T3 (and last clock) of input / output instructions, by B
+IO = (
+    None,
+    None,
+    None,
+    None,
+    ("D7IT3B4: AC <- BNK", (load_bank,)),
+    ("D7IT3B5: BNK <- AC", (select_bank,)),
+    ("D7IT3B6: IEN <- 0", (interrupts_off,)),
+    ("D7IT3B7: IEN <- 1", (interrupts_on,)),
+    ("D7IT3B8: if (FGO = 1) then (PC <- PC + 1)", (skip_on_output,)),
+    ("D7IT3B9: if (FGI = 1) then (PC <- PC + 1)", (skip_on_input,)),
+    ("D7IT3B10: OUTR <- AC(0-7), FGO <- 0", (output_character,)),
+    ("D7IT3B11: AC(0-7) <- INPR, FGI <- 0", (input_character,))
+)
+
+# Register reference or IO word that isn't a single operation: nothing
+# is done but ending the instruction
+UNDEFINED = (None, ())
+
+
+def control_word(r, t, d, i, b):
+    """
+    Control word (RTL statement, micro-operations, next SC) for the inputs
+    of the control unit. The conditions are those of Computer.tick(), in
+    the same order. Clocks no instruction reaches leave SC as it is.
+    """
+    if t < 3 and r == 1:
+        return sequence_step(INTERRUPT, t, t)
+    if t < 3:
+        return FETCH[t] + (t + 1,)
+    if d != 7:
+        if t == 3:
+            return OPERAND[i] + (t + 1,)
+        if t - 4 < len(MRI[d]):
+            return sequence_step(MRI[d], t - 4, t)
+        return None, (), t
+    if t > 3:
+        return None, (), t
+
+    entry = (IO if i else RRI)[b] if b is not None else None
+
+    return (entry or UNDEFINED) + (0,)
+
+
+def sequence_step(sequence, index, t):
+    """
+    Control word of clock t, the index-th of a sequence: SC is incremented
+    unless it's the last one
+    """
+    rtl, operations = sequence[index]
+    sc = 0 if index == len(sequence) - 1 else t + 1
+
+    return rtl, operations, sc
+
+
+# Control words for every combination of (R, SC, D, I, B), B is None when
+# IR(0-11) doesn't specify a single operation
+CONTROL = dict(
+    ((r, t, d, i, b), control_word(r, t, d, i, b))
+    for r in (0, 1) for t in range(8) for d in range(8) for i in (0, 1)
+    for b in (None,) + tuple(range(12)))
+
+
+def control_rows(word):
+    """
+    Control words of an instruction word, indexed by R and then SC
+    """
+    d, i, b = DECODED[word]
+    return tuple(
+        tuple(CONTROL[r, t, d, i, b] for t in range(8)) for r in (0, 1))
+
+
+# Rows of the control table for every instruction word, so a clock only
+# indexes by IR, R and SC
+ROWS = build_table(control_rows)
+
+
+# RTL statements of the control words, numbered so a clock's statement can
+# be counted in an array: STATEMENT_ROWS holds the number of every control
+# word's statement, in the same rows as ROWS. Control words that log
+# nothing get the number after the last statement.
+STATEMENTS = sorted(set(rtl for rtl, operations, sc in CONTROL.values()
+                        if rtl is not None))
+STATEMENT_NUMBERS = dict((rtl, number)
+                         for number, rtl in enumerate(STATEMENTS))
+STATEMENT_NUMBERS[None] = len(STATEMENTS)
+
+
+def statement_rows(rows):
+    """
+    Statement numbers of an instruction word's rows of control words
+    """
+    return tuple(tuple(STATEMENT_NUMBERS[rtl] for rtl, operations, sc in row)
+                 for row in rows)
+
+
+def build_statement_rows():
+    """
+    Statement rows of every instruction word. Words share their rows in
+    ROWS, so each distinct row is numbered once.
+    """
+    numbered = {}
+    table = []
+    for rows in ROWS:
+        numbers = numbered.get(id(rows))
+        if numbers is None:
+            numbers = numbered[id(rows)] = statement_rows(rows)
+        table.append(numbers)
+
+    return table
+
+
+STATEMENT_ROWS = build_statement_rows()
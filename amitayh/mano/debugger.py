@@ -0,0 +1,250 @@
+"""
+Breakpoints, watchpoints and conditional stops, checked at instruction
+boundaries.
+"""
+from collections import namedtuple
+from amitayh.mano.computer import RunResult, replace_attributes, \
+    restore_attributes
+
+# Reasons for a debugged run to stop, besides those of Computer.run()
+BREAKPOINT = 'breakpoint'
+WATCHPOINT = 'watchpoint'
+CONDITION = 'condition'
+
+# Memory accesses a watchpoint stops on
+READ = 'read'
+WRITE = 'write'
+
+
+class Stop(namedtuple('Stop', 'reason address access')):
+    """
+    Where a debugged run stopped: the breakpoint's address (or PC, for a
+    condition), or the watched address and the access (READ or WRITE)
+    """
+
+
+class Debugger(object):
+    """
+    Stops a machine's runs at breakpoints, watchpoints and conditions.
+    Attaching replaces the machine's resume(), so run() and resume()
+    return at a stop, with the stop's reason in the RunResult (and the
+    details in `stop`). Resuming continues from the stop.
+
+    Breakpoints and watchpoints are bytearrays indexed by address, so a
+    check is one lookup. Only what's needed is hooked for a run: the
+    instruction boundary check while anything is set, memory_read() and
+    memory_write() while watchpoints are. With nothing set, runs cost
+    nothing extra (and a BlockComputer runs blocks); otherwise it runs
+    instruction by instruction.
+
+    A breakpoint stops before its instruction executes, a watchpoint or
+    condition after the instruction that triggered it. Instruction
+    fetches don't trigger read watchpoints.
+    """
+    def __init__(self, computer, assembler=None):
+        self.computer = computer
+        self.assembler = assembler
+        size = computer.ram.size
+        self.breakpoints = bytearray(size)
+        self.breakpoint_conditions = {}
+        self.read_watchpoints = bytearray(size)
+        self.write_watchpoints = bytearray(size)
+        self.conditions = []
+        self.stop = None
+        self.pending = None
+        self.stopped_at = None          # PC of the last stop
+        self.hooked = None
+        self.attach()
+
+    def attach(self):
+        self.resume = self.computer.resume
+        self.replaced = replace_attributes(self.computer,
+                                           resume=self.debugged_resume)
+
+    def close(self):
+        """
+        Detach from the machine
+        """
+        restore_attributes(self.computer, self.replaced)
+
+    def address(self, target):
+        """
+        Address of a label (resolved through the assembler) or address
+        """
+        if isinstance(target, int):
+            return target
+        if self.assembler is None:
+            raise ValueError('No assembler to resolve label %s' % target)
+        address = self.assembler.address_table.get(target)
+        if address is None:
+            raise ValueError('Unknown label %s' % target)
+
+        return address
+
+    def break_at(self, target, condition=None):
+        """
+        Stop before executing the instruction at target (an address or a
+        label), if condition(computer) is true when one is given
+        """
+        address = self.address(target)
+        self.breakpoints[address] = 1
+        if condition is None:
+            self.breakpoint_conditions.pop(address, None)
+        else:
+            self.breakpoint_conditions[address] = condition
+
+    def clear_break(self, target):
+        address = self.address(target)
+        self.breakpoints[address] = 0
+        self.breakpoint_conditions.pop(address, None)
+
+    def watch(self, start, end=None, read=False, write=True):
+        """
+        Stop after an instruction reads (or writes) a word in the range
+        start-end (inclusive; a single word if end is None). Both ends
+        may be labels.
+        """
+        start = self.address(start)
+        end = start if end is None else self.address(end)
+        length = end - start + 1
+        if read:
+            self.read_watchpoints[start:end + 1] = b'\x01' * length
+        if write:
+            self.write_watchpoints[start:end + 1] = b'\x01' * length
+
+    def clear_watch(self, start, end=None):
+        start = self.address(start)
+        end = start if end is None else self.address(end)
+        length = end - start + 1
+        self.read_watchpoints[start:end + 1] = bytes(length)
+        self.write_watchpoints[start:end + 1] = bytes(length)
+
+    def stop_when(self, register, word):
+        """
+        Stop after every instruction that leaves a register (by name)
+        holding word
+        """
+        register = getattr(self.computer, register)
+        self.stop_if(lambda computer: register.word == word)
+
+    def stop_if(self, condition):
+        """
+        Stop after every instruction that leaves condition(computer) true
+        """
+        self.conditions.append(condition)
+
+    def clear_conditions(self):
+        del self.conditions[:]
+
+    def debugged_resume(self, max_cycles=None, max_instructions=None,
+                        timeout=None):
+        computer = self.computer
+        self.stop = self.pending = None
+        stopped_at, self.stopped_at = self.stopped_at, None
+        pc = computer.pc.word
+        if (pc != stopped_at and computer.s.word == 1 and
+                computer.r.word == 0 and self.is_breakpoint(pc)):
+            self.stop = Stop(BREAKPOINT, pc, None)
+            self.stopped_at = pc
+            return RunResult(BREAKPOINT, 0, 0)
+
+        self.hook()
+        try:
+            result = self.resume(max_cycles, max_instructions, timeout)
+        finally:
+            self.unhook()
+        if self.stop is not None:
+            result = RunResult(self.stop.reason, result.cycles,
+                               result.instructions)
+
+        return result
+
+    def hook(self):
+        computer = self.computer
+        watched = 1 in self.read_watchpoints or 1 in self.write_watchpoints
+        if not (watched or self.conditions or 1 in self.breakpoints):
+            return
+
+        self.flush_devices = computer.flush_devices
+        hooks = {'flush_devices': self.debugged_flush_devices,
+                 'instrumented': True}
+        if hasattr(computer, 'step'):
+            self.step = computer.step
+            hooks['step'] = self.debugged_step
+        else:
+            self.tick = computer.tick
+            hooks['tick'] = self.debugged_tick
+        if watched:
+            self.read = computer.memory_read
+            self.write = computer.memory_write
+            hooks['memory_read'] = self.watched_read
+            hooks['memory_write'] = self.watched_write
+        self.hooked = replace_attributes(computer, **hooks)
+
+    def unhook(self):
+        if self.hooked is not None:
+            restore_attributes(self.computer, self.hooked)
+        self.hooked = None
+
+    def debugged_step(self):
+        cycles = self.step()
+        self.check()
+
+        return cycles
+
+    def debugged_tick(self):
+        self.tick()
+        if self.computer.sc.word == 0:
+            self.check()
+
+    def debugged_flush_devices(self):
+        # A stop clears S to end the run, which isn't a halt
+        if self.stop is not None:
+            self.computer.s.word = 1
+        self.flush_devices()
+
+    def watched_read(self, register):
+        computer = self.computer
+        address = computer.ar.word
+        self.read(register)
+        if self.read_watchpoints[address] and register is not computer.ir:
+            self.pending = Stop(WATCHPOINT, address, READ)
+
+    def watched_write(self, register):
+        address = self.computer.ar.word
+        self.write(register)
+        if self.write_watchpoints[address]:
+            self.pending = Stop(WATCHPOINT, address, WRITE)
+
+    def check(self):
+        """
+        Called at every instruction boundary while hooked: ends the run
+        (by clearing S) if a stop was triggered
+        """
+        computer = self.computer
+        if computer.s.word == 0:
+            return
+        pc = computer.pc.word
+        stop, self.pending = self.pending, None
+        if stop is None and computer.r.word == 0 and self.is_breakpoint(pc):
+            stop = Stop(BREAKPOINT, pc, None)
+        if stop is None:
+            for condition in self.conditions:
+                if condition(computer):
+                    stop = Stop(CONDITION, pc, None)
+                    break
+        if stop is not None:
+            self.stop = stop
+            self.stopped_at = pc
+            computer.s.word = 0
+            computer.polling = None
+
+    def is_breakpoint(self, pc):
+        """
+        Whether there's a breakpoint at pc whose condition holds
+        """
+        if not self.breakpoints[pc]:
+            return False
+        condition = self.breakpoint_conditions.get(pc)
+
+        return condition is None or condition(self.computer)
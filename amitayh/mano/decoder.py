@@ -0,0 +1,46 @@
+"""
+Instruction decoding, precomputed once at import for every 16-bit word so
+the engines never decode the same instruction twice.
+"""
+
+# Bit in IR(0-11) that specifies a register reference / IO operation
+INSTRUCTION_BITS = dict((1 << bit, bit) for bit in range(12))
+
+# Clock cycles of an instruction (fetch and decode included), by opcode
+CYCLES = (6, 6, 6, 5, 5, 6, 7, 4)
+
+# Clock cycles of the interrupt cycle (RT0-RT2)
+INTERRUPT_CYCLES = 3
+
+
+def decode(word):
+    """
+    Split an instruction word to (opcode, indirect bit, instruction bit).
+    The instruction bit is None for memory reference instructions and for
+    words that don't specify exactly one operation.
+    """
+    opcode = (word >> 12) & 7
+    indirect = (word >> 15) & 1
+    bit = None
+    if opcode == 7:
+        bit = INSTRUCTION_BITS.get(word & 0xFFF)
+
+    return opcode, indirect, bit
+
+
+def build_table(decoder):
+    """
+    Apply decoder to all 64K instruction words. Equal entries are shared,
+    so the table costs little more than its 64K slots.
+    """
+    entries = {}
+    table = []
+    for word in range(1 << 16):
+        entry = decoder(word)
+        table.append(entries.setdefault(entry, entry))
+
+    return table
+
+
+# (opcode, indirect, bit) for every instruction word
+DECODED = build_table(decode)
@@ -0,0 +1,119 @@
+"""
+Character devices feeding INPR and draining OUTR, with the FGI / FGO
+handshake. Data moves to and from the host in bulk: an input device reads
+its source a buffer at a time, an output device writes its sink a buffer
+at a time.
+"""
+import os
+
+NEVER = float('inf')
+
+BUFFER_SIZE = 1 << 16
+
+
+class InputDevice(object):
+    """
+    Reads characters from a bytes-like object, a binary file, a pipe (file
+    descriptor) or an iterable of ints or byte strings (e.g. a generator).
+    A character is ready `latency` cycles after the previous one was taken
+    by INP.
+    """
+    def __init__(self, source, latency=0, buffer_size=BUFFER_SIZE):
+        self.chunks = read_chunks(source, buffer_size)
+        self.latency = latency
+        self.buffer = b''
+        self.position = 0
+        self.ready_at = None    # Cycle the next character is ready
+
+    def available(self):
+        """
+        Whether there are characters left, refilling the buffer if needed
+        """
+        while self.position >= len(self.buffer):
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return False
+            self.buffer = chunk
+            self.position = 0
+
+        return True
+
+    def schedule(self, cycles):
+        self.ready_at = cycles + self.latency if self.available() else NEVER
+
+    def read(self):
+        character = self.buffer[self.position]
+        self.position += 1
+        self.ready_at = None
+
+        return character
+
+
+class OutputDevice(object):
+    """
+    Writes characters to a binary file, a pipe (file descriptor) or, if no
+    sink is given, to the `data` bytearray. The device is ready for the
+    next character `latency` cycles after OUT.
+    """
+    def __init__(self, sink=None, latency=0, buffer_size=BUFFER_SIZE):
+        self.sink = sink
+        self.latency = latency
+        self.buffer_size = buffer_size
+        self.data = bytearray()
+        self.flushed = 0
+        self.ready_at = None    # Cycle the device is ready again
+
+    def schedule(self, cycles):
+        self.ready_at = cycles + self.latency
+
+    def write(self, character):
+        self.data.append(character)
+        self.ready_at = None
+        if self.sink is not None and len(self.data) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.sink is None or not self.data:
+            return
+        if isinstance(self.sink, int):
+            data = bytes(self.data)
+            while data:
+                data = data[os.write(self.sink, data):]
+        else:
+            self.sink.write(self.data)
+            self.sink.flush()
+        self.flushed += len(self.data)
+        del self.data[:]
+
+
+def read_chunks(source, size):
+    """
+    Yield the source as non-empty byte strings. Files must be opened in
+    binary mode (sys.stdin.buffer rather than sys.stdin).
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        if source:
+            yield bytes(source)
+    elif isinstance(source, int):
+        for chunk in iter(lambda: os.read(source, size), b''):
+            yield chunk
+    elif hasattr(source, 'read'):
+        while True:
+            chunk = source.read(size)
+            if isinstance(chunk, str):
+                raise TypeError('Input file must be opened in binary mode')
+            if not chunk:
+                break
+            yield chunk
+    else:
+        pending = bytearray()
+        for item in source:
+            if isinstance(item, int):
+                pending.append(item)
+            else:
+                pending += item
+            if len(pending) >= size:
+                yield bytes(pending)
+                del pending[:]
+        if pending:
+            yield bytes(pending)
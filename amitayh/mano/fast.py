@@ -0,0 +1,368 @@
+from timeit import default_timer
+from amitayh.mano.computer import Computer, RunResult, NEVER, CHUNK, \
+    HALTED, CYCLE_LIMIT, INSTRUCTION_LIMIT, TIMEOUT, INFINITE_LOOP
+from amitayh.mano.decoder import CYCLES, INTERRUPT_CYCLES, build_table, \
+    decode
+from amitayh.mano.logger import INSTRUCTION
+
+MAX_CYCLES = max(CYCLES)
+
+# Cycles of one iteration of an idle polling loop (SKI or SKO, BUN back)
+POLLING_CYCLES = CYCLES[7] + CYCLES[4]
+
+
+class FastComputer(Computer):
+    """
+    Executes a whole instruction (fetch, decode, indirect and execute) per
+    step instead of a single micro-operation per clock. The architectural
+    state at every instruction boundary is the same as Computer's, but
+    only instructions (not micro-operations) are logged.
+    """
+    instrumented = False    # Set while a Profiler, Tracer or Debugger is on
+
+    def resume(self, max_cycles=None, max_instructions=None, timeout=None):
+        """
+        Continue execution from the current state, see Computer.run().
+        Limits are checked between instructions, so a run may exceed
+        max_cycles by up to one instruction. Infinite loops are detected
+        between chunks of instructions, keeping the check off the hot loop.
+        Idle SKI / SKO polling loops are skipped, see skip_polling().
+        """
+        cycles = start_cycles = self.cycles
+        instructions = start_instructions = self.instructions
+        cycle_limit = NEVER if max_cycles is None else cycles + max_cycles
+        instruction_limit = NEVER
+        if max_instructions is not None:
+            instruction_limit = instructions + max_instructions
+        deadline = NEVER if timeout is None else default_timer() + timeout
+        step = self.step
+        if self.logger.is_enabled_for(INSTRUCTION):
+            step = self.logged_step
+        s = self.s
+
+        reason = HALTED
+        while s.word == 1:
+            if cycles >= cycle_limit:
+                reason = CYCLE_LIMIT
+                break
+            if instructions >= instruction_limit:
+                reason = INSTRUCTION_LIMIT
+                break
+            if default_timer() >= deadline:
+                reason = TIMEOUT
+                break
+
+            # Run a chunk of instructions that can't overshoot the limits
+            chunk = min(CHUNK, instruction_limit - instructions)
+            if cycle_limit - cycles < chunk * MAX_CYCLES:
+                chunk = max(1, (cycle_limit - cycles) // MAX_CYCLES)
+            interrupts = self.interrupts
+            polling = False
+            for steps in range(1, chunk + 1):
+                cycles += step()
+                if cycles >= self.next_event:
+                    polling = self.service_events(cycles)
+                    if polling:
+                        break
+                if s.word == 0:
+                    break
+            instructions += steps - (self.interrupts - interrupts)
+            if polling:
+                cycles, instructions = self.skip_polling(
+                    cycles, instructions, cycle_limit, instruction_limit)
+
+            if s.word == 1 and self.is_infinite_loop():
+                reason = INFINITE_LOOP
+                break
+
+        self.cycles = cycles
+        self.instructions = instructions
+        self.flush_devices()
+
+        return RunResult(reason, cycles - start_cycles,
+                         instructions - start_instructions)
+
+    def skip_polling(self, cycles, instructions, cycle_limit,
+                     instruction_limit):
+        """
+        Called right after SKI (or SKO) found its flag clear, with a BUN
+        back to it next. Until the next event is due nothing can change,
+        so the loop's iterations up to then are skipped by only advancing
+        the counters (the registers are the same after every iteration).
+        Stops short of the limits, which are then reached by stepping.
+        Nothing is skipped while instrumented, so every iteration is seen.
+        Returns the new (cycles, instructions).
+        """
+        if self.instrumented:
+            return cycles, instructions
+        bounds = []
+        if self.next_event != NEVER:
+            bounds.append((self.next_event - cycles - 1) // POLLING_CYCLES)
+        if cycle_limit != NEVER:
+            bounds.append((cycle_limit - cycles) // POLLING_CYCLES)
+        if instruction_limit != NEVER:
+            bounds.append((instruction_limit - instructions) // 2)
+        if not bounds:
+            return cycles, instructions
+
+        iterations = max(0, min(bounds))
+
+        return (cycles + iterations * POLLING_CYCLES,
+                instructions + iterations * 2)
+
+    def logged_step(self):
+        pc = self.pc.word
+        interrupt = self.r.word
+        cycles = self.step()
+        if interrupt:
+            self.logger.log('INT: M[0] <- %03X, PC <- 1' % pc)
+        else:
+            self.logger.log('%03X: %04X' % (pc, self.ir.word))
+
+        return cycles
+
+    def step(self):
+        """
+        Execute an instruction (or the interrupt cycle), return its cycles
+        """
+        if self.r.word == 1:
+            self.interrupt_cycle()
+            return INTERRUPT_CYCLES
+
+        # Fetch
+        self.ar.word = self.pc.word
+        self.memory_read(self.ir)
+        self.pc.increment()
+
+        # Decode
+        ir = self.ir.word
+        handler, indirect, cycles = instructions[ir]
+        self.ar.word = ir & 0xFFF
+
+        # Execute
+        if indirect:
+            self.memory_read(self.ar)
+        if handler is not None:
+            handler(self)
+
+        self.sc.clear()
+
+        return cycles
+
+    def interrupt_cycle(self):
+        self.ar.clear()
+        self.tr.word = self.pc.word
+        self.memory_write(self.tr)
+        self.pc.clear()
+        self.pc.increment()
+        self.ien.clear()
+        self.r.clear()
+        self.sc.clear()
+        self.interrupts += 1
+
+
+def execute_and(computer):
+    computer.memory_read(computer.dr)
+    computer.ac.logic_and(computer.dr.word)
+
+
+def execute_add(computer):
+    computer.memory_read(computer.dr)
+    computer.e.word = computer.ac.add(computer.dr.word)
+
+
+def execute_lda(computer):
+    computer.memory_read(computer.dr)
+    computer.ac.word = computer.dr.word
+
+
+def execute_sta(computer):
+    computer.memory_write(computer.ac)
+
+
+def execute_bun(computer):
+    computer.pc.word = computer.ar.word
+
+
+def execute_bsa(computer):
+    computer.memory_write(computer.pc)
+    computer.ar.increment()
+    computer.pc.word = computer.ar.word
+
+
+def execute_isz(computer):
+    computer.memory_read(computer.dr)
+    computer.dr.increment()
+    computer.memory_write(computer.dr)
+    if computer.dr.word == 0:
+        computer.pc.increment()
+
+
+def execute_cla(computer):
+    computer.ac.clear()
+
+
+def execute_cle(computer):
+    computer.e.clear()
+
+
+def execute_cma(computer):
+    computer.ac.complement()
+
+
+def execute_cme(computer):
+    computer.e.complement()
+
+
+def execute_cir(computer):
+    computer.e.word = computer.ac.shift_right(computer.e.word)
+
+
+def execute_cil(computer):
+    computer.e.word = computer.ac.shift_left(computer.e.word)
+
+
+def execute_inc(computer):
+    computer.ac.increment()
+
+
+def execute_spa(computer):
+    if not computer.ac.word & 0x800:
+        computer.pc.increment()
+
+
+def execute_sna(computer):
+    if computer.ac.word & 0x800:
+        computer.pc.increment()
+
+
+def execute_sza(computer):
+    if computer.ac.word == 0:
+        computer.pc.increment()
+
+
+def execute_sze(computer):
+    if computer.e.word == 0:
+        computer.pc.increment()
+
+
+def execute_hlt(computer):
+    computer.s.word = 0
+
+
+def execute_inp(computer):
+    computer.ac.word &= 0xFF00
+    computer.ac.word |= computer.inpr.word
+    computer.fgi.clear()
+    computer.next_event = 0
+
+
+def execute_out(computer):
+    computer.outr.word = computer.ac.word & 0xFF
+    computer.fgo.clear()
+    computer.next_event = 0
+
+
+def execute_ski(computer):
+    if computer.fgi.word == 1:
+        computer.pc.increment()
+    elif is_polling_loop(computer):
+        computer.polling = computer.fgi
+        computer.next_event = 0
+
+
+def execute_sko(computer):
+    if computer.fgo.word == 1:
+        computer.pc.increment()
+    elif is_polling_loop(computer):
+        computer.polling = computer.fgo
+        computer.next_event = 0
+
+
+def is_polling_loop(computer):
+    """
+    Whether the skip instruction just executed is followed by a BUN back
+    to it
+    """
+    pc = computer.pc.word
+    return computer.ram.read(pc) == 0x4000 | ((pc - 1) & 0xFFF)
+
+
+def execute_ion(computer):
+    computer.ien.word = 1
+    computer.next_event = 0
+
+
+def execute_iof(computer):
+    computer.ien.clear()
+
+
+def execute_sbk(computer):
+    computer.select_bank(computer.ac.word)
+
+
+def execute_lbk(computer):
+    computer.ac.word = computer.ram.bank
+
+
+# Memory reference instructions, indexed by opcode (IR(12-14))
+mri = (
+    execute_and,
+    execute_add,
+    execute_lda,
+    execute_sta,
+    execute_bun,
+    execute_bsa,
+    execute_isz
+)
+
+# Register reference instructions, indexed by bit in IR(0-11)
+rri = (
+    execute_hlt,
+    execute_sze,
+    execute_sza,
+    execute_sna,
+    execute_spa,
+    execute_inc,
+    execute_cil,
+    execute_cir,
+    execute_cme,
+    execute_cma,
+    execute_cle,
+    execute_cla
+)
+
+# Input / output instructions, indexed by bit in IR(0-11)
+io = (
+    None,
+    None,
+    None,
+    None,
+    execute_lbk,
+    execute_sbk,
+    execute_iof,
+    execute_ion,
+    execute_sko,
+    execute_ski,
+    execute_out,
+    execute_inp
+)
+
+
+def decode_handler(word):
+    """
+    Handler of the instruction, whether its operand is indirect and its
+    clock cycles
+    """
+    opcode, indirect, bit = decode(word)
+    if opcode != 7:
+        return mri[opcode], indirect, CYCLES[opcode]
+
+    if bit is None:
+        return None, 0, CYCLES[7]
+
+    return (io if indirect else rri)[bit], 0, CYCLES[7]
+
+
+# (handler, indirect, cycles) for every instruction word
+instructions = build_table(decode_handler)
@@ -0,0 +1,188 @@
+"""
+Reverse execution: step a machine backwards through an undo log.
+"""
+from collections import deque
+from amitayh.mano.computer import RunResult, HALTED, INSTRUCTION_LIMIT
+from amitayh.mano.snapshot import REGISTERS
+
+
+class History(object):
+    """
+    Runs a machine one instruction at a time, recording what each
+    instruction changed (registers, counters, the memory words it wrote
+    and the bank of a BankedMemory) in a ring of the last `size`
+    instructions, plus a full checkpoint every `checkpoint_interval`
+    instructions. Stepping back within the ring undoes deltas; going
+    further restores a checkpoint and replays forward from it.
+
+    The machine is only instrumented while a History is attached, so it
+    costs nothing otherwise.
+    """
+    def __init__(self, computer, size=1 << 16, checkpoint_interval=4096,
+                 checkpoints=16):
+        self.computer = computer
+        self.deltas = deque(maxlen=size)
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoints = deque(maxlen=checkpoints)
+        self.registers = [getattr(computer, name) for name in REGISTERS]
+        self.writes = None
+        self.position = 0
+        self.attach()
+        self.checkpoint()
+
+    def attach(self):
+        self.computer.ram = RecordingMemory(self.computer.ram, self)
+
+    def close(self):
+        """
+        Detach from the machine
+        """
+        self.computer.ram = self.computer.ram.memory
+
+    def checkpoint(self):
+        self.checkpoints.append((self.position, self.computer.snapshot()))
+
+    def step(self):
+        """
+        Execute and record one instruction
+        """
+        computer = self.computer
+        if computer.s.word == 0:
+            return RunResult(HALTED, 0, 0)
+
+        registers = tuple(register.word for register in self.registers)
+        counters = (computer.cycles, computer.instructions,
+                    computer.interrupts)
+        bank = computer.ram.bank
+        self.writes = writes = []
+        result = computer.resume(max_instructions=1)
+        self.writes = None
+
+        changed = tuple(
+            (index, word) for index, (register, word) in
+            enumerate(zip(self.registers, registers))
+            if register.word != word)
+        self.deltas.append((changed, counters, writes, bank))
+        self.position += 1
+        if self.position % self.checkpoint_interval == 0:
+            self.checkpoint()
+
+        return result
+
+    def run(self, max_instructions=None):
+        """
+        Execute and record instructions until the machine halts (or
+        max_instructions were executed)
+        """
+        computer = self.computer
+        cycles, instructions = computer.cycles, computer.instructions
+        reason = HALTED
+        while computer.s.word == 1:
+            if (max_instructions is not None and
+                    computer.instructions - instructions >= max_instructions):
+                reason = INSTRUCTION_LIMIT
+                break
+            result = self.step()
+            if result.reason not in (HALTED, INSTRUCTION_LIMIT):
+                reason = result.reason
+                break
+
+        return RunResult(reason, computer.cycles - cycles,
+                         computer.instructions - instructions)
+
+    def step_back(self, n=1):
+        """
+        Undo the last n steps (fewer if the history doesn't go back that
+        far). Returns the number of steps undone.
+        """
+        target = max(self.position - n, self.oldest())
+        undone = self.position - target
+        if undone <= len(self.deltas):
+            for _ in range(undone):
+                self.undo(self.deltas.pop())
+            self.position = target
+        else:
+            self.replay(target)
+
+        return undone
+
+    def run_back_to(self, pc):
+        """
+        Step back to the latest recorded point where the machine was
+        about to execute the instruction at pc. Returns the number of steps
+        undone, or None (without moving) if pc isn't in the undo ring.
+        """
+        current = self.computer.pc.word
+        index = REGISTERS.index('pc')
+        for steps, (changed, counters, writes, bank) in \
+                enumerate(reversed(self.deltas), 1):
+            for register, word in changed:
+                if register == index:
+                    current = word
+            if current == pc:
+                return self.step_back(steps)
+
+        return None
+
+    def oldest(self):
+        """
+        Position of the oldest state the history can return to
+        """
+        return min(self.position - len(self.deltas), self.checkpoints[0][0])
+
+    def undo(self, delta):
+        changed, counters, writes, bank = delta
+        computer = self.computer
+        for index, word in changed:
+            self.registers[index].word = word
+        computer.cycles, computer.instructions, computer.interrupts = \
+            counters
+        # An instruction's writes go to the bank selected when it started
+        # (SBK itself writes nothing)
+        memory = computer.ram.memory
+        if memory.bank != bank:
+            computer.select_bank(bank)
+        for address, word in reversed(writes):
+            memory.write(address, word)
+
+    def replay(self, target):
+        """
+        Restore the latest checkpoint before target and execute forward
+        """
+        while self.checkpoints[-1][0] > target:
+            self.checkpoints.pop()
+        position, snapshot = self.checkpoints[-1]
+        self.computer.restore(snapshot)
+        self.attach()
+        self.deltas.clear()
+        self.position = position
+        for _ in range(target - position):
+            self.step()
+
+
+class RecordingMemory(object):
+    """
+    Wraps a machine's memory, recording the old value of every word
+    written while a History step is in progress
+    """
+    def __init__(self, memory, history):
+        self.memory = memory
+        self.history = history
+        self.read = memory.read
+
+    def write(self, address, word):
+        writes = self.history.writes
+        if writes is not None:
+            writes.append((address, self.memory.read(address)))
+        self.memory.write(address, word)
+
+    def write_block(self, address, words):
+        writes = self.history.writes
+        if writes is not None:
+            for offset in range(len(words)):
+                writes.append((address + offset,
+                               self.memory.read(address + offset)))
+        self.memory.write_block(address, words)
+
+    def __getattr__(self, name):
+        return getattr(self.memory, name)
@@ -0,0 +1,335 @@
+"""
+Basic block translation: straight-line runs of instructions are compiled
+to Python functions that keep the registers in local variables.
+"""
+from timeit import default_timer
+from amitayh.mano.computer import RunResult, NEVER, CHUNK, HALTED, \
+    CYCLE_LIMIT, INSTRUCTION_LIMIT, TIMEOUT, INFINITE_LOOP
+from amitayh.mano.decoder import CYCLES, DECODED
+from amitayh.mano.fast import FastComputer, MAX_CYCLES
+from amitayh.mano.logger import INSTRUCTION
+from amitayh.mano.memory import Memory
+
+# Longest block translated, and the most cycles it can take
+MAX_BLOCK = 64
+BLOCK_CYCLES = MAX_BLOCK * MAX_CYCLES
+
+# Compiled blocks by source, shared by all machines running the same code
+CODE_CACHE_SIZE = 4096
+code_cache = {}
+
+
+class BlockComputer(FastComputer):
+    """
+    Executes translated basic blocks. A block ends at a branch (BUN, BSA,
+    ISZ, a skip instruction or HLT) and never contains IO instructions,
+    which run through FastComputer.step() like everything else that needs
+    per-instruction checks: a pending interrupt, an event within one block
+    of being due while interrupts are enabled, or a limit within one block
+    of being reached. Blocks are cached by start address and
+    dropped when a word they cover is written, or when SBK switches banks.
+
+    The cache is flushed at the start of every resume(), so memory may be
+    changed freely between runs. Compiled code is kept in a module-level
+    cache, so re-translating the same block is cheap. While instructions
+    are logged or a Profiler is attached, it runs like a FastComputer.
+    """
+    def __init__(self, logger=None, memory=None):
+        super(BlockComputer, self).__init__(logger, memory)
+        self.blocks_executed = 0
+        self.flush()
+
+    def flush(self):
+        """
+        Drop all translated blocks
+        """
+        self.blocks = {}
+        self.extents = {}
+        self.covering = bytearray(self.ram.size)
+        self.covered_by = {}
+
+    def select_bank(self, bank):
+        """
+        Switching banks changes the code in the window, so all blocks are
+        dropped (in place, as resume() holds on to the cache)
+        """
+        super(BlockComputer, self).select_bank(bank)
+        self.blocks.clear()
+        self.extents.clear()
+        self.covering[:] = bytes(len(self.covering))
+        self.covered_by.clear()
+
+    def invalidate(self, address):
+        """
+        Drop the blocks covering address
+        """
+        for start in self.covered_by.pop(address, ()):
+            if start not in self.blocks:
+                continue
+            del self.blocks[start]
+            for covered in range(start, self.extents.pop(start)):
+                self.covering[covered] -= 1
+                starts = self.covered_by.get(covered)
+                if starts is not None and start in starts:
+                    starts.remove(start)
+
+    def memory_write(self, target_register):
+        """
+        Stores made through step() (the interrupt cycle, or instructions
+        run one at a time near an event or a limit) drop the blocks they
+        overwrite too, like stores made by a block
+        """
+        address = self.ar.word
+        self.ram.write(address, target_register.word)
+        if self.covering[address]:
+            self.invalidate(address)
+
+    def resume(self, max_cycles=None, max_instructions=None, timeout=None):
+        if self.instrumented or self.logger.is_enabled_for(INSTRUCTION):
+            return super(BlockComputer, self).resume(
+                max_cycles, max_instructions, timeout)
+
+        self.flush()
+        cycles = start_cycles = self.cycles
+        instructions = start_instructions = self.instructions
+        cycle_limit = NEVER if max_cycles is None else cycles + max_cycles
+        instruction_limit = NEVER
+        if max_instructions is not None:
+            instruction_limit = instructions + max_instructions
+        deadline = NEVER if timeout is None else default_timer() + timeout
+        blocks = self.blocks
+        translate = self.translate
+        step = self.step
+        s, pc, r, ien = self.s, self.pc, self.r, self.ien
+        executed = 0
+
+        reason = HALTED
+        while s.word == 1:
+            if cycles >= cycle_limit:
+                reason = CYCLE_LIMIT
+                break
+            if instructions >= instruction_limit:
+                reason = INSTRUCTION_LIMIT
+                break
+            if default_timer() >= deadline:
+                reason = TIMEOUT
+                break
+
+            # Whole blocks may only run while they can't overshoot a limit.
+            # An event already due (attach() sets next_event to 0) is
+            # serviced at the next instruction boundary, like FastComputer
+            # does, so device latencies are measured from the same cycle.
+            block_instructions = min(instructions + CHUNK,
+                                     instruction_limit - MAX_BLOCK)
+            block_cycles = min(cycles + CHUNK * MAX_CYCLES,
+                               cycle_limit - BLOCK_CYCLES)
+            if (instructions >= block_instructions or
+                    cycles >= block_cycles or r.word or
+                    cycles >= self.next_event or
+                    ien.word and self.next_event - cycles <= BLOCK_CYCLES):
+                interrupts = self.interrupts
+                cycles += step()
+                instructions += 1 - (self.interrupts - interrupts)
+                if cycles >= self.next_event and self.service_events(cycles):
+                    cycles, instructions = self.skip_polling(
+                        cycles, instructions, cycle_limit, instruction_limit)
+                continue
+
+            # Devices are serviced between blocks, which is soon enough:
+            # blocks contain no IO instructions to observe the flags (or
+            # to ask for a service), and with interrupts enabled no block
+            # runs past an event
+            while (s.word == 1 and instructions < block_instructions and
+                   cycles < block_cycles and not (
+                       ien.word and
+                       self.next_event - cycles <= BLOCK_CYCLES)):
+                block = blocks.get(pc.word) or translate(pc.word)
+                count, block_cycles_run = block(self)
+                instructions += count
+                cycles += block_cycles_run
+                executed += 1
+                if cycles >= self.next_event and self.service_events(cycles):
+                    cycles, instructions = self.skip_polling(
+                        cycles, instructions, cycle_limit, instruction_limit)
+
+            if s.word == 1 and self.is_infinite_loop():
+                reason = INFINITE_LOOP
+                break
+
+        self.cycles = cycles
+        self.instructions = instructions
+        self.blocks_executed += executed
+        self.flush_devices()
+
+        return RunResult(reason, cycles - start_cycles,
+                         instructions - start_instructions)
+
+    def translate(self, start):
+        """
+        Compile the block starting at start and cache it
+        """
+        source, end = translate_block(self.ram, start)
+        if source is None:
+            block = step_block
+        else:
+            code = code_cache.get(source)
+            if code is None:
+                if len(code_cache) >= CODE_CACHE_SIZE:
+                    code_cache.clear()
+                code = compile(source, '<block %03X>' % start, 'exec')
+                code_cache[source] = code
+            namespace = self.namespace()
+            exec(code, namespace)
+            block = namespace['block']
+
+        self.blocks[start] = block
+        self.extents[start] = end
+        for address in range(start, end):
+            self.covering[address] += 1
+            self.covered_by.setdefault(address, []).append(start)
+
+        return block
+
+    def namespace(self):
+        ram = self.ram
+        namespace = {'covering': self.covering,
+                     'read': ram.read, 'write': ram.write}
+        if type(ram) is Memory:
+            namespace['data'] = ram.data
+
+        return namespace
+
+
+def step_block(computer):
+    """
+    Block of a single instruction that isn't translated (IO)
+    """
+    return 1, computer.step()
+
+
+def translate_block(ram, start):
+    """
+    Python source of the block starting at start, and the address after
+    its last instruction. The source is None if the first instruction
+    can't be translated.
+    """
+    if type(ram) is Memory:
+        read, write = 'data[%s]', 'data[%s] = %s'
+    else:
+        read, write = 'read(%s)', 'write(%s, %s)'
+
+    body = []
+    count = cycles = 0
+    address = start
+    ends_block = False
+    while not ends_block and count < MAX_BLOCK and address < ram.size:
+        word = ram.read(address)
+        opcode, indirect, bit = DECODED[word]
+        if opcode == 7 and indirect:
+            break
+
+        next_address = (address + 1) & 0xFFF
+        skip_address = (address + 2) & 0xFFF
+        count += 1
+        cycles += CYCLES[opcode]
+        exit_state = (count, cycles, next_address)
+
+        lines = ['ir = 0x%04X' % word]
+        if opcode != 7 and indirect:
+            pointer = read % '0x%03X' % (word & 0xFFF)
+            lines.append('ar = %s & 0xFFF' % pointer)
+        else:
+            lines.append('ar = 0x%03X' % (word & 0xFFF))
+
+        ends_block = True
+        if opcode == 0:
+            lines += ['dr = %s' % (read % 'ar'), 'ac &= dr']
+            ends_block = False
+        elif opcode == 1:
+            lines += ['dr = %s' % (read % 'ar'), 'ac += dr', 'e = ac >> 16',
+                      'ac &= 0xFFFF']
+            ends_block = False
+        elif opcode == 2:
+            lines += ['dr = %s' % (read % 'ar'), 'ac = dr']
+            ends_block = False
+        elif opcode == 3:
+            lines += [write % ('ar', 'ac'), 'if covering[ar]:']
+            lines += ['    ' + line for line in exit_lines(*exit_state)]
+            lines[-1:-1] = ['    c.invalidate(ar)']
+            ends_block = False
+        elif opcode == 4:
+            lines.append('pc = ar')
+        elif opcode == 5:
+            lines += [write % ('ar', '0x%03X' % next_address),
+                      'if covering[ar]:', '    c.invalidate(ar)',
+                      'ar = (ar + 1) & 0xFFF', 'pc = ar']
+        elif opcode == 6:
+            lines += ['dr = (%s + 1) & 0xFFFF' % (read % 'ar'),
+                      write % ('ar', 'dr'),
+                      'if covering[ar]:', '    c.invalidate(ar)',
+                      'pc = 0x%03X if dr == 0 else 0x%03X' % (
+                          skip_address, next_address)]
+        else:
+            lines += register_reference(bit, next_address, skip_address)
+            ends_block = bit is not None and bit <= 4
+
+        if not ends_block:
+            lines.append('pc = 0x%03X' % next_address)
+        body += lines
+        address += 1
+
+    if count == 0:
+        return None, start + 1
+
+    source = ['def block(c):',
+              '    ac = c.ac.word',
+              '    e = c.e.word',
+              '    dr = c.dr.word']
+    source += ['    ' + line for line in body]
+    source += ['    ' + line for line in exit_lines(count, cycles, None)]
+
+    return '\n'.join(source) + '\n', address
+
+
+def exit_lines(count, cycles, pc):
+    """
+    Store the local registers back and return (instructions, cycles)
+    """
+    lines = []
+    if pc is not None:
+        lines.append('pc = 0x%03X' % pc)
+    lines += ['c.ac.word = ac', 'c.e.word = e', 'c.dr.word = dr',
+              'c.ar.word = ar', 'c.ir.word = ir', 'c.pc.word = pc',
+              'return %d, %d' % (count, cycles)]
+
+    return lines
+
+
+def register_reference(bit, next_address, skip_address):
+    skip = 'pc = 0x%03X if %%s else 0x%03X' % (skip_address, next_address)
+    if bit == 11:
+        return ['ac = 0']
+    if bit == 10:
+        return ['e = 0']
+    if bit == 9:
+        return ['ac ^= 0xFFFF']
+    if bit == 8:
+        return ['e ^= 1']
+    if bit == 7:
+        return ['ac, e = (ac >> 1) | (e << 15), ac & 1']
+    if bit == 6:
+        return ['ac, e = ((ac << 1) & 0xFFFF) | e, ac >> 15']
+    if bit == 5:
+        return ['ac = (ac + 1) & 0xFFFF']
+    if bit == 4:
+        return [skip % 'not ac & 0x800']
+    if bit == 3:
+        return [skip % 'ac & 0x800']
+    if bit == 2:
+        return [skip % 'ac == 0']
+    if bit == 1:
+        return [skip % 'e == 0']
+    if bit == 0:
+        return ['c.s.word = 0', 'pc = 0x%03X' % next_address]
+
+    return []
@@ -1,12 +1,77 @@
+from collections import deque
+
+# Log levels
+MICRO_OPERATION = 10    # Register transfer of every clock (Computer)
+INSTRUCTION = 20        # Address and word of every instruction (FastComputer)
+
+
 class Logger(object):
-    def __init__(self):
+    """
+    Keeps every message in memory. The engines ask is_enabled_for() once
+    when a logger is attached and don't build or pass messages below the
+    logger's level at all.
+    """
+    enabled = True
+
+    def __init__(self, level=MICRO_OPERATION):
+        self.level = level
         self.messages = []
 
+    def is_enabled_for(self, level):
+        return self.enabled and level >= self.level
+
     def log(self, message):
         self.messages.append(message)
 
     def __str__(self):
         if self.messages:
-            return 'Logger(last_message="%s")' % self.messages[-1]
+            return '%s(last_message="%s")' % (
+                type(self).__name__, self.messages[-1])
+
+        return '%s()' % type(self).__name__
+
+
+class NullLogger(Logger):
+    """
+    Discards everything. Engines detect it and skip logging entirely.
+    """
+    enabled = False
+
+    def __init__(self):
+        super(NullLogger, self).__init__()
+        self.messages = ()
+
+    def log(self, message):
+        pass
+
+
+class RingLogger(Logger):
+    """
+    Keeps only the last `size` messages, for post-mortem debugging
+    """
+    def __init__(self, size=1024, level=MICRO_OPERATION):
+        super(RingLogger, self).__init__(level)
+        self.messages = deque(maxlen=size)
 
-        return 'Logger()'
\ No newline at end of file
+
+class StreamLogger(Logger):
+    """
+    Writes messages to a file-like stream, one per line, in batches of
+    `batch_size`. Call flush() to write out the pending batch.
+    """
+    def __init__(self, stream, batch_size=1024, level=MICRO_OPERATION):
+        super(StreamLogger, self).__init__(level)
+        self.stream = stream
+        self.batch_size = batch_size
+
+    def log(self, message):
+        messages = self.messages
+        messages.append(message)
+        if len(messages) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.messages:
+            self.stream.write('\n'.join(self.messages) + '\n')
+            self.messages = []
+        self.stream.flush()
@@ -0,0 +1,414 @@
+import copy
+import mmap
+import random
+import sys
+from array import array
+
+# Words per page (copy-on-write unit, and serialization unit)
+PAGE_SIZE = 256
+
+# State hashing (see HashedMemory): a random odd 64-bit key per address,
+# the same in every run
+HASH_MASK = (1 << 64) - 1
+HASH_SEED = 0x4D414E4F
+hash_keys = array('Q')
+
+
+class Memory(object):
+    """
+    Word addressable memory of 16-bit words. Images (load_image / dump)
+    store each word as 2 little-endian bytes.
+    """
+    bank = 0                            # Only BankedMemory has banks
+
+    def __init__(self, size):
+        self.size = size
+        self.data = array('H', [0]) * size
+
+    def write(self, address, word):
+        self.data[address] = word & 0xFFFF
+
+    def read(self, address):
+        return self.data[address]
+
+    def write_block(self, address, words):
+        """
+        Write a sequence of words starting at address in one bulk copy
+        """
+        if not isinstance(words, array):
+            words = array('H', [word & 0xFFFF for word in words])
+        end = address + len(words)
+        if address < 0 or end > self.size:
+            raise IndexError('Block %d-%d out of range' % (address, end))
+        self.data[address:end] = words
+
+    def load_image(self, image, address=0):
+        words = array('H')
+        words.frombytes(image)
+        if sys.byteorder == 'big':
+            words.byteswap()
+        self.write_block(address, words)
+
+    def dump(self):
+        if sys.byteorder == 'big':
+            words = array('H', self.data)
+            words.byteswap()
+            return words.tobytes()
+
+        return self.data.tobytes()
+
+    def select(self, bank):
+        """
+        Select the bank mapped to the window (see BankedMemory), which
+        plain memory doesn't have
+        """
+
+    def clear(self):
+        """
+        Zero all words in place
+        """
+        self.data[:] = array('H', [0]) * self.size
+
+    def fork(self):
+        """
+        Independent copy of the memory
+        """
+        memory = Memory(0)
+        memory.size = self.size
+        memory.data = array('H', self.data)
+
+        return memory
+
+    def dirty_pages(self):
+        """
+        (address, words) of every page that was written. Plain memory
+        doesn't track writes, so these are all the non-zero pages.
+        """
+        zero = array('H', [0]) * PAGE_SIZE
+        for address in range(0, self.size, PAGE_SIZE):
+            words = array('H', self.data[address:address + PAGE_SIZE])
+            if words != zero[:len(words)]:
+                yield address, words
+
+    def __str__(self):
+        return 'Memory(size=%dK)' % (self.size / 1024)
+
+
+class PagedMemory(Memory):
+    """
+    Memory split to pages that forks share until one of them writes to
+    the page (copy-on-write). Unwritten pages all share one zero page.
+    """
+    def __init__(self, size, page_size=PAGE_SIZE):
+        if page_size & (page_size - 1):
+            raise ValueError('Page size must be a power of 2')
+        self.size = size
+        self.page_size = page_size
+        self.shift = page_size.bit_length() - 1
+        self.offset_mask = page_size - 1
+        count = (size + page_size - 1) // page_size
+        self.pages = [array('H', [0]) * page_size] * count
+        self.shared = bytearray([1]) * count
+        self.dirty = bytearray(count)
+
+    def write(self, address, word):
+        index = address >> self.shift
+        if self.shared[index]:
+            self.own(index)
+        self.pages[index][address & self.offset_mask] = word & 0xFFFF
+
+    def read(self, address):
+        return self.pages[address >> self.shift][address & self.offset_mask]
+
+    def clear(self):
+        self.pages = [array('H', [0]) * self.page_size] * len(self.pages)
+        self.shared = bytearray([1]) * len(self.pages)
+        self.dirty = bytearray(len(self.pages))
+
+    def own(self, index):
+        """
+        Make a private copy of a shared page before writing to it
+        """
+        self.pages[index] = array('H', self.pages[index])
+        self.shared[index] = 0
+        self.dirty[index] = 1
+
+    def write_block(self, address, words):
+        if not isinstance(words, array):
+            words = array('H', [word & 0xFFFF for word in words])
+        end = address + len(words)
+        if address < 0 or end > self.size:
+            raise IndexError('Block %d-%d out of range' % (address, end))
+
+        position = 0
+        while address < end:
+            index = address >> self.shift
+            offset = address & self.offset_mask
+            count = min(self.page_size - offset, end - address)
+            if self.shared[index]:
+                self.own(index)
+            self.pages[index][offset:offset + count] = \
+                words[position:position + count]
+            address += count
+            position += count
+
+    def dump(self):
+        words = array('H')
+        for page in self.pages:
+            words.extend(page)
+        del words[self.size:]
+        if sys.byteorder == 'big':
+            words.byteswap()
+
+        return words.tobytes()
+
+    def fork(self):
+        """
+        Copy of the memory sharing all pages with this one
+        """
+        memory = copy.copy(self)
+        memory.pages = list(self.pages)
+        memory.dirty = bytearray(self.dirty)
+        self.shared = bytearray([1]) * len(self.pages)
+        memory.shared = bytearray(self.shared)
+
+        return memory
+
+    def dirty_pages(self):
+        for index, page in enumerate(self.pages):
+            if self.dirty[index]:
+                address = index << self.shift
+                yield address, page[:self.size - address]
+
+    def __str__(self):
+        return 'PagedMemory(size=%dK)' % (self.size / 1024)
+
+
+class BankedMemory(Memory):
+    """
+    Extended memory seen through the address space of `size` words.
+    Addresses below `window` always refer to the same (common) words, the
+    rest of the address space is a window onto one of `banks` banks,
+    selected by the bank register (SBK / LBK instructions). Bank 0 is the
+    upper part of a plain memory, so physical addresses are contiguous:
+    the window of bank b starts at window + b * (size - window).
+
+    Pages are allocated when first written, so only the pages touched
+    cost memory however many banks there are.
+    """
+    def __init__(self, banks, window=0x800, size=1024 * 4,
+                 page_size=PAGE_SIZE):
+        if page_size & (page_size - 1):
+            raise ValueError('Page size must be a power of 2')
+        if not 0 <= window < size:
+            raise ValueError('Window must start inside the address space')
+        self.size = size
+        self.window = window
+        self.banks = banks
+        self.bank_size = size - window
+        self.capacity = window + banks * self.bank_size
+        self.page_size = page_size
+        self.shift = page_size.bit_length() - 1
+        self.offset_mask = page_size - 1
+        self.pages = {}
+        self.select(0)
+
+    def select(self, bank):
+        """
+        Map a bank (modulo the number of banks) to the window
+        """
+        self.bank = bank % self.banks
+        self.offset = self.bank * self.bank_size
+
+    def clear(self):
+        self.pages.clear()
+        self.select(0)
+
+    def physical(self, address):
+        """
+        Physical address of an address in the current bank
+        """
+        return address + self.offset if address >= self.window else address
+
+    def read(self, address):
+        if address >= self.window:
+            address += self.offset
+        page = self.pages.get(address >> self.shift)
+        if page is None:
+            return 0
+
+        return page[address & self.offset_mask]
+
+    def write(self, address, word):
+        if address >= self.window:
+            address += self.offset
+        index = address >> self.shift
+        page = self.pages.get(index)
+        if page is None:
+            page = self.pages[index] = array('H', [0]) * self.page_size
+        page[address & self.offset_mask] = word & 0xFFFF
+
+    def write_block(self, address, words):
+        """
+        Write words starting at address in the current bank
+        """
+        end = address + len(words)
+        if address < 0 or end > self.size:
+            raise IndexError('Block %d-%d out of range' % (address, end))
+        for offset, word in enumerate(words):
+            self.write(address + offset, word)
+
+    def dump(self):
+        """
+        Image of the whole physical memory (all banks)
+        """
+        words = array('H', [0]) * self.capacity
+        for address, page in self.dirty_pages():
+            words[address:address + len(page)] = page
+        if sys.byteorder == 'big':
+            words.byteswap()
+
+        return words.tobytes()
+
+    def fork(self):
+        memory = copy.copy(self)
+        memory.pages = dict((index, array('H', page))
+                            for index, page in self.pages.items())
+
+        return memory
+
+    def dirty_pages(self):
+        for index in sorted(self.pages):
+            address = index << self.shift
+            yield address, self.pages[index][:self.capacity - address]
+
+    def __str__(self):
+        return 'BankedMemory(size=%dK, banks=%d, bank=%d)' % (
+            self.size / 1024, self.banks, self.bank)
+
+
+class HashedMemory(Memory):
+    """
+    Memory that keeps a Zobrist-style hash of its contents up to date:
+    the XOR of word_hash() of every word, updated by each write in O(1).
+    Zero words don't contribute, so equal contents always hash the same.
+    """
+    def __init__(self, size):
+        super(HashedMemory, self).__init__(size)
+        self.keys = address_keys(size)
+        self.hash = 0
+
+    def write(self, address, word):
+        word &= 0xFFFF
+        data = self.data
+        old = data[address]
+        if old != word:
+            key = self.keys[address]
+            before = (key * old) & HASH_MASK
+            after = (key * word) & HASH_MASK
+            self.hash ^= (before ^ (before >> 29) ^ after ^ (after >> 29))
+            data[address] = word
+
+    def write_block(self, address, words):
+        old = self.data[address:address + len(words)]
+        super(HashedMemory, self).write_block(address, words)
+        keys, data = self.keys, self.data
+        for offset, word in enumerate(old):
+            if word != data[address + offset]:
+                key = keys[address + offset]
+                self.hash ^= word_hash(key, word) ^ \
+                    word_hash(key, data[address + offset])
+
+    def clear(self):
+        super(HashedMemory, self).clear()
+        self.hash = 0
+
+    def rehash(self):
+        """
+        Recompute the hash from scratch (after data was changed directly)
+        """
+        self.hash = memory_hash(self)
+
+    def fork(self):
+        memory = copy.copy(self)
+        memory.data = array('H', self.data)
+
+        return memory
+
+    def __str__(self):
+        return 'HashedMemory(size=%dK)' % (self.size / 1024)
+
+
+def address_keys(size):
+    """
+    Hash keys of the addresses below size
+    """
+    global hash_keys
+    if len(hash_keys) < size:
+        generator = random.Random(HASH_SEED)
+        hash_keys = array('Q', [generator.getrandbits(64) | 1
+                                for _ in range(size)])
+
+    return hash_keys
+
+
+def word_hash(key, word):
+    """
+    Contribution of a word to the hash, given the key of its address
+    """
+    value = (key * word) & HASH_MASK
+
+    return value ^ (value >> 29)
+
+
+def memory_hash(memory):
+    """
+    Hash of a memory's contents, computed in full (O(size)). Equals
+    HashedMemory.hash for the same contents.
+    """
+    keys = address_keys(memory.size)
+    value = 0
+    for address in range(memory.size):
+        word = memory.read(address)
+        if word:
+            value ^= word_hash(keys[address], word)
+
+    return value
+
+
+class MappedMemory(Memory):
+    """
+    Memory backed by a memory mapped image file. Loading is instant, and
+    writes go straight to the file so it can be inspected externally.
+    """
+    def __init__(self, path, size=None):
+        if sys.byteorder != 'little':
+            raise NotImplementedError('Mapped images are little-endian')
+        with open(path, 'r+b') as image:
+            self.mmap = mmap.mmap(image.fileno(), 0)
+        self.data = memoryview(self.mmap).cast('H')
+        self.size = len(self.data)
+        if size is not None and size != self.size:
+            self.close()
+            raise ValueError('Image has %d words, expected %d' % (
+                self.size, size))
+
+    @classmethod
+    def create(cls, path, size):
+        """
+        Create a zeroed image file of `size` words and map it
+        """
+        with open(path, 'wb') as image:
+            image.truncate(size * 2)
+
+        return cls(path)
+
+    def dump(self):
+        return self.data.tobytes()
+
+    def flush(self):
+        self.mmap.flush()
+
+    def close(self):
+        self.data.release()
+        self.mmap.close()
@@ -0,0 +1,133 @@
+"""
+Binary object file: an assembled program (or a memory image) ready to be
+copied into memory without parsing.
+
+    header      magic 'MANO', version, entry point (0xFFFF for none),
+                segment count, symbol count
+    segments    for each segment its origin, length in words and the
+                little-endian words themselves
+    symbols     the symbols' addresses (little-endian words), the length
+                of their names in bytes, and the UTF-8 names separated
+                by newlines
+"""
+import struct
+import sys
+from array import array
+from amitayh.mano.snapshot import words_to_bytes
+
+MAGIC = b'MANO'
+VERSION = 1
+
+NO_ENTRY = 0xFFFF
+
+HEADER = struct.Struct('<4sBHII')
+SEGMENT = struct.Struct('<II')
+LENGTH = struct.Struct('<I')
+
+
+class ObjectFile(object):
+    """
+    Entry point (or None), segments as (origin, image) pairs where image is
+    the segment's words as little-endian bytes, and a symbol table mapping
+    labels to addresses. A symbol table read from a file is only decoded
+    when first used, so loading doesn't pay for it.
+    """
+    def __init__(self, entry, segments, symbols=None):
+        self.entry = entry
+        self.segments = segments
+        self._symbols = symbols or {}
+        self.symbol_data = None
+
+    @property
+    def symbols(self):
+        if self.symbol_data is not None:
+            addresses, names = self.symbol_data
+            words = array('H')
+            words.frombytes(addresses)
+            if sys.byteorder == 'big':
+                words.byteswap()
+            self._symbols = {}
+            if words:
+                self._symbols = dict(zip(
+                    bytes(names).decode('utf-8').split('\n'), words))
+            self.symbol_data = None
+
+        return self._symbols
+
+    @classmethod
+    def from_assembler(cls, assembler):
+        program_start, segments, address_table = assembler.translate()
+        segments = [(origin, words_to_bytes(words))
+                    for origin, words in segments]
+
+        return cls(program_start, segments, dict(address_table))
+
+    @classmethod
+    def from_memory(cls, memory, entry=None):
+        """
+        Image of the non-zero pages of a memory
+        """
+        segments = [(address, words_to_bytes(words))
+                    for address, words in memory.dirty_pages()]
+
+        return cls(entry, segments)
+
+    def load(self, memory):
+        """
+        Copy the segments to memory (one bulk copy per segment), return
+        the entry point
+        """
+        for origin, image in self.segments:
+            memory.load_image(image, origin)
+
+        return self.entry
+
+    def to_bytes(self):
+        entry = NO_ENTRY if self.entry is None else self.entry
+        chunks = [HEADER.pack(MAGIC, VERSION, entry, len(self.segments),
+                              len(self.symbols))]
+        for origin, image in self.segments:
+            chunks.append(SEGMENT.pack(origin, len(image) // 2))
+            chunks.append(image)
+        labels = sorted(self.symbols)
+        names = '\n'.join(labels).encode('utf-8')
+        chunks.append(words_to_bytes(self.symbols[label] for label in labels))
+        chunks.append(LENGTH.pack(len(names)))
+        chunks.append(names)
+
+        return b''.join(chunks)
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = memoryview(data)
+        magic, version, entry, segment_count, symbol_count = \
+            HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a version %d object file' % VERSION)
+        offset = HEADER.size
+
+        segments = []
+        for _ in range(segment_count):
+            origin, length = SEGMENT.unpack_from(data, offset)
+            offset += SEGMENT.size
+            segments.append((origin, data[offset:offset + length * 2]))
+            offset += length * 2
+
+        addresses = data[offset:offset + symbol_count * 2]
+        offset += symbol_count * 2
+        length, = LENGTH.unpack_from(data, offset)
+        offset += LENGTH.size
+
+        object_file = cls(None if entry == NO_ENTRY else entry, segments)
+        object_file.symbol_data = (addresses, data[offset:offset + length])
+
+        return object_file
+
+    def save(self, path):
+        with open(path, 'wb') as object_file:
+            object_file.write(self.to_bytes())
+
+    @classmethod
+    def load_file(cls, path):
+        with open(path, 'rb') as object_file:
+            return cls.from_bytes(object_file.read())
@@ -0,0 +1,251 @@
+"""
+Execution profiles: instructions and cycles per address, per instruction
+and (for the cycle-accurate Computer) per micro-operation, plus call
+stacks recovered from BSA calls and BUN ... I returns.
+"""
+from array import array
+from bisect import bisect_right
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.computer import replace_attributes, restore_attributes
+from amitayh.mano.control import STATEMENTS, STATEMENT_ROWS
+from amitayh.mano.decoder import build_table, decode
+
+INTERRUPT = 'INT'
+UNKNOWN = '???'
+
+# Sorts after any label
+MAX_LABEL = chr(0x10FFFF)
+
+
+def instruction_name(word):
+    """
+    Mnemonic of an instruction word ('ADD I', 'CLA', ...)
+    """
+    opcode, indirect, bit = decode(word)
+    if opcode != 7:
+        name = MRI_NAMES[opcode]
+        return name + ' I' if indirect else name
+
+    names = IO_NAMES if indirect else RRI_NAMES
+    return names.get(bit, UNKNOWN)
+
+
+MRI_NAMES = dict((word >> 12, name) for name, word in Assembler.mri.items())
+RRI_NAMES = dict((decode(word)[2], name)
+                 for name, word in Assembler.rri.items())
+IO_NAMES = dict((decode(word)[2], name)
+                for name, word in Assembler.io.items())
+
+# Instruction names (and the interrupt cycle), and the index of every
+# word's name in NAMES
+NAMES = sorted(set(build_table(instruction_name))) + [INTERRUPT]
+INTERRUPT_INDEX = len(NAMES) - 1
+NAME_INDEX = array('B', (NAMES.index(name)
+                         for name in build_table(instruction_name)))
+
+
+class Profiler(object):
+    """
+    Counts instructions and cycles per address and per instruction while
+    attached to a machine. Attaching replaces the machine's step() (or
+    tick() for Computer) with a counting wrapper; nothing is counted, and
+    nothing costs anything, before attach or after close(). While profiled,
+    a BlockComputer runs instruction by instruction and idle polling loops
+    are stepped through rather than skipped, so every iteration counts.
+    Micro-operations are counted by their number in the control table.
+
+    The call stack starts empty at attach. BSA pushes a frame for its
+    target; a BUN ... I through the word a frame's BSA wrote pops it (and
+    any frames above it), as does the BUN 0 I ending an interrupt.
+    """
+    def __init__(self, computer, assembler=None):
+        self.computer = computer
+        self.assembler = assembler
+        size = computer.ram.size
+        self.executions = array('L', bytes(size * array('L').itemsize))
+        self.cycles = array('Q', bytes(size * array('Q').itemsize))
+        self.name_executions = array('Q', bytes(len(NAMES) * 8))
+        self.name_cycles = array('Q', bytes(len(NAMES) * 8))
+        self.statement_counts = array(
+            'Q', bytes((len(STATEMENTS) + 1) * 8))   # By statement number
+        self.stack = ()
+        self.stacks = {(): 0}           # Stack -> index
+        self.stack_cycles = array('Q', [0])
+        self.stack_index = 0
+        self.pc = self.interrupt = None
+        self.instruction_cycles = 0
+        self.labels = None              # (address, label), sorted
+        self.attach()
+
+    def attach(self):
+        computer = self.computer
+        if hasattr(computer, 'step'):
+            self.step = computer.step
+            self.replaced = replace_attributes(
+                computer, step=self.counting_step, instrumented=True)
+        else:
+            self.tick = computer.tick
+            self.replaced = replace_attributes(
+                computer, tick=self.counting_tick, instrumented=True)
+
+    def close(self):
+        """
+        Detach from the machine
+        """
+        restore_attributes(self.computer, self.replaced)
+
+    def counting_step(self):
+        computer = self.computer
+        pc = computer.pc.word
+        interrupt = computer.r.word
+        cycles = self.step()
+        self.count(pc, interrupt, cycles)
+
+        return cycles
+
+    def counting_tick(self):
+        computer = self.computer
+        sc = computer.sc.word
+        if sc == 0:
+            self.pc = computer.pc.word
+            self.interrupt = computer.r.word
+            self.instruction_cycles = 0
+        # The micro-operation of this clock, as the control unit selects it
+        self.statement_counts[
+            STATEMENT_ROWS[computer.ir.word][computer.r.word][sc]] += 1
+        self.tick()
+        self.instruction_cycles += 1
+        if computer.sc.word == 0:
+            self.count(self.pc, self.interrupt, self.instruction_cycles)
+
+    def count(self, pc, interrupt, cycles):
+        computer = self.computer
+        self.stack_cycles[self.stack_index] += cycles
+        if interrupt:
+            self.name_executions[INTERRUPT_INDEX] += 1
+            self.name_cycles[INTERRUPT_INDEX] += cycles
+            self.push(0)
+            return
+
+        ir = computer.ir.word
+        name = NAME_INDEX[ir]
+        self.executions[pc] += 1
+        self.cycles[pc] += cycles
+        self.name_executions[name] += 1
+        self.name_cycles[name] += cycles
+        if ir & 0x7000 == 0x5000:
+            # BSA left AR at the first instruction of the subroutine
+            self.push((computer.ar.word - 1) & 0xFFF)
+        elif ir & 0xF000 == 0xC000:
+            self.pop(ir & 0xFFF)
+
+    def push(self, address):
+        self.enter(self.stack + (address,))
+
+    def pop(self, address):
+        stack = self.stack
+        if address in stack:
+            self.enter(stack[:len(stack) - stack[::-1].index(address) - 1])
+
+    def enter(self, stack):
+        self.stack = stack
+        index = self.stacks.get(stack)
+        if index is None:
+            index = self.stacks[stack] = len(self.stack_cycles)
+            self.stack_cycles.append(0)
+        self.stack_index = index
+
+    def label(self, address):
+        """
+        Address as the nearest label at or before it plus an offset
+        ('LOOP+2'), or as hex without an assembler
+        """
+        if self.labels is None:
+            table = {}
+            if self.assembler is not None:
+                table = self.assembler.address_table
+            self.labels = sorted((location, label)
+                                 for label, location in table.items())
+        index = bisect_right(self.labels, (address, MAX_LABEL)) - 1
+        if index < 0:
+            return '%03X' % address
+        location, label = self.labels[index]
+        if location == address:
+            return label
+
+        return '%s+%d' % (label, address - location)
+
+    def flat_profile(self, limit=None):
+        """
+        Rows of (address, label, source line, executions, cycles), most
+        cycles first
+        """
+        lines = {}
+        if self.assembler is not None:
+            lines = self.assembler.line_table()
+        rows = [(address, self.label(address), lines.get(address),
+                 self.executions[address], self.cycles[address])
+                for address in range(len(self.executions))
+                if self.executions[address]]
+        rows.sort(key=lambda row: (-row[4], row[0]))
+
+        return rows[:limit]
+
+    def instruction_profile(self):
+        """
+        Rows of (instruction, executions, cycles), most cycles first
+        """
+        rows = [(name, self.name_executions[index], self.name_cycles[index])
+                for index, name in enumerate(NAMES)
+                if self.name_executions[index]]
+        rows.sort(key=lambda row: (-row[2], row[0]))
+
+        return rows
+
+    def micro_operation_profile(self):
+        """
+        Rows of (micro-operation, count), most frequent first. Only the
+        cycle-accurate Computer has micro-operations.
+        """
+        counts = self.statement_counts
+        rows = [(statement, counts[number])
+                for number, statement in enumerate(STATEMENTS)
+                if counts[number]]
+        rows.sort(key=lambda row: (-row[1], row[0]))
+
+        return rows
+
+    def report(self, limit=20):
+        """
+        Flat profile as text
+        """
+        total = float(sum(self.cycles)) or 1.0
+        lines = ['%-4s %-16s %5s %12s %12s %6s' % (
+            'ADDR', 'LABEL', 'LINE', 'EXECUTIONS', 'CYCLES', '%')]
+        for address, label, line, executions, cycles in \
+                self.flat_profile(limit):
+            lines.append('%03X  %-16s %5s %12d %12d %6.2f' % (
+                address, label, '' if line is None else line, executions,
+                cycles, cycles * 100 / total))
+
+        return '\n'.join(lines)
+
+    def collapsed_stacks(self):
+        """
+        Cycles per call stack in the collapsed format read by flame graph
+        tools: 'main;FUNC;SUB 1234' per line
+        """
+        lines = []
+        for stack, index in sorted(self.stacks.items()):
+            cycles = self.stack_cycles[index]
+            if cycles:
+                frames = ['main'] + [
+                    INTERRUPT if address == 0 else self.label(address)
+                    for address in stack]
+                lines.append('%s %d' % (';'.join(frames), cycles))
+
+        return '\n'.join(lines)
+
+    def write_collapsed_stacks(self, path):
+        with open(path, 'w') as output:
+            output.write(self.collapsed_stacks() + '\n')
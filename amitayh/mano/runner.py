@@ -0,0 +1,100 @@
+"""
+Run many programs concurrently on a pool of worker processes.
+
+Usage: python -m amitayh.mano.runner [-w WORKERS] [-c MAX_CYCLES]
+                                     [-p ADDRESS=WORD ...] FILE [FILE ...]
+"""
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from timeit import default_timer
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.fast import FastComputer
+
+
+class Job(namedtuple('Job', 'source patches max_cycles')):
+    """
+    Program source, (address, word) pairs written after loading it, and
+    the cycle limit (None for no limit)
+    """
+    def __new__(cls, source, patches=(), max_cycles=None):
+        return super(Job, cls).__new__(cls, source, patches, max_cycles)
+
+
+JobResult = namedtuple(
+    'JobResult', 'index job reason cycles instructions ac e pc ram seconds')
+
+
+def run_many(jobs, workers=None):
+    """
+    Run jobs on `workers` processes (default: one per CPU), assembling
+    each distinct source once. Yields a JobResult per job as it completes;
+    result.index is the position of the job in `jobs`.
+    """
+    jobs = list(jobs)
+    images = {}
+    with ProcessPoolExecutor(workers) as executor:
+        futures = {}
+        for index, job in enumerate(jobs):
+            if job.source not in images:
+                images[job.source] = Assembler(job.source).assemble()
+            future = executor.submit(
+                execute, images[job.source], job.patches, job.max_cycles)
+            futures[future] = index
+
+        for future in as_completed(futures):
+            index = futures[future]
+            yield JobResult(index, jobs[index], *future.result())
+
+
+def execute(image, patches, max_cycles):
+    """
+    Run an assembled image in a fresh machine (in a worker process)
+    """
+    start = default_timer()
+    program_start, segments = image
+    computer = FastComputer()
+    for origin, words in segments:
+        computer.ram.write_block(origin, words)
+    for address, word in patches:
+        computer.ram.write(address, word)
+
+    result = computer.run(program_start, max_cycles)
+
+    return (result.reason, result.cycles, result.instructions,
+            computer.ac.word, computer.e.word, computer.pc.word,
+            computer.ram.dump(), default_timer() - start)
+
+
+def parse_patch(patch):
+    address, word = patch.split('=')
+    return int(address, 16), int(word, 16)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Run Mano machine programs on all cores')
+    parser.add_argument('files', metavar='FILE', nargs='+',
+                        help='assembly source')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('-c', '--max-cycles', type=int, default=None,
+                        help='stop a program after this many cycles')
+    parser.add_argument('-p', '--patch', type=parse_patch, action='append',
+                        default=[], metavar='ADDRESS=WORD',
+                        help='write a word (hex) after loading')
+    args = parser.parse_args(args)
+
+    jobs = []
+    for path in args.files:
+        with open(path) as source:
+            jobs.append(Job(source.read(), args.patch, args.max_cycles))
+
+    for result in run_many(jobs, args.workers):
+        print('%s: %s cycles=%d AC=%04X E=%d PC=%03X (%.1f ms)' % (
+            args.files[result.index], result.reason, result.cycles,
+            result.ac, result.e, result.pc, result.seconds * 1e3))
+
+
+if __name__ == '__main__':
+    main()
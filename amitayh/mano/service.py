@@ -0,0 +1,382 @@
+"""
+Emulation service: programs submitted over a TCP or UNIX socket as
+line-delimited JSON run on a pool of worker processes, each keeping a warm
+machine that is reset in place between programs.
+
+Requests, one JSON object per line:
+
+    {"id": 1, "source": "ORG 100 ...", "input": "abc", "max_cycles": 1000}
+    {"id": 2, "object": "<base64 encoded object file>"}
+
+Responses carry the id of their request. OUTR output is streamed as the
+program runs, followed by the result or an error:
+
+    {"id": 1, "type": "output", "data": "..."}
+    {"id": 1, "type": "result", "reason": "halted", "cycles": 42,
+     "instructions": 7, "ac": 0, "e": 0, "pc": 259, "seconds": 0.0001}
+    {"id": 2, "type": "error", "message": "..."}
+
+Usage: python -m amitayh.mano.service [-w WORKERS] [-c MAX_CYCLES]
+                                      [--host HOST] [-p PORT | -u PATH]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+from itertools import count
+from timeit import default_timer
+from amitayh.mano.assembler import Assembler, AssemblerError
+from amitayh.mano.computer import CYCLE_LIMIT
+from amitayh.mano.devices import InputDevice, OutputDevice
+from amitayh.mano.fast import FastComputer
+from amitayh.mano.objfile import ObjectFile
+
+# Response types
+OUTPUT = 'output'
+RESULT = 'result'
+ERROR = 'error'
+
+# Cycle limit of a program (requests may ask for less)
+MAX_CYCLES = 10 ** 7
+
+# Cycles run between flushes of the output
+SLICE_CYCLES = 1 << 16
+
+# Characters sent per output response
+OUTPUT_SIZE = 4096
+
+# Longest request (or response) line, generous enough for generated
+# programs far larger than asyncio's default of 64 KiB
+LINE_SIZE = 1 << 24
+
+
+def encode(message):
+    return json.dumps(message).encode('utf-8') + b'\n'
+
+
+class Worker(object):
+    """
+    Runs requests read from `requests` (binary lines) on one machine,
+    writing the responses to `responses`. Runs in a worker process of the
+    service (python -m amitayh.mano.service --worker).
+    """
+    def __init__(self, requests, responses, max_cycles=MAX_CYCLES):
+        self.requests = requests
+        self.responses = responses
+        self.max_cycles = max_cycles
+        self.computer = FastComputer()
+
+    def serve(self):
+        for line in self.requests:
+            request = json.loads(line.decode('utf-8'))
+            request_id = request.get('id')
+            try:
+                self.send(request_id, RESULT, **self.execute(request))
+            except AssemblerError as error:
+                self.send(request_id, ERROR, message=str(error))
+            except Exception as error:
+                # A bad request mustn't take the worker down
+                self.send(request_id, ERROR, message='%s: %s' % (
+                    type(error).__name__, error))
+
+    def execute(self, request):
+        start = default_timer()
+        computer = self.computer
+        computer.reset()
+        if 'object' in request:
+            image = base64.b64decode(request['object'])
+            program_start = ObjectFile.from_bytes(image).load(computer.ram)
+        else:
+            program_start = Assembler(request['source']).load(computer.ram)
+        if program_start is None:
+            raise ValueError('Program has no entry point')
+
+        output = OutputDevice(OutputStream(self, request.get('id')),
+                              buffer_size=OUTPUT_SIZE)
+        data = request.get('input')
+        computer.attach(
+            InputDevice(data.encode('latin-1')) if data else None, output)
+
+        max_cycles = request.get('max_cycles')
+        if max_cycles is None or max_cycles > self.max_cycles:
+            max_cycles = self.max_cycles
+        result = computer.run(program_start,
+                              max_cycles=min(SLICE_CYCLES, max_cycles))
+        while (result.reason == CYCLE_LIMIT and
+               computer.cycles < max_cycles):
+            result = computer.resume(
+                max_cycles=min(SLICE_CYCLES, max_cycles - computer.cycles))
+
+        return {
+            'reason': result.reason,
+            'cycles': computer.cycles,
+            'instructions': computer.instructions,
+            'ac': computer.ac.word,
+            'e': computer.e.word,
+            'pc': computer.pc.word,
+            'seconds': default_timer() - start
+        }
+
+    def send(self, request_id, kind, **fields):
+        fields['id'] = request_id
+        fields['type'] = kind
+        self.responses.write(encode(fields))
+        self.responses.flush()
+
+
+class OutputStream(object):
+    """
+    Sink of a request's output device, sending what the device flushes
+    (after every slice of cycles) as an output response
+    """
+    def __init__(self, worker, request_id):
+        self.worker = worker
+        self.request_id = request_id
+
+    def write(self, data):
+        self.worker.send(self.request_id, OUTPUT,
+                         data=bytes(data).decode('latin-1'))
+
+    def flush(self):
+        pass
+
+
+class Service(object):
+    """
+    Accepts connections and runs their requests on `workers` worker
+    processes (default: one per CPU), started once by start(). Requests
+    on a connection run concurrently, so responses may come out of order.
+    A worker that dies is replaced, failing the request it was running.
+    A request line longer than line_size is answered with an error, and
+    the connection closed.
+    """
+    def __init__(self, workers=None, max_cycles=MAX_CYCLES,
+                 line_size=LINE_SIZE):
+        self.size = workers or os.cpu_count() or 1
+        self.max_cycles = max_cycles
+        self.line_size = line_size
+        self.workers = []
+        self.idle = None
+        self.server = None
+
+    async def start(self):
+        self.idle = asyncio.Queue()
+        for _ in range(self.size):
+            await self.spawn()
+
+    async def spawn(self):
+        """
+        Start a worker process and add it to the idle ones
+        """
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, '-m', 'amitayh.mano.service', '--worker',
+            '-c', str(self.max_cycles),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE, limit=LINE_SIZE)
+        self.workers.append(process)
+        self.idle.put_nowait(process)
+
+    async def replace(self, process):
+        """
+        Replace a worker that exited (killing it if it's still running)
+        """
+        self.workers.remove(process)
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+        await self.spawn()
+
+    async def listen(self, host='127.0.0.1', port=0, path=None):
+        """
+        Serve on a TCP port (0 picks a free one) or on a UNIX socket
+        """
+        if path is not None:
+            self.server = await asyncio.start_unix_server(
+                self.handle, path, limit=self.line_size)
+        else:
+            self.server = await asyncio.start_server(
+                self.handle, host, port, limit=self.line_size)
+
+        return self.server
+
+    @property
+    def address(self):
+        return self.server.sockets[0].getsockname()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for process in self.workers:
+            process.stdin.close()
+            await process.wait()
+        del self.workers[:]
+
+    async def handle(self, reader, writer):
+        async def send(message):
+            # Responses to a client that left are dropped
+            try:
+                writer.write(encode(message))
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+        tasks = set()
+        while True:
+            try:
+                line = await reader.readline()
+            except (ValueError, asyncio.LimitOverrunError):
+                # The rest of the line can't be told from the next request
+                await send({'id': None, 'type': ERROR,
+                            'message': 'Request longer than %d bytes' %
+                                       self.line_size})
+                break
+            if not line:
+                break
+            try:
+                request = json.loads(line.decode('utf-8'))
+                if not isinstance(request, dict):
+                    raise ValueError('Request must be an object')
+            except ValueError as error:
+                await send({'id': None, 'type': ERROR, 'message': str(error)})
+                continue
+            task = asyncio.ensure_future(self.submit(request, send))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.wait(tasks)
+        writer.close()
+
+    async def submit(self, request, send):
+        """
+        Run a request on the next idle worker, passing its responses to
+        the coroutine function send as they arrive. Returns the last
+        (result or error) response.
+        """
+        process = await self.idle.get()
+        try:
+            process.stdin.write(encode(request))
+            await process.stdin.drain()
+            while True:
+                line = await process.stdout.readline()
+                if not line:
+                    raise ConnectionError()
+                message = json.loads(line.decode('utf-8'))
+                await send(message)
+                if message['type'] != OUTPUT:
+                    self.idle.put_nowait(process)
+                    return message
+        except ConnectionError:
+            # Writing to it fails too once the worker is gone
+            await self.replace(process)
+            message = {'id': request.get('id'), 'type': ERROR,
+                       'message': 'Worker %d exited' % process.pid}
+            await send(message)
+
+            return message
+
+
+class Client(object):
+    """
+    Sends requests over one connection to a service, matching responses
+    to requests by id
+    """
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.ids = count()
+        self.pending = {}       # id -> (output chunks, future)
+        self.receiver = asyncio.ensure_future(self.receive())
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=None, path=None):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(
+                path, limit=LINE_SIZE)
+        else:
+            reader, writer = await asyncio.open_connection(
+                host, port, limit=LINE_SIZE)
+
+        return cls(reader, writer)
+
+    async def run(self, **request):
+        """
+        Submit a request (source or object, and optionally input and
+        max_cycles), return (output, last response)
+        """
+        request['id'] = request_id = next(self.ids)
+        future = asyncio.get_event_loop().create_future()
+        self.pending[request_id] = ([], future)
+        self.writer.write(encode(request))
+        await self.writer.drain()
+
+        return await future
+
+    async def receive(self):
+        reason = 'Connection closed'
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            message = json.loads(line.decode('utf-8'))
+            if message['id'] not in self.pending:
+                # An error about a request the service couldn't read
+                reason = message.get('message', reason)
+                continue
+            output, future = self.pending[message['id']]
+            if message['type'] == OUTPUT:
+                output.append(message['data'])
+            else:
+                del self.pending[message['id']]
+                future.set_result((''.join(output), message))
+
+        # Requests left unanswered fail once the service closes
+        for output, future in self.pending.values():
+            future.set_exception(ConnectionError(reason))
+        self.pending.clear()
+
+    async def close(self):
+        self.writer.close()
+        await self.receiver
+
+
+async def serve(args):
+    service = Service(args.workers, args.max_cycles)
+    await service.start()
+    if args.unix is not None:
+        server = await service.listen(path=args.unix)
+    else:
+        server = await service.listen(args.host, args.port)
+    print('Serving on %s' % (service.address,))
+    try:
+        await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Run Mano machine programs submitted over a socket')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('-c', '--max-cycles', type=int, default=MAX_CYCLES,
+                        help='cycle limit of a program')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('-p', '--port', type=int, default=7412)
+    parser.add_argument('-u', '--unix', metavar='PATH', default=None,
+                        help='serve on a UNIX socket instead of TCP')
+    parser.add_argument('--worker', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(args)
+
+    if args.worker:
+        Worker(sys.stdin.buffer, sys.stdout.buffer, args.max_cycles).serve()
+    else:
+        asyncio.run(serve(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Full machine state, and its compact serialized format:
+
+    header      magic 'MANS', version, memory size in words
+    registers   one little-endian word per register (see REGISTERS)
+    counters    cycles, instructions, interrupts (64-bit each)
+    pages       page count, then for each dirty page its address, length
+                in words and the words themselves
+"""
+import struct
+import sys
+from array import array
+from amitayh.mano.memory import BankedMemory, PagedMemory
+
+# Registers saved in a snapshot, in serialization order
+REGISTERS = ('ar', 'pc', 'dr', 'ac', 'ir', 'tr', 'inpr', 'outr',
+             'sc', 'e', 's', 'r', 'ien', 'fgi', 'fgo')
+
+MAGIC = b'MANS'
+VERSION = 1
+
+HEADER = struct.Struct('<4sBI')
+REGISTER_WORDS = struct.Struct('<%dH' % len(REGISTERS))
+COUNTERS = struct.Struct('<3Q')
+COUNT = struct.Struct('<I')
+PAGE = struct.Struct('<IH')
+
+
+class Snapshot(object):
+    """
+    Register words (in REGISTERS order), counters (cycles, instructions,
+    interrupts) and a private fork of the memory
+    """
+    def __init__(self, registers, counters, memory):
+        self.registers = registers
+        self.counters = counters
+        self.memory = memory
+
+    def to_bytes(self):
+        if isinstance(self.memory, BankedMemory):
+            raise ValueError('Banked memory snapshots are not serializable')
+        chunks = [
+            HEADER.pack(MAGIC, VERSION, self.memory.size),
+            REGISTER_WORDS.pack(*self.registers),
+            COUNTERS.pack(*self.counters)
+        ]
+        pages = list(self.memory.dirty_pages())
+        chunks.append(COUNT.pack(len(pages)))
+        for address, words in pages:
+            chunks.append(PAGE.pack(address, len(words)))
+            chunks.append(words_to_bytes(words))
+
+        return b''.join(chunks)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Restore a serialized snapshot. Its memory is a PagedMemory.
+        """
+        magic, version, size = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a version %d snapshot' % VERSION)
+        offset = HEADER.size
+        registers = REGISTER_WORDS.unpack_from(data, offset)
+        offset += REGISTER_WORDS.size
+        counters = COUNTERS.unpack_from(data, offset)
+        offset += COUNTERS.size
+        count, = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+
+        memory = PagedMemory(size)
+        for _ in range(count):
+            address, length = PAGE.unpack_from(data, offset)
+            offset += PAGE.size
+            memory.load_image(data[offset:offset + length * 2], address)
+            offset += length * 2
+
+        return cls(registers, counters, memory)
+
+    def save(self, path):
+        with open(path, 'wb') as snapshot:
+            snapshot.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as snapshot:
+            return cls.from_bytes(snapshot.read())
+
+
+class StateSet(object):
+    """
+    Set of machine states (registers and memory) seen so far, to detect a
+    state that repeats. Lookups go by Computer.state_hash(); states with
+    the same hash are told apart by a full comparison of their snapshots.
+    """
+    def __init__(self):
+        self.states = {}
+
+    def add(self, computer):
+        """
+        Add the machine's current state, return whether it was seen before
+        """
+        key = computer.state_hash()
+        snapshots = self.states.get(key)
+        if snapshots is None:
+            self.states[key] = [computer.snapshot()]
+            return False
+
+        registers = tuple(getattr(computer, name).word for name in REGISTERS)
+        bank = computer.ram.bank
+        image = computer.ram.dump()
+        for snapshot in snapshots:
+            if (snapshot.registers == registers and
+                    snapshot.memory.bank == bank and
+                    snapshot.memory.dump() == image):
+                return True
+        snapshots.append(computer.snapshot())
+
+        return False
+
+    def __len__(self):
+        return sum(len(snapshots) for snapshots in self.states.values())
+
+
+def words_to_bytes(words):
+    words = array('H', words)
+    if sys.byteorder == 'big':
+        words.byteswap()
+
+    return words.tobytes()
@@ -0,0 +1,187 @@
+"""
+Memory access traces: every read and write of a running machine, streamed
+to a compact binary file and read back lazily.
+
+    header      magic 'MANT', version, flags (1 = compressed chunks)
+    chunks      record count and payload length, then the payload: packed
+                records (zlib-compressed if flagged) of cycle, address,
+                word and access kind
+"""
+import struct
+import zlib
+from collections import namedtuple
+from amitayh.mano.computer import replace_attributes, restore_attributes
+
+MAGIC = b'MANT'
+VERSION = 1
+COMPRESSED = 1
+
+HEADER = struct.Struct('<4sBB')
+CHUNK = struct.Struct('<II')
+RECORD = struct.Struct('<QIHB')
+
+# Access kinds
+FETCH = 0       # Instruction word read into IR
+INDIRECT = 1    # Effective address read into AR
+OPERAND = 2     # Operand read into DR
+WRITE = 3
+
+KIND_NAMES = ('fetch', 'indirect', 'operand', 'write')
+
+# Clock (T) of each kind of access in an instruction, for engines that
+# don't run the sequence counter
+READ_CLOCKS = {FETCH: 1, INDIRECT: 3, OPERAND: 4}
+WRITE_CLOCK = 4
+ISZ_WRITE_CLOCK = 6
+INTERRUPT_WRITE_CLOCK = 1
+
+Access = namedtuple('Access', 'cycle address word kind')
+
+
+class TraceWriter(object):
+    """
+    Buffers packed records and writes them a chunk at a time, compressed
+    with zlib if asked to
+    """
+    def __init__(self, output, compress=False, chunk_size=1 << 16):
+        self.owned = not hasattr(output, 'write')
+        self.output = open(output, 'wb') if self.owned else output
+        self.compress = compress
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+        self.count = 0
+        self.pack = RECORD.pack
+        self.output.write(HEADER.pack(MAGIC, VERSION,
+                                      COMPRESSED if compress else 0))
+
+    def write(self, cycle, address, word, kind):
+        self.buffer += self.pack(cycle, address, word, kind)
+        self.count += 1
+        if self.count >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.count:
+            return
+        payload = bytes(self.buffer)
+        if self.compress:
+            payload = zlib.compress(payload)
+        self.output.write(CHUNK.pack(self.count, len(payload)))
+        self.output.write(payload)
+        del self.buffer[:]
+        self.count = 0
+
+    def close(self):
+        self.flush()
+        if self.owned:
+            self.output.close()
+        else:
+            self.output.flush()
+
+
+def read_trace(source):
+    """
+    Yield the Accesses in a trace file (a path or a binary file), reading
+    one chunk at a time
+    """
+    owned = not hasattr(source, 'read')
+    trace = open(source, 'rb') if owned else source
+    try:
+        magic, version, flags = HEADER.unpack(trace.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a version %d trace' % VERSION)
+        while True:
+            header = trace.read(CHUNK.size)
+            if not header:
+                break
+            count, length = CHUNK.unpack(header)
+            payload = trace.read(length)
+            if flags & COMPRESSED:
+                payload = zlib.decompress(payload)
+            for record in RECORD.iter_unpack(payload):
+                yield Access(*record)
+    finally:
+        if owned:
+            trace.close()
+
+
+class Tracer(object):
+    """
+    Records every memory access of a machine while attached, by wrapping
+    its memory_read() and memory_write() (and tick() or step() to follow
+    the clock). The kind of a read follows from the register it reads
+    into. While traced, a BlockComputer runs instruction by instruction
+    and idle polling loops are stepped through rather than skipped. All
+    engines give the same trace: Computer accesses are stamped with their
+    clock, FastComputer accesses with the clock they happen at in the
+    micro-operation sequence.
+    """
+    def __init__(self, computer, output, compress=False):
+        self.computer = computer
+        self.writer = TraceWriter(output, compress)
+        self.cycle = computer.cycles
+        self.ticking = False
+        self.interrupt = False
+        self.attach()
+
+    def attach(self):
+        computer = self.computer
+        self.read = computer.memory_read
+        self.write = computer.memory_write
+        hooks = {'memory_read': self.traced_read,
+                 'memory_write': self.traced_write, 'instrumented': True}
+        if hasattr(computer, 'step'):
+            self.step = computer.step
+            hooks['step'] = self.traced_step
+        else:
+            self.ticking = True
+            self.tick = computer.tick
+            hooks['tick'] = self.traced_tick
+        self.replaced = replace_attributes(computer, **hooks)
+
+    def close(self):
+        """
+        Detach from the machine and finish the trace
+        """
+        restore_attributes(self.computer, self.replaced)
+        self.writer.close()
+
+    def traced_tick(self):
+        self.tick()
+        self.cycle += 1
+
+    def traced_step(self):
+        self.interrupt = self.computer.r.word == 1
+        cycles = self.step()
+        self.cycle += cycles
+
+        return cycles
+
+    def traced_read(self, register):
+        computer = self.computer
+        address = computer.ar.word
+        self.read(register)
+        if register is computer.ir:
+            kind = FETCH
+        elif register is computer.ar:
+            kind = INDIRECT
+        else:
+            kind = OPERAND
+        cycle = self.cycle
+        if not self.ticking:
+            cycle += READ_CLOCKS[kind]
+        self.writer.write(cycle, address, computer.ram.read(address), kind)
+
+    def traced_write(self, register):
+        computer = self.computer
+        self.write(register)
+        if self.ticking:
+            cycle = self.cycle
+        elif self.interrupt:
+            cycle = self.cycle + INTERRUPT_WRITE_CLOCK
+        elif computer.ir.word & 0x7000 == 0x6000:
+            cycle = self.cycle + ISZ_WRITE_CLOCK
+        else:
+            cycle = self.cycle + WRITE_CLOCK
+        address = computer.ar.word
+        self.writer.write(cycle, address, computer.ram.read(address), WRITE)
@@ -1,5 +1,7 @@
 from unittest import TestCase
-from amitayh.mano.assembler import Assembler
+from amitayh.mano.assembler import Assembler, AssemblerError, Diagnostic, \
+    UNKNOWN_COMMAND, UNDEFINED_LABEL, MISSING_OPERAND, INVALID_NUMBER, \
+    DUPLICATE_LABEL, MALFORMED_LINE
 from amitayh.mano.computer import Memory
 
 
@@ -64,6 +66,18 @@ class TestAssembler(TestCase):
         self.assertEquals(0xF080, self.memory.read(0x104))
         self.assertEquals(0xF040, self.memory.read(0x105))
 
+    def test_assemble_bank_switching_commands(self):
+        program = """
+            ORG 100
+            SBK
+            LBK
+            END
+        """
+        self.load_program(program)
+
+        self.assertEqual(0xF020, self.memory.read(0x100))
+        self.assertEqual(0xF010, self.memory.read(0x101))
+
     def test_assemble_mri_commands(self):
         program = """
                  ORG 100
@@ -114,7 +128,62 @@ class TestAssembler(TestCase):
         self.assertEquals(0x4, self.memory.read(0x111))
         self.assertEquals(0x8, self.memory.read(0x112))
         self.assertEquals(0xF, self.memory.read(0x113))
-        self.assertEquals(-23, self.memory.read(0x114))
+        self.assertEquals(0xFFE9, self.memory.read(0x114))
+
+    def test_assemble_segments(self):
+        program = """
+                 ORG 100
+                 LDA AAA
+                 HLT
+                 ORG 200
+            AAA, DEC -1
+                 END
+        """
+        program_start, segments = Assembler(program).assemble()
+
+        self.assertEqual(0x100, program_start)
+        self.assertEqual(2, len(segments))
+        self.assertEqual((0x100, [0x2200, 0x7001]),
+                         (segments[0][0], list(segments[0][1])))
+        self.assertEqual((0x200, [0xFFFF]),
+                         (segments[1][0], list(segments[1][1])))
+
+    def test_forward_and_backward_references(self):
+        program = """
+                 ORG 100
+            BCK, BUN FWD I
+                 ORG 200
+            FWD, BUN BCK
+                 END
+        """
+        assembler = Assembler(program)
+        assembler.load(self.memory)
+
+        self.assertEqual(0xC200, self.memory.read(0x100))
+        self.assertEqual(0x4100, self.memory.read(0x200))
+        self.assertEqual({'BCK': 0x100, 'FWD': 0x200},
+                         assembler.address_table)
+
+    def test_address_table_is_private(self):
+        program = """
+                 ORG 100
+            LOP, BUN LOP
+                 END
+        """
+        Assembler(program).address_table['LOP'] = 0x200
+
+        self.assertEqual({'LOP': 0x100}, Assembler(program).address_table)
+
+    def test_same_source_is_assembled_once(self):
+        program = """
+            ORG 100
+            CLA
+            END
+        """
+        first = Assembler(program).assemble()
+        second = Assembler(program).assemble()
+
+        self.assertTrue(first[1] is second[1])
 
     def test_invalid_command_throws_error(self):
         program = """
@@ -125,6 +194,53 @@ class TestAssembler(TestCase):
         assembler = Assembler(program)
         self.assertRaises(SyntaxError, assembler.load, self.memory)
 
+    def test_collect_all_errors(self):
+        program = """
+            ORG 100
+       LOP, LDA FOO
+            BAR
+            ADD
+            HEX XYZ
+       LOP, CLA
+       X,
+            END
+        """
+        diagnostics = Assembler(program).check()
+
+        self.assertEqual([
+            Diagnostic(3, 17, UNDEFINED_LABEL, "Undefined label: 'FOO'"),
+            Diagnostic(4, 13, UNKNOWN_COMMAND, "Unrecognized command: 'BAR'"),
+            Diagnostic(5, 16, MISSING_OPERAND, 'Missing address'),
+            Diagnostic(6, 17, INVALID_NUMBER, "Invalid number: 'XYZ'"),
+            Diagnostic(7, 8, DUPLICATE_LABEL, "Duplicate label: 'LOP'"),
+            Diagnostic(8, 10, MALFORMED_LINE, 'Missing command')
+        ], diagnostics)
+
+    def test_error_has_all_diagnostics(self):
+        program = """
+            ORG 100
+            FOO
+            BAR
+            END
+        """
+        with self.assertRaises(AssemblerError) as context:
+            Assembler(program).assemble()
+
+        error = context.exception
+        self.assertEqual(3, error.lineno)
+        self.assertEqual(13, error.offset)
+        self.assertEqual([3, 4], [d.line for d in error.diagnostics])
+        self.assertEqual("3:13: Unrecognized command: 'FOO' "
+                         "(unknown-command)", str(error.diagnostics[0]))
+
+    def test_valid_program_has_no_diagnostics(self):
+        program = """
+            ORG 100
+            HLT
+            END
+        """
+        self.assertEqual([], Assembler(program).check())
+
     def load_program(self, program):
         assembler = Assembler(program)
         return assembler.load(self.memory)
\ No newline at end of file
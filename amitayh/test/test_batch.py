@@ -0,0 +1,105 @@
+from unittest import TestCase, skipIf
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.fast import FastComputer
+
+try:
+    from amitayh.mano.batch import BatchComputer
+except ImportError:
+    BatchComputer = None
+
+
+@skipIf(BatchComputer is None, 'NumPy is not installed')
+class TestBatchComputer(TestCase):
+    def test_run_program_on_many_inputs(self):
+        program = """
+                 ORG 100
+                 LDA AAA
+                 ADD BBB
+                 STA CCC
+                 HLT
+            AAA, DEC 0
+            BBB, DEC -23
+            CCC, HEX 0
+                 END
+        """
+        computer = BatchComputer(3)
+        program_start = computer.load(Assembler(program))
+        computer.write(0x104, [83, 23, 10])
+        result = computer.run(program_start)
+
+        self.assertEqual([60, 0, 0xFFF3], list(result.ac))
+        self.assertEqual([1, 1, 0], list(result.e))
+        self.assertEqual([60, 0, 0xFFF3], list(result.ram[:, 0x106]))
+        self.assertEqual([21, 21, 21], list(result.cycles))
+        self.assertTrue(result.halted.all())
+
+    def test_divergent_control_flow(self):
+        program = """
+                 ORG 100
+                 LDA CNT
+                 CMA
+                 INC
+                 STA CNT
+                 CLA
+            LOP, ADD VAL
+                 CIL
+                 SZE
+                 CME
+                 ISZ CNT
+                 BUN LOP
+                 HLT
+            CNT, DEC 0
+            VAL, HEX 8001
+                 END
+        """
+        assembler = Assembler(program)
+        counts = [1, 2, 5, 9]
+        computer = BatchComputer(len(counts))
+        program_start = computer.load(assembler)
+        computer.write(0x10C, counts)
+        result = computer.run(program_start)
+
+        for i, count in enumerate(counts):
+            expected = FastComputer()
+            assembler.load(expected.ram)
+            expected.ram.write(0x10C, count)
+            expected.run(program_start)
+
+            self.assertEqual(expected.ac.word, result.ac[i])
+            self.assertEqual(expected.e.word, result.e[i])
+            self.assertEqual(expected.pc.word, computer.pc[i])
+            self.assertEqual(list(expected.ram.data), list(result.ram[i]))
+
+        self.assertEqual(sorted(result.cycles), list(result.cycles))
+
+    def test_max_instructions(self):
+        program = """
+                 ORG 100
+            LOP, BUN LOP
+                 END
+        """
+        computer = BatchComputer(2)
+        program_start = computer.load(Assembler(program))
+        result = computer.run(program_start, max_instructions=10)
+
+        self.assertFalse(result.halted.any())
+        self.assertEqual([50, 50], list(result.cycles))
+
+    def test_bank_instructions(self):
+        program = """
+                 ORG 100
+                 CLA
+                 CMA
+                 SBK
+                 LBK
+                 HLT
+                 END
+        """
+        assembler = Assembler(program)
+        computer = BatchComputer(1)
+        result = computer.run(computer.load(assembler))
+        expected = FastComputer()
+        expected.run(assembler.load(expected.ram))
+
+        self.assertEqual(expected.ac.word, result.ac[0])
+        self.assertEqual(0, result.ac[0])
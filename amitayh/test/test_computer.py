@@ -1,6 +1,10 @@
 from unittest import TestCase
 from amitayh.mano.assembler import Assembler
-from amitayh.mano.computer import Register, Memory, Computer
+from amitayh.mano.computer import Register, Memory, Computer, HALTED, \
+    CYCLE_LIMIT, INSTRUCTION_LIMIT, TIMEOUT, INFINITE_LOOP
+from amitayh.mano.devices import InputDevice
+from amitayh.mano.logger import Logger, NullLogger, INSTRUCTION
+from amitayh.mano.memory import BankedMemory
 
 
 class TestComputer(TestCase):
@@ -147,6 +151,248 @@ class TestComputer(TestCase):
         return computer
 
 
+class TestComputerRun(TestCase):
+    computer_class = Computer
+
+    count_forever = """
+             ORG 100
+        LOP, INC
+             BUN LOP
+             END
+    """
+
+    def test_run_until_halted(self):
+        program = """
+            ORG 100
+            CLA
+            INC
+            HLT
+            END
+        """
+        computer, program_start = self.load(program)
+        result = computer.run(program_start)
+
+        self.assertEqual(HALTED, result.reason)
+        self.assertTrue(result.halted)
+        self.assertEqual(12, result.cycles)
+        self.assertEqual(3, result.instructions)
+
+    def test_max_instructions(self):
+        computer, program_start = self.load(self.count_forever)
+        result = computer.run(program_start, max_instructions=10)
+
+        self.assertEqual(INSTRUCTION_LIMIT, result.reason)
+        self.assertFalse(result.halted)
+        self.assertEqual(10, result.instructions)
+        self.assertEqual(45, result.cycles)
+        self.assertEqual(5, computer.ac.word)
+
+    def test_max_cycles(self):
+        computer, program_start = self.load(self.count_forever)
+        result = computer.run(program_start, max_cycles=100)
+
+        self.assertEqual(CYCLE_LIMIT, result.reason)
+        self.assertEqual(100, result.cycles)
+        self.assertEqual(22, result.instructions)
+
+    def test_timeout(self):
+        computer, program_start = self.load(self.count_forever)
+        result = computer.run(program_start, timeout=0.01)
+
+        self.assertEqual(TIMEOUT, result.reason)
+        self.assertTrue(result.instructions > 0)
+
+    def test_detect_branch_to_itself(self):
+        program = """
+                 ORG 100
+                 INC
+            LOP, BUN LOP
+                 END
+        """
+        computer, program_start = self.load(program)
+        result = computer.run(program_start, max_cycles=1000)
+
+        self.assertEqual(INFINITE_LOOP, result.reason)
+        self.assertEqual(2, result.instructions)
+        self.assertEqual(0x101, computer.pc.word)
+        self.assertEqual(0, computer.sc.word)
+
+    def test_branch_to_itself_with_interrupts_enabled(self):
+        program = """
+                 ORG 100
+                 ION
+            LOP, BUN LOP
+                 END
+        """
+        computer, program_start = self.load(program)
+        result = computer.run(program_start, max_instructions=100)
+
+        self.assertEqual(INSTRUCTION_LIMIT, result.reason)
+
+    def test_resume_accumulates_counters(self):
+        computer, program_start = self.load(self.count_forever)
+        computer.run(program_start, max_instructions=10)
+        result = computer.resume(max_instructions=10)
+
+        self.assertEqual(10, result.instructions)
+        self.assertEqual(20, computer.instructions)
+        self.assertEqual(90, computer.cycles)
+        self.assertEqual(10, computer.ac.word)
+
+    def test_interrupt_cycle_is_not_an_instruction(self):
+        program = """
+            ORG 1
+            HLT
+            ORG 100
+            HLT
+            END
+        """
+        computer, program_start = self.load(program)
+        computer.r.word = 1
+        result = computer.run(0x100)
+
+        self.assertEqual(7, result.cycles)
+        self.assertEqual(1, result.instructions)
+        self.assertEqual(1, computer.interrupts)
+        self.assertEqual(0x100, computer.ram.read(0))
+
+    def test_reset(self):
+        computer, program_start = self.load(self.count_forever)
+        computer.attach(InputDevice(b'abc'))
+        computer.run(program_start, max_cycles=100)
+        computer.reset()
+
+        self.assertEqual(0, computer.cycles)
+        self.assertEqual(0, computer.instructions)
+        self.assertEqual(0, computer.ac.word)
+        self.assertEqual(0, computer.pc.word)
+        self.assertEqual(0, computer.sc.word)
+        self.assertEqual(0, computer.fgi.word)
+        self.assertEqual(None, computer.input_device)
+        self.assertEqual(0, computer.ram.read(0x100))
+
+        fresh, program_start = self.load(self.count_forever)
+        Assembler(self.count_forever).load(computer.ram)
+        self.assertEqual(fresh.run(program_start, max_cycles=100),
+                         computer.run(program_start, max_cycles=100))
+        self.assertEqual(fresh.ac.word, computer.ac.word)
+
+    def load(self, program):
+        computer = self.computer_class()
+        program_start = Assembler(program).load(computer.ram)
+
+        return computer, program_start
+
+
+class TestBankSwitching(TestCase):
+    computer_class = Computer
+
+    program = """
+             ORG 100
+             LDA ONE
+             SBK
+             LDA VAL
+             STA WIN
+             LBK
+             STA BNK
+             CLA
+             SBK
+             LDA WIN
+             HLT
+        ONE, DEC 1
+        VAL, HEX 1234
+        BNK, HEX 0
+             ORG 800
+        WIN, DEC 5
+             END
+    """
+
+    def test_switch_banks(self):
+        computer = self.computer_class(memory=BankedMemory(banks=4))
+        computer.run(Assembler(self.program).load(computer.ram))
+
+        self.assertEqual(5, computer.ac.word)
+        self.assertEqual(1, computer.ram.read(0x10C))
+        self.assertEqual(0, computer.ram.bank)
+        self.assertEqual(0x1234, computer.ram.read(0x1000))
+
+    def test_plain_memory_has_no_banks(self):
+        computer = self.computer_class()
+        computer.run(Assembler(self.program).load(computer.ram))
+
+        self.assertEqual(0x1234, computer.ac.word)
+        self.assertEqual(0, computer.ram.read(0x10C))
+
+    def test_code_in_window(self):
+        program = """
+                 ORG 100
+                 CLA
+                 BSA SUB
+                 STA RS0
+                 LDA ONE
+                 SBK
+                 CLA
+                 BSA SUB
+                 STA RS1
+                 HLT
+            ONE, DEC 1
+            RS0, HEX 0
+            RS1, HEX 0
+                 ORG 800
+            SUB, HEX 0
+                 INC
+                 BUN SUB I
+                 END
+        """
+        memory = BankedMemory(banks=2)
+        program_start = Assembler(program).load(memory)
+        memory.select(1)
+        memory.write_block(0x800, [0x0000, 0x7200, 0xC800])  # CMA instead
+        memory.select(0)
+        computer = self.computer_class(memory=memory)
+        computer.run(program_start)
+
+        self.assertEqual(1, memory.read(0x10A))
+        self.assertEqual(0xFFFF, memory.read(0x10B))
+
+
+class TestComputerLogging(TestCase):
+    program = """
+        ORG 100
+        CLA
+        HLT
+        END
+    """
+
+    def test_default_logger_is_disabled(self):
+        computer = Computer()
+        self.assertTrue(isinstance(computer.logger, NullLogger))
+
+    def test_log_micro_operations(self):
+        logger = Logger()
+        self.run_program(Computer(logger))
+
+        self.assertEqual([
+            "R'T0: AR <- PC",
+            "R'T1: IR <- M[AR], PC <- PC + 1",
+            "R'T2: AR <- IR(0-11)",
+            "D7I'T3B11: AC <- 0, SC <- 0",
+            "R'T0: AR <- PC",
+            "R'T1: IR <- M[AR], PC <- PC + 1",
+            "R'T2: AR <- IR(0-11)",
+            "D7I'T3B0: S <- 0, SC <- 0"
+        ], logger.messages)
+
+    def test_skip_micro_operations_below_logger_level(self):
+        logger = Logger(level=INSTRUCTION)
+        self.run_program(Computer(logger))
+
+        self.assertEqual([], logger.messages)
+
+    def run_program(self, computer):
+        computer.run(Assembler(self.program).load(computer.ram))
+
+
 class TestRegister(TestCase):
     def setUp(self):
         self.register = Register(3)
@@ -202,6 +448,14 @@ class TestRegister(TestCase):
         self.assertEquals(1, msb)
         self.assertEquals(5, self.register.word)
 
+    def test_add_without_carry(self):
+        carry = self.register.add(2)
+        self.assertEqual(0, carry)
+        self.assertEqual(7, self.register.word)
+
+    def test_registers_are_compact(self):
+        self.assertFalse(hasattr(self.register, '__dict__'))
+
     def test_string_representation(self):
         self.assertEquals('Register(word=101)', str(self.register))
 
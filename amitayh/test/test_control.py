@@ -0,0 +1,140 @@
+from unittest import TestCase
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.computer import Computer
+from amitayh.mano.control import TableComputer, CONTROL, ROWS
+from amitayh.mano.logger import Logger
+from amitayh.test import test_computer, test_devices
+from amitayh.test.test_fast import REGISTERS
+
+
+ALL_INSTRUCTIONS = """
+         ORG 0
+    RET, HEX 0
+         BUN SRV
+         ORG 100
+         LDA AAA
+         AND BBB
+         ADD CCC I
+         STA DDD
+         BSA SUB
+         ISZ CNT
+         ISZ CNT
+         CIL
+         CIR
+         CME
+         CMA
+         SZE
+         CLE
+         SPA
+         SNA
+         INC
+         SZA
+         CLA
+         SKI
+         SKO
+         ION
+         OUT
+         INP
+         IOF
+         HLT
+    SRV, ION
+         BUN RET I
+    SUB, HEX 0
+         BUN SUB I
+    AAA, HEX F0F0
+    BBB, HEX 3C3C
+    CCC, HEX 200
+    DDD, HEX 0
+    CNT, DEC -1
+         ORG 200
+         HEX 1234
+         END
+"""
+
+
+class TestTableComputer(test_computer.TestComputer):
+    @staticmethod
+    def create_computer(program):
+        computer = TableComputer()
+        assembler = Assembler(program)
+        program_start = assembler.load(computer.ram)
+        computer.run(program_start)
+
+        return computer
+
+
+class TestTableComputerRun(test_computer.TestComputerRun):
+    computer_class = TableComputer
+
+
+class TestTableComputerBankSwitching(test_computer.TestBankSwitching):
+    computer_class = TableComputer
+
+
+class TestTableComputerDevices(test_devices.TestDevices):
+    computer_class = TableComputer
+
+
+class TestTableComputerInterrupts(test_devices.TestInterrupts):
+    computer_class = TableComputer
+
+
+class TestControlTable(TestCase):
+    def test_control_word(self):
+        rtl, operations, sc = CONTROL[0, 6, 6, 1, None]
+
+        self.assertEqual(
+            'D6T6: M[AR] <- DR, if (DR = 0) then (PC <- PC + 1), SC <- 0',
+            rtl)
+        self.assertEqual(2, len(operations))
+        self.assertEqual(0, sc)
+
+    def test_interrupt_cycle_takes_precedence_over_fetch(self):
+        self.assertEqual("RT0: AR <- 0, TR <- PC",
+                         CONTROL[1, 0, 2, 0, None][0])
+        self.assertEqual("R'T0: AR <- PC", CONTROL[0, 0, 2, 0, None][0])
+
+    def test_rows_are_shared(self):
+        self.assertTrue(ROWS[0x2100] is ROWS[0x2FFF])
+        self.assertTrue(ROWS[0x2100] is not ROWS[0xA100])
+
+
+class TestTableComputerEquivalence(TestCase):
+    def test_same_state_every_clock(self):
+        computers = [Computer(), TableComputer()]
+        for computer in computers:
+            Assembler(ALL_INSTRUCTIONS).load(computer.ram)
+            computer.pc.word = 0x100
+            computer.s.word = 1
+            computer.fgi.word = computer.fgo.word = 1
+            computer.inpr.word = 0x41
+
+        ticks = 0
+        while computers[0].s.word == 1:
+            for computer in computers:
+                computer.tick()
+                if (computer.ien.word == 1 and computer.sc.word == 0 and
+                        computer.interrupts == 0):
+                    computer.r.word = 1
+            self.assertEqual(state(computers[0]), state(computers[1]))
+            ticks += 1
+
+        self.assertTrue(computers[0].interrupts > 0)
+        self.assertTrue(ticks > 100)
+
+    def test_same_micro_operations_logged(self):
+        messages = []
+        for cls in (Computer, TableComputer):
+            logger = Logger()
+            computer = cls(logger)
+            computer.run(Assembler(ALL_INSTRUCTIONS).load(computer.ram),
+                         max_cycles=1000)
+            messages.append(logger.messages)
+
+        self.assertEqual(messages[0], messages[1])
+
+
+def state(computer):
+    return (tuple(getattr(computer, name).word for name in REGISTERS),
+            computer.interrupts,
+            tuple(computer.ram.read(address) for address in range(0x130)))
@@ -0,0 +1,209 @@
+from unittest import TestCase
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.computer import Computer, HALTED, INSTRUCTION_LIMIT
+from amitayh.mano.control import TableComputer
+from amitayh.mano.debugger import Debugger, Stop, BREAKPOINT, WATCHPOINT, \
+    CONDITION, READ, WRITE
+from amitayh.mano.devices import OutputDevice
+from amitayh.mano.fast import FastComputer
+from amitayh.mano.jit import BlockComputer
+from amitayh.mano.profiler import Profiler
+
+
+SUM_THREE = """
+         ORG 100
+         CLA
+    LOP, ADD PTR I
+         ISZ PTR
+         ISZ CNT
+         BUN LOP
+    END, STA SUM
+         HLT
+    PTR, HEX 200
+    CNT, DEC -3
+    SUM, HEX 0
+         ORG 200
+    DAT, DEC 1
+         DEC 2
+         DEC 3
+         END
+"""
+
+
+class TestDebugger(TestCase):
+    computer_class = FastComputer
+
+    def setUp(self):
+        self.computer = self.computer_class()
+        self.assembler = Assembler(SUM_THREE)
+        self.program_start = self.assembler.load(self.computer.ram)
+        self.debugger = Debugger(self.computer, self.assembler)
+
+    def tearDown(self):
+        self.debugger.close()
+        self.computer = self.debugger = None
+
+    def run_program(self):
+        return self.computer.run(self.program_start)
+
+    def test_no_stops(self):
+        result = self.run_program()
+
+        self.assertEqual(HALTED, result.reason)
+        self.assertEqual(6, self.computer.ac.word)
+        self.assertEqual(None, self.debugger.stop)
+
+    def test_breakpoint_at_label(self):
+        self.debugger.break_at('LOP')
+        results = [self.run_program()]
+        while not results[-1].halted:
+            self.assertEqual(0x101, self.computer.pc.word)
+            results.append(self.computer.resume())
+
+        self.assertEqual([BREAKPOINT] * 3 + [HALTED],
+                         [result.reason for result in results])
+        self.assertEqual([1, 4, 4, 5],
+                         [result.instructions for result in results])
+        self.assertEqual(6, self.computer.ram.read(0x109))
+        self.assertEqual(sum(result.cycles for result in results),
+                         self.computer.cycles)
+
+    def test_breakpoint_at_program_start(self):
+        self.debugger.break_at(self.program_start)
+        result = self.run_program()
+
+        self.assertEqual(BREAKPOINT, result.reason)
+        self.assertEqual(0, result.cycles)
+        self.assertEqual(HALTED, self.computer.resume().reason)
+
+    def test_conditional_breakpoint(self):
+        self.debugger.break_at(
+            'END', lambda computer: computer.ac.word != 6)
+        self.debugger.break_at(
+            'LOP', lambda computer: computer.ac.word == 3)
+        result = self.run_program()
+
+        self.assertEqual(BREAKPOINT, result.reason)
+        self.assertEqual(Stop(BREAKPOINT, 0x101, None), self.debugger.stop)
+        self.assertEqual(3, self.computer.ac.word)
+        self.assertEqual(HALTED, self.computer.resume().reason)
+
+    def test_clear_breakpoint(self):
+        self.debugger.break_at('LOP')
+        self.debugger.clear_break('LOP')
+
+        self.assertEqual(HALTED, self.run_program().reason)
+
+    def test_write_watchpoint(self):
+        self.debugger.watch('SUM')
+        result = self.run_program()
+
+        self.assertEqual(WATCHPOINT, result.reason)
+        self.assertEqual(Stop(WATCHPOINT, 0x109, WRITE), self.debugger.stop)
+        self.assertEqual(0x106, self.computer.pc.word)
+        self.assertEqual(6, self.computer.ram.read(0x109))
+
+    def test_read_watchpoint_on_range(self):
+        self.debugger.watch(0x201, 0x202, read=True, write=False)
+        self.run_program()
+
+        self.assertEqual(Stop(WATCHPOINT, 0x201, READ), self.debugger.stop)
+        self.assertEqual(3, self.computer.ac.word)
+
+        self.computer.resume()
+        self.assertEqual(Stop(WATCHPOINT, 0x202, READ), self.debugger.stop)
+        self.assertEqual(HALTED, self.computer.resume().reason)
+
+    def test_fetch_does_not_trigger_read_watchpoint(self):
+        self.debugger.watch('LOP', read=True, write=False)
+
+        self.assertEqual(HALTED, self.run_program().reason)
+
+    def test_indirect_operand(self):
+        self.debugger.watch('PTR', read=True, write=False)
+        self.run_program()
+
+        self.assertEqual(Stop(WATCHPOINT, 0x107, READ), self.debugger.stop)
+        self.assertEqual(0x102, self.computer.pc.word)
+
+    def test_stop_when_register_holds_word(self):
+        self.debugger.stop_when('ac', 3)
+        result = self.run_program()
+
+        self.assertEqual(CONDITION, result.reason)
+        self.assertEqual(Stop(CONDITION, 0x102, None), self.debugger.stop)
+
+    def test_limits_still_apply(self):
+        self.debugger.break_at('END')
+        result = self.computer.run(self.program_start, max_instructions=3)
+
+        self.assertEqual(INSTRUCTION_LIMIT, result.reason)
+        self.assertEqual(BREAKPOINT, self.computer.resume().reason)
+
+    def test_machine_is_restored_after_run(self):
+        self.debugger.break_at('LOP')
+        self.debugger.watch('SUM', read=True)
+        self.run_program()
+
+        for name in ('step', 'tick', 'memory_read', 'memory_write',
+                     'flush_devices', 'instrumented'):
+            self.assertFalse(name in self.computer.__dict__)
+        self.debugger.close()
+        self.assertFalse('resume' in self.computer.__dict__)
+
+    def test_stop_is_not_a_halt(self):
+        program = """
+                 ORG 100
+                 LDA CHR
+                 OUT
+            STP, HLT
+            CHR, HEX 41
+                 END
+        """
+        computer = self.computer_class()
+        device = OutputDevice(latency=1000)
+        computer.attach(output_device=device)
+        debugger = Debugger(computer, Assembler(program))
+        debugger.break_at('STP')
+        computer.run(Assembler(program).load(computer.ram))
+
+        self.assertEqual(1, computer.s.word)
+        self.assertEqual(b'', bytes(device.data))
+        computer.resume()
+        self.assertEqual(b'A', bytes(device.data))
+
+
+    def test_with_profiler(self):
+        profiler = Profiler(self.computer, self.assembler)
+        self.debugger.break_at('LOP')
+        self.debugger.watch('SUM')
+        results = [self.run_program()]
+        while not results[-1].halted:
+            results.append(self.computer.resume())
+        rows = profiler.instruction_profile()
+        profiler.close()
+
+        self.assertEqual(5, len(results))
+        self.assertEqual(self.computer.instructions,
+                         sum(executions for name, executions, cycles in rows))
+        self.assertEqual(self.computer.cycles,
+                         sum(cycles for name, executions, cycles in rows))
+        self.assertEqual(['resume'], list(self.computer.__dict__.keys() &
+                                          INSTRUMENTED))
+
+
+# Attributes instruments replace
+INSTRUMENTED = {'resume', 'step', 'tick', 'memory_read', 'memory_write',
+                'flush_devices', 'instrumented'}
+
+
+class TestComputerDebugger(TestDebugger):
+    computer_class = Computer
+
+
+class TestTableComputerDebugger(TestDebugger):
+    computer_class = TableComputer
+
+
+class TestBlockComputerDebugger(TestDebugger):
+    computer_class = BlockComputer
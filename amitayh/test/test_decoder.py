@@ -0,0 +1,28 @@
+from unittest import TestCase
+from amitayh.mano.decoder import DECODED, decode
+
+
+class TestDecoder(TestCase):
+    def test_decode_memory_reference_instruction(self):
+        self.assertEqual((1, 0, None), decode(0x1234))
+        self.assertEqual((6, 1, None), decode(0xE114))
+
+    def test_decode_register_reference_instruction(self):
+        self.assertEqual((7, 0, 11), decode(0x7800))
+        self.assertEqual((7, 0, 0), decode(0x7001))
+
+    def test_decode_io_instruction(self):
+        self.assertEqual((7, 1, 11), decode(0xF800))
+        self.assertEqual((7, 1, 6), decode(0xF040))
+
+    def test_decode_invalid_operation(self):
+        self.assertEqual((7, 0, None), decode(0x7000))
+        self.assertEqual((7, 0, None), decode(0x7003))
+
+    def test_table_covers_every_word(self):
+        self.assertEqual(1 << 16, len(DECODED))
+        for word in (0x0000, 0x7020, 0xF400, 0xFFFF):
+            self.assertEqual(decode(word), DECODED[word])
+
+    def test_table_shares_equal_entries(self):
+        self.assertTrue(DECODED[0x1000] is DECODED[0x1FFF])
@@ -0,0 +1,308 @@
+import io
+import os
+from unittest import TestCase
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.computer import Computer, CYCLE_LIMIT
+from amitayh.mano.devices import InputDevice, OutputDevice, read_chunks
+from amitayh.mano.fast import FastComputer
+from amitayh.mano.jit import BlockComputer
+
+
+# Copy input to output until a zero character
+ECHO = """
+         ORG 100
+    LOP, SKI
+         BUN LOP
+         CLA
+         INP
+         SZA
+         BUN PUT
+         HLT
+    PUT, SKO
+         BUN PUT
+         OUT
+         BUN LOP
+         END
+"""
+
+# Print a string from an interrupt handler while the main loop waits
+PRINT_WITH_INTERRUPTS = """
+         ORG 0
+    ZRO, HEX 0
+         BUN SRV
+
+         ORG 100
+         ION
+    LOP, LDA CNT
+         SZA
+         BUN LOP
+         HLT
+
+    SRV, STA SAC
+         LDA PTR I
+         OUT
+         ISZ PTR
+         ISZ CNT
+         BUN RET
+         LDA SAC
+         BUN ZRO I
+    RET, LDA SAC
+         ION
+         BUN ZRO I
+    SAC, HEX 0
+    PTR, HEX 200
+    CNT, DEC -3
+
+         ORG 200
+         HEX 61
+         HEX 62
+         HEX 63
+         END
+"""
+
+
+class TestDevices(TestCase):
+    computer_class = Computer
+
+    def echo(self, source, latency=0, sink=None):
+        computer = self.computer_class()
+        output = OutputDevice(sink, latency)
+        computer.attach(InputDevice(source, latency), output)
+        result = computer.run(Assembler(ECHO).load(computer.ram),
+                              max_cycles=100000)
+        self.assertTrue(result.halted)
+
+        return output, result
+
+    def test_echo(self):
+        output, result = self.echo(b'hello\0')
+
+        self.assertEqual(b'hello', output.data)
+
+    def test_latency_delays_input_and_output(self):
+        fast, fast_result = self.echo(b'hi\0')
+        slow, slow_result = self.echo(b'hi\0', latency=100)
+
+        self.assertEqual(b'hi', slow.data)
+        self.assertTrue(slow_result.cycles > fast_result.cycles + 200)
+
+    def test_generator_source(self):
+        output, result = self.echo(iter([104, b'ey', 0]))
+
+        self.assertEqual(b'hey', output.data)
+
+    def test_file_source_and_sink(self):
+        sink = io.BytesIO()
+        output, result = self.echo(io.BytesIO(b'abc\0'), sink=sink)
+
+        self.assertEqual(b'abc', sink.getvalue())
+        self.assertEqual(3, output.flushed)
+
+    def test_pipes(self):
+        read_in, write_in = os.pipe()
+        read_out, write_out = os.pipe()
+        os.write(write_in, b'pipe\0')
+        os.close(write_in)
+        try:
+            self.echo(read_in, sink=write_out)
+            self.assertEqual(b'pipe', os.read(read_out, 16))
+        finally:
+            for fd in (read_in, read_out, write_out):
+                os.close(fd)
+
+
+class TestInterrupts(TestCase):
+    computer_class = Computer
+
+    def print_with_interrupts(self, latency):
+        computer = self.computer_class()
+        output = OutputDevice(latency=latency)
+        computer.attach(output_device=output)
+        Assembler(PRINT_WITH_INTERRUPTS).load(computer.ram)
+        result = computer.run(0x100, max_cycles=100000)
+
+        return computer, output, result
+
+    def test_interrupt_driven_output(self):
+        computer, output, result = self.print_with_interrupts(latency=50)
+
+        self.assertTrue(result.halted)
+        self.assertEqual(b'abc', output.data)
+        self.assertEqual(3, computer.interrupts)
+
+    def test_same_timing_as_cycle_accurate_computer(self):
+        expected = Computer()
+        expected_output = OutputDevice(latency=50)
+        expected.attach(output_device=expected_output)
+        Assembler(PRINT_WITH_INTERRUPTS).load(expected.ram)
+        expected.run(0x100, max_cycles=100000)
+
+        computer, output, result = self.print_with_interrupts(latency=50)
+
+        self.assertEqual(expected.cycles, computer.cycles)
+        self.assertEqual(expected.instructions, computer.instructions)
+        self.assertEqual(expected.pc.word, computer.pc.word)
+
+    def test_interrupt_is_raised_when_event_is_due(self):
+        program = """
+                 ORG 100
+            LOP, INC
+                 BUN LOP
+                 END
+        """
+        computer = self.computer_class()
+        program_start = Assembler(program).load(computer.ram)
+        computer.ien.word = 1
+        computer.fgi.word = 1
+        computer.schedule(100)
+        computer.run(program_start, max_cycles=200)
+
+        self.assertEqual(1, computer.interrupts)
+        self.assertTrue(computer.ram.read(0) in (0x100, 0x101))
+        self.assertEqual(0, computer.ien.word)
+
+    def test_no_interrupt_right_after_ion(self):
+        program = """
+                 ORG 100
+                 ION
+                 INC
+                 INC
+                 HLT
+                 END
+        """
+        computer = self.computer_class()
+        computer.fgo.word = 1
+        computer.ram.write(1, 0x7001)   # HLT
+        computer.run(Assembler(program).load(computer.ram))
+
+        # Interrupted after the INC following ION
+        self.assertEqual(1, computer.ac.word)
+        self.assertEqual(0x102, computer.ram.read(0))
+
+
+class TestSkipPolling(TestCase):
+    computer_class = FastComputer
+
+    def test_same_timing_as_cycle_accurate_computer(self):
+        counters = []
+        for cls in (Computer, self.computer_class):
+            computer = cls()
+            computer.attach(InputDevice(b'ab\0', latency=1000),
+                            OutputDevice(latency=300))
+            computer.run(Assembler(ECHO).load(computer.ram))
+            counters.append((computer.cycles, computer.instructions))
+
+        self.assertEqual(counters[0], counters[1])
+
+    def test_devices_are_serviced_before_the_first_block(self):
+        # attach() asks for the devices to be serviced at the first
+        # instruction boundary, which here is inside a translatable block
+        program = """
+                 ORG 100
+                 CLA
+                 CLE
+                 INC
+                 CMA
+                 CIL
+            LOP, SKI
+                 BUN LOP
+                 INP
+            PUT, SKO
+                 BUN PUT
+                 OUT
+                 HLT
+                 END
+        """
+        states = []
+        for cls in (Computer, self.computer_class):
+            computer = cls()
+            output = OutputDevice(latency=7)
+            computer.attach(InputDevice(b'x', latency=153), output)
+            computer.run(Assembler(program).load(computer.ram))
+            states.append((computer.cycles, computer.instructions,
+                           computer.ac.word, output.data))
+
+        self.assertEqual(states[0], states[1])
+
+    def test_long_latency(self):
+        computer = self.computer_class()
+        output = OutputDevice()
+        computer.attach(InputDevice(b'ab\0', latency=10 ** 9), output)
+        result = computer.run(Assembler(ECHO).load(computer.ram))
+
+        self.assertTrue(result.halted)
+        self.assertEqual(b'ab', output.data)
+        self.assertTrue(result.cycles > 3 * 10 ** 9)
+
+    def test_skipping_stops_at_limit(self):
+        program = """
+                 ORG 100
+            LOP, SKI
+                 BUN LOP
+                 HLT
+                 END
+        """
+        computer = self.computer_class()
+        result = computer.run(Assembler(program).load(computer.ram),
+                              max_cycles=10 ** 9)
+
+        self.assertEqual(CYCLE_LIMIT, result.reason)
+        self.assertTrue(10 ** 9 <= result.cycles < 10 ** 9 + 9)
+
+
+class TestFastComputerDevices(TestDevices):
+    computer_class = FastComputer
+
+
+class TestFastComputerInterrupts(TestInterrupts):
+    computer_class = FastComputer
+
+
+class TestBlockComputerDevices(TestDevices):
+    computer_class = BlockComputer
+
+
+class TestBlockComputerInterrupts(TestInterrupts):
+    computer_class = BlockComputer
+
+
+class TestBlockComputerSkipPolling(TestSkipPolling):
+    computer_class = BlockComputer
+
+
+class TestInputDevice(TestCase):
+    def test_read(self):
+        device = InputDevice(b'ab', latency=5)
+        device.schedule(10)
+
+        self.assertEqual(15, device.ready_at)
+        self.assertEqual(ord('a'), device.read())
+        self.assertEqual(None, device.ready_at)
+
+    def test_exhausted_device_is_never_ready(self):
+        device = InputDevice(b'')
+        device.schedule(10)
+
+        self.assertEqual(float('inf'), device.ready_at)
+
+    def test_read_chunks(self):
+        chunks = list(read_chunks(iter([1, 2, b'\x03\x04', 5]), 2))
+
+        self.assertEqual([b'\x01\x02', b'\x03\x04', b'\x05'], chunks)
+
+    def test_text_file_is_rejected(self):
+        device = InputDevice(io.StringIO('abc'))
+
+        self.assertRaises(TypeError, device.available)
+
+
+class TestOutputDevice(TestCase):
+    def test_buffer_is_flushed_when_full(self):
+        sink = io.BytesIO()
+        device = OutputDevice(sink, buffer_size=2)
+        for character in b'abc':
+            device.write(character)
+
+        self.assertEqual(b'ab', sink.getvalue())
+        device.flush()
+        self.assertEqual(b'abc', sink.getvalue())
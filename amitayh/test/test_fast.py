@@ -0,0 +1,170 @@
+from unittest import TestCase
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.computer import Computer, CYCLE_LIMIT, INFINITE_LOOP
+from amitayh.mano.fast import FastComputer
+from amitayh.mano.logger import Logger, INSTRUCTION
+from amitayh.test import test_computer
+
+
+REGISTERS = ('ar', 'pc', 'dr', 'ac', 'ir', 'tr', 'inpr', 'outr',
+             'sc', 'e', 's', 'r', 'ien', 'fgi', 'fgo')
+
+
+class TestFastComputer(test_computer.TestComputer):
+    @staticmethod
+    def create_computer(program):
+        computer = FastComputer()
+        assembler = Assembler(program)
+        program_start = assembler.load(computer.ram)
+        computer.run(program_start)
+
+        return computer
+
+
+class TestFastComputerRun(test_computer.TestComputerRun):
+    computer_class = FastComputer
+
+    def test_max_cycles(self):
+        computer, program_start = self.load(self.count_forever)
+        result = computer.run(program_start, max_cycles=100)
+
+        # Limits are checked between instructions
+        self.assertEqual(CYCLE_LIMIT, result.reason)
+        self.assertEqual(103, result.cycles)
+        self.assertEqual(23, result.instructions)
+
+    def test_detect_branch_to_itself(self):
+        program = """
+                 ORG 100
+                 INC
+            LOP, BUN LOP
+                 END
+        """
+        computer, program_start = self.load(program)
+        result = computer.run(program_start, max_cycles=1000)
+
+        # Loops are detected between chunks of instructions
+        self.assertEqual(INFINITE_LOOP, result.reason)
+        self.assertTrue(result.cycles < 1000)
+        self.assertEqual(0x101, computer.pc.word)
+
+
+class TestFastComputerBankSwitching(test_computer.TestBankSwitching):
+    computer_class = FastComputer
+
+
+class TestFastComputerLogging(TestCase):
+    def test_log_instructions(self):
+        program = """
+            ORG 100
+            CLA
+            HLT
+            END
+        """
+        logger = Logger(level=INSTRUCTION)
+        computer = FastComputer(logger)
+        computer.run(Assembler(program).load(computer.ram))
+
+        self.assertEqual(['100: 7800', '101: 7001'], logger.messages)
+
+
+class TestFastComputerEquivalence(TestCase):
+    def test_register_reference_instructions(self):
+        self.assertSameState("""
+                 ORG 100
+                 LDA AAA
+                 CIL
+                 CIL
+                 CME
+                 CIR
+                 SZE
+                 CLE
+                 SPA
+                 CMA
+                 SNA
+                 INC
+                 SZA
+                 CLA
+                 SZA
+                 HLT
+                 HLT
+            AAA, HEX 8421
+                 END
+        """)
+
+    def test_io_instructions(self):
+        self.assertSameState("""
+                 ORG 100
+                 LDA AAA
+                 OUT
+                 SKO
+                 SKI
+                 ION
+                 IOF
+                 INP
+                 HLT
+            AAA, HEX 1234
+                 END
+        """)
+
+    def test_self_modifying_code(self):
+        self.assertSameState("""
+                 ORG 100
+                 LDA NEW
+                 STA PAT
+            PAT, CLA
+                 BSA SUB
+                 HLT
+            NEW, INC
+            SUB, HEX 0
+                 ISZ CNT
+                 BUN SUB I
+            CNT, DEC -1
+                 END
+        """)
+
+    def test_interrupt_cycle(self):
+        program = """
+                 ORG 100
+                 CLA
+                 INC
+                 HLT
+                 END
+        """
+        slow = self.create_computer(Computer, program)
+        fast = self.create_computer(FastComputer, program)
+        for computer in (slow, fast):
+            computer.pc.word = 0x100
+            computer.r.word = 1
+            computer.ien.word = 1
+
+        for t in range(3):
+            slow.tick()
+        fast.step()
+
+        self.assertEqual(0x100, fast.ram.read(0))
+        self.assertEqual(1, fast.pc.word)
+        self.assertEqual(self.state(slow), self.state(fast))
+
+    def assertSameState(self, program):
+        slow = self.create_computer(Computer, program)
+        slow.run(0x100)
+        fast = self.create_computer(FastComputer, program)
+        fast.run(0x100)
+
+        self.assertEqual(self.state(slow), self.state(fast))
+
+    @staticmethod
+    def create_computer(cls, program):
+        computer = cls()
+        Assembler(program).load(computer.ram)
+
+        return computer
+
+    @staticmethod
+    def state(computer):
+        registers = [getattr(computer, name).word for name in REGISTERS]
+        memory = [computer.ram.read(address)
+                  for address in range(computer.ram.size)]
+
+        return registers, memory
@@ -0,0 +1,165 @@
+from unittest import TestCase
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.computer import Computer, HALTED, INSTRUCTION_LIMIT
+from amitayh.mano.fast import FastComputer
+from amitayh.mano.history import History
+from amitayh.mano.memory import BankedMemory, PagedMemory
+from amitayh.mano.snapshot import REGISTERS
+
+
+PROGRAM = """
+         ORG 100
+         CLA
+    LOP, ADD PTR I
+         ISZ PTR
+         ISZ CNT
+         BUN LOP
+         BSA SUB
+         HLT
+    PTR, HEX 200
+    CNT, DEC -4
+    SUB, HEX 0
+         STA SUM
+         BUN SUB I
+    SUM, HEX 0
+
+         ORG 200
+         HEX 10
+         HEX 20
+         HEX 30
+         HEX 40
+         END
+"""
+
+
+class TestHistory(TestCase):
+    computer_class = FastComputer
+
+    def setUp(self):
+        self.computer = self.computer_class(memory=PagedMemory(1024 * 4))
+        self.computer.pc.word = Assembler(PROGRAM).load(self.computer.ram)
+        self.computer.s.word = 1
+
+    def tearDown(self):
+        self.computer = None
+
+    def test_step_back(self):
+        history = History(self.computer)
+        states = [self.state()]
+        while self.computer.s.word == 1:
+            history.step()
+            states.append(self.state())
+
+        self.assertEqual(0xA0, self.computer.ram.read(0x10C))
+        for position in reversed(range(len(states) - 1)):
+            self.assertEqual(1, history.step_back())
+            self.assertEqual(states[position], self.state())
+
+    def test_step_back_past_undo_ring(self):
+        history = History(self.computer, size=4, checkpoint_interval=5)
+        states = [self.state()]
+        for _ in range(20):
+            history.step()
+            states.append(self.state())
+
+        self.assertEqual(13, history.step_back(13))
+        self.assertEqual(states[7], self.state())
+        self.assertEqual(2, history.step_back(2))
+        self.assertEqual(states[5], self.state())
+
+        history.run()
+        self.assertEqual(0xA0, self.computer.ram.read(0x10C))
+
+    def test_step_back_as_far_as_recorded(self):
+        history = History(self.computer, size=4, checkpoints=1)
+        initial = self.state()
+        for _ in range(3):
+            history.step()
+
+        self.assertEqual(3, history.step_back(10))
+        self.assertEqual(initial, self.state())
+        self.assertEqual(0, history.step_back())
+
+    def test_run_back_to(self):
+        history = History(self.computer)
+        result = history.run()
+        self.assertEqual(HALTED, result.reason)
+        self.assertEqual(20, result.instructions)
+
+        self.assertEqual(3, history.run_back_to(0x10A))
+        self.assertEqual(0x10A, self.computer.pc.word)
+        self.assertEqual(0, self.computer.ram.read(0x10C))
+        self.assertEqual(0xA0, self.computer.ac.word)
+
+        self.assertEqual(None, history.run_back_to(0xFFF))
+        self.assertEqual(0x10A, self.computer.pc.word)
+
+    def test_run_with_limit(self):
+        history = History(self.computer)
+        result = history.run(max_instructions=5)
+        self.assertEqual(INSTRUCTION_LIMIT, result.reason)
+        self.assertEqual(5, result.instructions)
+
+    def test_close_detaches(self):
+        memory = self.computer.ram
+        history = History(self.computer)
+        self.assertFalse(self.computer.ram is memory)
+
+        history.close()
+        self.assertTrue(self.computer.ram is memory)
+
+    def state(self):
+        registers = [getattr(self.computer, name).word for name in REGISTERS]
+        counters = [self.computer.cycles, self.computer.instructions]
+
+        return registers, counters, self.computer.ram.dump()
+
+
+class TestCycleAccurateHistory(TestHistory):
+    computer_class = Computer
+
+
+class TestBankedHistory(TestCase):
+    program = """
+             ORG 100
+             LDA SEV
+             STA WIN
+             LDA ONE
+             SBK
+             LDA TWO
+             STA WIN
+             HLT
+        ONE, DEC 1
+        TWO, DEC 2
+        SEV, DEC 7
+             ORG 800
+        WIN, HEX 0
+             END
+    """
+
+    def test_step_back_across_bank_switch(self):
+        for computer_class in (FastComputer, Computer):
+            computer = computer_class(memory=BankedMemory(banks=2))
+            computer.pc.word = Assembler(self.program).load(computer.ram)
+            computer.s.word = 1
+            history = History(computer)
+            states = [self.state(computer)]
+            while computer.s.word == 1:
+                history.step()
+                states.append(self.state(computer))
+
+            self.assertEqual(1, computer.ram.bank)
+            history.step_back(5)
+            del states[-5:]
+            self.assertEqual(0, computer.ram.bank)
+            self.assertEqual(7, computer.ram.read(0x800))
+            self.assertEqual(states.pop(), self.state(computer))
+            while states:
+                history.step_back()
+                self.assertEqual(states.pop(), self.state(computer))
+
+    @staticmethod
+    def state(computer):
+        registers = [getattr(computer, name).word for name in REGISTERS]
+
+        return registers, computer.ram.bank, computer.ram.dump()
@@ -0,0 +1,200 @@
+from unittest import TestCase
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.computer import Computer, CYCLE_LIMIT, INFINITE_LOOP
+from amitayh.mano.jit import BlockComputer, translate_block
+from amitayh.mano.memory import PagedMemory
+from amitayh.test import test_computer
+from amitayh.test.test_fast import REGISTERS
+
+
+class TestBlockComputer(test_computer.TestComputer):
+    @staticmethod
+    def create_computer(program):
+        computer = BlockComputer()
+        assembler = Assembler(program)
+        program_start = assembler.load(computer.ram)
+        computer.run(program_start)
+
+        return computer
+
+
+class TestBlockComputerBankSwitching(test_computer.TestBankSwitching):
+    computer_class = BlockComputer
+
+
+class TestBlockComputerRun(test_computer.TestComputerRun):
+    computer_class = BlockComputer
+
+    def test_max_cycles(self):
+        computer, program_start = self.load(self.count_forever)
+        result = computer.run(program_start, max_cycles=100)
+
+        # Limits are checked between instructions
+        self.assertEqual(CYCLE_LIMIT, result.reason)
+        self.assertEqual(103, result.cycles)
+        self.assertEqual(23, result.instructions)
+
+    def test_detect_branch_to_itself(self):
+        program = """
+                 ORG 100
+                 INC
+            LOP, BUN LOP
+                 END
+        """
+        computer, program_start = self.load(program)
+        result = computer.run(program_start, max_cycles=10000)
+
+        self.assertEqual(INFINITE_LOOP, result.reason)
+        self.assertTrue(result.cycles < 10000)
+        self.assertEqual(0x101, computer.pc.word)
+
+
+class TestBlockComputerEquivalence(TestCase):
+    def test_register_reference_instructions(self):
+        self.assertSameState("""
+                 ORG 100
+                 LDA AAA
+                 CIL
+                 CIL
+                 CME
+                 CIR
+                 SZE
+                 CLE
+                 SPA
+                 CMA
+                 SNA
+                 INC
+                 SZA
+                 CLA
+                 SZA
+                 HLT
+                 HLT
+            AAA, HEX 8421
+                 END
+        """)
+
+    def test_io_instructions(self):
+        self.assertSameState("""
+                 ORG 100
+                 LDA AAA
+                 OUT
+                 SKO
+                 SKI
+                 ION
+                 IOF
+                 INP
+                 HLT
+            AAA, HEX 1234
+                 END
+        """)
+
+    def test_self_modifying_code(self):
+        # The second pass through the loop runs the patched instruction
+        self.assertSameState("""
+                 ORG 100
+            LOP, LDA NEW
+                 STA PAT
+            PAT, CLA
+                 ISZ CNT
+                 BUN LOP
+                 HLT
+            NEW, INC
+            CNT, DEC -2
+                 END
+        """)
+
+    def test_self_modifying_code_while_stepping(self):
+        # With interrupts enabled and an event close, instructions run
+        # through step(), so the patch isn't made by a translated block
+        program = """
+                 ORG 100
+                 ION
+            LOP, ISZ AAA
+                 ISZ CNT
+                 BUN NXT
+                 HLT
+            NXT, ISZ HLF
+                 BUN LOP
+                 LDA NEW
+                 STA LOP
+                 BUN LOP
+            NEW, ISZ BBB
+            AAA, HEX 0
+            BBB, HEX 0
+            CNT, DEC -300
+            HLF, DEC -150
+                 END
+        """
+        states = []
+        for cls in (Computer, BlockComputer):
+            computer = self.create_computer(cls, program)
+            computer.schedule(4700)
+            computer.run(0x100)
+            states.append(self.state(computer))
+
+        self.assertEqual(states[0], states[1])
+        self.assertEqual(150, states[1][1][0x10B])
+        self.assertEqual(150, states[1][1][0x10C])
+
+    def test_paged_memory(self):
+        program = """
+                 ORG 100
+                 LDA AAA
+                 ADD AAA
+                 STA BBB
+                 HLT
+            AAA, HEX 8421
+            BBB, HEX 0
+                 END
+        """
+        computer = BlockComputer(memory=PagedMemory(4096))
+        computer.run(Assembler(program).load(computer.ram))
+
+        self.assertEqual(0x0842, computer.ram.read(0x105))
+        self.assertEqual(1, computer.e.word)
+
+    def test_write_invalidates_block(self):
+        program = """
+                 ORG 100
+                 CLA
+                 INC
+                 HLT
+                 END
+        """
+        computer = BlockComputer()
+        Assembler(program).load(computer.ram)
+        computer.translate(0x100)
+        computer.translate(0x101)
+        computer.invalidate(0x101)
+
+        self.assertEqual({}, computer.blocks)
+        self.assertEqual(0, computer.covering[0x100])
+
+    def test_io_instruction_is_not_translated(self):
+        computer = BlockComputer()
+        computer.ram.write(0x100, 0xF080)
+
+        self.assertEqual((None, 0x101), translate_block(computer.ram, 0x100))
+
+    def assertSameState(self, program):
+        slow = self.create_computer(Computer, program)
+        slow.run(0x100)
+        fast = self.create_computer(BlockComputer, program)
+        fast.run(0x100)
+
+        self.assertEqual(self.state(slow), self.state(fast))
+
+    @staticmethod
+    def create_computer(cls, program):
+        computer = cls()
+        Assembler(program).load(computer.ram)
+
+        return computer
+
+    @staticmethod
+    def state(computer):
+        registers = [getattr(computer, name).word for name in REGISTERS]
+        memory = [computer.ram.read(address)
+                  for address in range(computer.ram.size)]
+
+        return registers, memory
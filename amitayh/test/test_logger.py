@@ -1,5 +1,7 @@
+from io import StringIO
 from unittest import TestCase
-from amitayh.mano.logger import Logger
+from amitayh.mano.logger import Logger, NullLogger, RingLogger, \
+    StreamLogger, MICRO_OPERATION, INSTRUCTION
 
 
 class TestLogger(TestCase):
@@ -25,4 +27,53 @@ class TestLogger(TestCase):
         self.assertEquals('Logger(last_message="foo")', str(self.logger))
 
         self.logger.log('bar')
-        self.assertEquals('Logger(last_message="bar")', str(self.logger))
\ No newline at end of file
+        self.assertEquals('Logger(last_message="bar")', str(self.logger))
+
+
+class TestLoggerLevels(TestCase):
+    def test_logger_enabled_for_its_level_and_above(self):
+        logger = Logger(level=INSTRUCTION)
+        self.assertFalse(logger.is_enabled_for(MICRO_OPERATION))
+        self.assertTrue(logger.is_enabled_for(INSTRUCTION))
+
+    def test_null_logger_is_never_enabled(self):
+        logger = NullLogger()
+        self.assertFalse(logger.is_enabled_for(MICRO_OPERATION))
+        self.assertFalse(logger.is_enabled_for(INSTRUCTION))
+
+        logger.log('foo')
+        self.assertEqual((), logger.messages)
+        self.assertEqual('NullLogger()', str(logger))
+
+
+class TestRingLogger(TestCase):
+    def test_keeps_last_messages(self):
+        logger = RingLogger(size=2)
+        logger.log('foo')
+        logger.log('bar')
+        logger.log('baz')
+        self.assertEqual(['bar', 'baz'], list(logger.messages))
+        self.assertEqual('RingLogger(last_message="baz")', str(logger))
+
+
+class TestStreamLogger(TestCase):
+    def setUp(self):
+        self.stream = StringIO()
+        self.logger = StreamLogger(self.stream, batch_size=2)
+
+    def tearDown(self):
+        self.stream = None
+        self.logger = None
+
+    def test_writes_in_batches(self):
+        self.logger.log('foo')
+        self.assertEqual('', self.stream.getvalue())
+
+        self.logger.log('bar')
+        self.assertEqual('foo\nbar\n', self.stream.getvalue())
+
+    def test_flush_writes_pending_messages(self):
+        self.logger.log('foo')
+        self.logger.flush()
+        self.assertEqual('foo\n', self.stream.getvalue())
+        self.assertEqual([], self.logger.messages)
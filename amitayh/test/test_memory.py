@@ -0,0 +1,299 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from amitayh.mano.memory import Memory, BankedMemory, HashedMemory, \
+    MappedMemory, PagedMemory, memory_hash
+
+
+class TestMemory(TestCase):
+    def setUp(self):
+        self.memory = Memory(1024 * 4)
+
+    def tearDown(self):
+        self.memory = None
+
+    def test_words_are_16_bit(self):
+        self.memory.write(0x000, -23)
+        self.memory.write(0x001, 0x12345)
+        self.assertEqual(0xFFE9, self.memory.read(0x000))
+        self.assertEqual(0x2345, self.memory.read(0x001))
+
+    def test_write_block(self):
+        self.memory.write_block(0x100, [0x7800, 0x7020, -1])
+        self.assertEqual(0x7800, self.memory.read(0x100))
+        self.assertEqual(0x7020, self.memory.read(0x101))
+        self.assertEqual(0xFFFF, self.memory.read(0x102))
+
+    def test_write_block_out_of_range(self):
+        self.assertRaises(IndexError, self.memory.write_block, 0xFFF, [1, 2])
+        self.assertEqual(1024 * 4, len(self.memory.data))
+
+    def test_load_image(self):
+        self.memory.load_image(b'\x01\x78\x20\x70', 0x100)
+        self.assertEqual(0x7801, self.memory.read(0x100))
+        self.assertEqual(0x7020, self.memory.read(0x101))
+
+    def test_dump(self):
+        self.memory.write(0x000, 0x1234)
+        image = self.memory.dump()
+        self.assertEqual(1024 * 4 * 2, len(image))
+        self.assertEqual(b'\x34\x12\x00\x00', image[:4])
+
+        memory = Memory(1024 * 4)
+        memory.load_image(image)
+        self.assertEqual(0x1234, memory.read(0x000))
+
+    def test_fork(self):
+        self.memory.write(0x000, 0x1234)
+        fork = self.memory.fork()
+        fork.write(0x000, 0x5678)
+        self.assertEqual(0x1234, self.memory.read(0x000))
+        self.assertEqual(0x5678, fork.read(0x000))
+
+    def test_dirty_pages(self):
+        self.memory.write(0x101, 0x1234)
+        pages = list(self.memory.dirty_pages())
+        self.assertEqual([0x100], [address for address, words in pages])
+        self.assertEqual(0x1234, pages[0][1][1])
+
+    def test_clear(self):
+        self.memory.write(0x101, 0x1234)
+        self.memory.clear()
+        self.assertEqual(0, self.memory.read(0x101))
+        self.assertEqual([], list(self.memory.dirty_pages()))
+
+
+class TestPagedMemory(TestCase):
+    def setUp(self):
+        self.memory = PagedMemory(1024 * 4, page_size=256)
+
+    def tearDown(self):
+        self.memory = None
+
+    def test_read_write(self):
+        self.memory.write(0x000, 0x000A)
+        self.memory.write(0x1FF, -1)
+        self.assertEqual(0x000A, self.memory.read(0x000))
+        self.assertEqual(0xFFFF, self.memory.read(0x1FF))
+        self.assertEqual(0, self.memory.read(0x100))
+
+    def test_fork_shares_pages_until_written(self):
+        self.memory.write(0x000, 0x1234)
+        fork = self.memory.fork()
+        self.assertTrue(fork.pages[0] is self.memory.pages[0])
+
+        fork.write(0x001, 0x5678)
+        self.assertFalse(fork.pages[0] is self.memory.pages[0])
+        self.assertTrue(fork.pages[1] is self.memory.pages[1])
+        self.assertEqual(0x1234, fork.read(0x000))
+        self.assertEqual(0x5678, fork.read(0x001))
+        self.assertEqual(0, self.memory.read(0x001))
+
+        self.memory.write(0x000, 0x4321)
+        self.assertEqual(0x1234, fork.read(0x000))
+
+    def test_write_block_across_pages(self):
+        self.memory.write_block(0x0FE, [1, 2, 3, 4])
+        self.assertEqual([1, 2, 3, 4],
+                         [self.memory.read(a) for a in range(0x0FE, 0x102)])
+        self.assertRaises(IndexError, self.memory.write_block, 0xFFF, [1, 2])
+
+    def test_dump_and_load_image(self):
+        self.memory.write(0x000, 0x1234)
+        self.memory.write(0xFFF, 0xABCD)
+        image = self.memory.dump()
+        self.assertEqual(1024 * 4 * 2, len(image))
+
+        memory = Memory(1024 * 4)
+        memory.load_image(image)
+        self.assertEqual(0x1234, memory.read(0x000))
+        self.assertEqual(0xABCD, memory.read(0xFFF))
+
+    def test_dirty_pages(self):
+        self.memory.write(0x101, 0x1234)
+        self.memory.write(0x102, 0)
+        self.memory.write(0x300, 0)
+        pages = list(self.memory.dirty_pages())
+        self.assertEqual([0x100, 0x300], [address for address, _ in pages])
+        self.assertEqual(256, len(pages[0][1]))
+
+    def test_clear(self):
+        self.memory.write(0x101, 0x1234)
+        fork = self.memory.fork()
+        self.memory.clear()
+        self.assertEqual(0, self.memory.read(0x101))
+        self.assertEqual([], list(self.memory.dirty_pages()))
+        self.assertEqual(0x1234, fork.read(0x101))
+
+        self.memory.write(0x000, 1)
+        self.assertEqual(0, self.memory.read(0x100))
+
+    def test_page_size_must_be_power_of_2(self):
+        self.assertRaises(ValueError, PagedMemory, 1024, 100)
+
+
+class TestBankedMemory(TestCase):
+    def setUp(self):
+        self.memory = BankedMemory(banks=1 << 16)
+
+    def tearDown(self):
+        self.memory = None
+
+    def test_window(self):
+        self.memory.write(0x7FF, 1)
+        self.memory.write(0x800, 2)
+        self.memory.select(3)
+        self.memory.write(0x800, 3)
+
+        self.assertEqual(1, self.memory.read(0x7FF))
+        self.assertEqual(3, self.memory.read(0x800))
+        self.assertEqual(0x2000, self.memory.physical(0x800))
+        self.memory.select(0)
+        self.assertEqual(2, self.memory.read(0x800))
+
+    def test_bank_wraps_around(self):
+        self.memory.select((1 << 16) + 2)
+        self.assertEqual(2, self.memory.bank)
+
+    def test_pages_are_allocated_when_written(self):
+        self.assertEqual((1 << 16) * 0x800 + 0x800, self.memory.capacity)
+        self.memory.select(0xFFFF)
+        self.assertEqual(0, self.memory.read(0xFFF))
+        self.assertEqual(0, len(self.memory.pages))
+
+        self.memory.write(0xFFF, 0x12345)
+        self.assertEqual(0x2345, self.memory.read(0xFFF))
+        self.assertEqual([(self.memory.capacity - 256, 0x2345)],
+                         [(address, words[-1]) for address, words in
+                          self.memory.dirty_pages()])
+
+    def test_write_block(self):
+        self.memory.select(1)
+        self.memory.write_block(0x7FF, [1, 2])
+        self.assertEqual(1, self.memory.read(0x7FF))
+        self.assertEqual(2, self.memory.read(0x800))
+        self.assertRaises(IndexError, self.memory.write_block, 0xFFF, [1, 2])
+
+    def test_dump(self):
+        memory = BankedMemory(banks=2)
+        memory.select(1)
+        memory.write(0x800, 0x1234)
+        image = memory.dump()
+        self.assertEqual(0x1800 * 2, len(image))
+        self.assertEqual(b'\x34\x12', image[0x2000:0x2002])
+
+    def test_fork(self):
+        self.memory.select(5)
+        self.memory.write(0x900, 1)
+        fork = self.memory.fork()
+        fork.write(0x900, 2)
+        fork.select(0)
+
+        self.assertEqual(1, self.memory.read(0x900))
+        self.assertEqual(5, self.memory.bank)
+
+    def test_invalid_window(self):
+        self.assertRaises(ValueError, BankedMemory, 2, 0x1000)
+
+    def test_clear(self):
+        self.memory.select(3)
+        self.memory.write(0x900, 1)
+        self.memory.clear()
+        self.assertEqual(0, self.memory.bank)
+        self.assertEqual(0, len(self.memory.pages))
+
+
+class TestHashedMemory(TestCase):
+    def setUp(self):
+        self.memory = HashedMemory(1024 * 4)
+
+    def tearDown(self):
+        self.memory = None
+
+    def test_empty_memory(self):
+        self.assertEqual(0, self.memory.hash)
+
+    def test_hash_follows_writes(self):
+        self.memory.write(0x100, 0x1234)
+        self.memory.write_block(0x200, [1, 2, 3])
+        self.assertNotEqual(0, self.memory.hash)
+        self.assertEqual(memory_hash(self.memory), self.memory.hash)
+
+        self.memory.write(0x100, 0)
+        self.memory.write_block(0x200, [0, 0, 0])
+        self.assertEqual(0, self.memory.hash)
+
+    def test_hash_depends_on_address(self):
+        self.memory.write(0x100, 0x1234)
+        self.memory.write(0x101, 0x5678)
+        other = HashedMemory(1024 * 4)
+        other.write(0x100, 0x5678)
+        other.write(0x101, 0x1234)
+        self.assertNotEqual(self.memory.hash, other.hash)
+
+    def test_same_hash_as_other_memories(self):
+        memory = PagedMemory(1024 * 4)
+        for target in (self.memory, memory):
+            target.load_image(b'\x01\x78\x20\x70', 0x100)
+        self.assertEqual(memory_hash(memory), self.memory.hash)
+
+    def test_fork(self):
+        self.memory.write(0x000, 0x1234)
+        fork = self.memory.fork()
+        fork.write(0x000, 0x5678)
+        self.assertEqual(memory_hash(self.memory), self.memory.hash)
+        self.assertEqual(memory_hash(fork), fork.hash)
+
+    def test_rehash(self):
+        self.memory.data[0x100] = 0x1234
+        self.memory.rehash()
+        self.memory.write(0x100, 0)
+        self.assertEqual(0, self.memory.hash)
+
+    def test_clear(self):
+        self.memory.write(0x100, 0x1234)
+        self.memory.clear()
+        self.assertEqual(0, self.memory.hash)
+        self.assertEqual(0, self.memory.read(0x100))
+
+
+class TestMappedMemory(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'core.img')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_writes_go_to_image_file(self):
+        memory = MappedMemory.create(self.path, 1024 * 4)
+        memory.write(0x001, 0xABCD)
+        memory.flush()
+        memory.close()
+
+        with open(self.path, 'rb') as image:
+            self.assertEqual(b'\x00\x00\xcd\xab', image.read(4))
+
+    def test_map_existing_image(self):
+        with open(self.path, 'wb') as image:
+            image.write(b'\x01\x78\x20\x70')
+
+        memory = MappedMemory(self.path)
+        self.assertEqual(2, memory.size)
+        self.assertEqual(0x7801, memory.read(0))
+        self.assertEqual(0x7020, memory.read(1))
+        memory.close()
+
+    def test_image_size_mismatch(self):
+        with open(self.path, 'wb') as image:
+            image.write(b'\x00\x00')
+
+        self.assertRaises(ValueError, MappedMemory, self.path, 1024 * 4)
+
+    def test_load_assembled_program(self):
+        memory = MappedMemory.create(self.path, 1024 * 4)
+        memory.write_block(0x100, [0x7800, 0x7001])
+        self.assertEqual(0x7800, memory.read(0x100))
+        self.assertEqual(b'\x00\x78\x01\x70', memory.dump()[0x200:0x204])
+        memory.close()
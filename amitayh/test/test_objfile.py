@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.fast import FastComputer
+from amitayh.mano.memory import Memory
+from amitayh.mano.objfile import ObjectFile
+
+
+PROGRAM = """
+         ORG 100
+         LDA AAA
+         ADD BBB
+         HLT
+         ORG 200
+    AAA, HEX 1234
+    BBB, DEC -1
+         END
+"""
+
+
+class TestObjectFile(TestCase):
+    def setUp(self):
+        self.object_file = Assembler(PROGRAM).object_file()
+
+    def test_load(self):
+        memory = Memory(1024 * 4)
+        entry = self.object_file.load(memory)
+
+        expected = Memory(1024 * 4)
+        Assembler(PROGRAM).load(expected)
+        self.assertEqual(0x100, entry)
+        self.assertEqual(expected.dump(), memory.dump())
+
+    def test_round_trip(self):
+        data = self.object_file.to_bytes()
+        restored = ObjectFile.from_bytes(data)
+
+        self.assertEqual(0x100, restored.entry)
+        self.assertEqual({'AAA': 0x200, 'BBB': 0x201}, restored.symbols)
+        self.assertEqual(data, restored.to_bytes())
+
+    def test_run_loaded_program(self):
+        restored = ObjectFile.from_bytes(self.object_file.to_bytes())
+        computer = FastComputer()
+        computer.run(restored.load(computer.ram))
+
+        self.assertEqual(0x1233, computer.ac.word)
+
+    def test_memory_image(self):
+        memory = Memory(1024 * 4)
+        memory.write(0x10, 0xBEEF)
+        memory.write(0x800, 1)
+        image = ObjectFile.from_bytes(
+            ObjectFile.from_memory(memory).to_bytes())
+        copy = Memory(1024 * 4)
+        image.load(copy)
+
+        self.assertEqual(None, image.entry)
+        self.assertEqual(memory.dump(), copy.dump())
+
+    def test_save_and_load_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'program.obj')
+            self.object_file.save(path)
+            restored = ObjectFile.load_file(path)
+            self.assertEqual(self.object_file.to_bytes(), restored.to_bytes())
+        finally:
+            shutil.rmtree(directory)
+
+    def test_invalid_file(self):
+        self.assertRaises(ValueError, ObjectFile.from_bytes,
+                          b'MANS' + b'\0' * 16)
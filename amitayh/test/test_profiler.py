@@ -0,0 +1,117 @@
+from unittest import TestCase
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.computer import Computer
+from amitayh.mano.control import TableComputer
+from amitayh.mano.devices import InputDevice
+from amitayh.mano.fast import FastComputer
+from amitayh.mano.jit import BlockComputer
+from amitayh.mano.profiler import Profiler
+
+
+PROGRAM = """
+          ORG 100
+          BSA TWICE
+          BSA TWICE
+          HLT
+   TWICE, HEX 0
+          BSA ONCE
+          BSA ONCE
+          BUN TWICE I
+    ONCE, HEX 0
+          ISZ CNT
+          BUN ONCE I
+     CNT, HEX 0
+          END
+"""
+
+
+class TestProfiler(TestCase):
+    computer_class = FastComputer
+
+    def setUp(self):
+        self.assembler = Assembler(PROGRAM)
+        self.computer = self.computer_class()
+        self.profiler = Profiler(self.computer, self.assembler)
+        self.result = self.computer.run(self.assembler.load(self.computer.ram))
+
+    def tearDown(self):
+        self.profiler.close()
+
+    def test_flat_profile(self):
+        rows = self.profiler.flat_profile()
+        by_label = dict((row[1], row) for row in rows)
+
+        self.assertEqual((0x108, 'ONCE+1', 11, 4, 28), by_label['ONCE+1'])
+        self.assertEqual(self.result.cycles,
+                         sum(row[4] for row in rows))
+        self.assertEqual(self.result.instructions,
+                         sum(row[3] for row in rows))
+
+    def test_instruction_profile(self):
+        rows = dict((name, (executions, cycles)) for name, executions, cycles
+                    in self.profiler.instruction_profile())
+
+        self.assertEqual((6, 36), rows['BSA'])
+        self.assertEqual((6, 30), rows['BUN I'])
+        self.assertEqual((1, 4), rows['HLT'])
+
+    def test_collapsed_stacks(self):
+        self.assertEqual('\n'.join([
+            'main 16',
+            'main;TWICE 34',
+            'main;TWICE;ONCE 48',
+        ]), self.profiler.collapsed_stacks())
+
+    def test_close_restores_machine(self):
+        self.profiler.close()
+
+        self.assertFalse('step' in self.computer.__dict__)
+        self.assertFalse('tick' in self.computer.__dict__)
+
+
+class TestComputerProfiler(TestProfiler):
+    computer_class = Computer
+
+    def test_micro_operations(self):
+        rows = dict(self.profiler.micro_operation_profile())
+
+        self.assertEqual(4, rows["D6T6: M[AR] <- DR, if (DR = 0) then "
+                                 "(PC <- PC + 1), SC <- 0"])
+        self.assertEqual(self.result.instructions,
+                         rows["R'T2: AR <- IR(0-11)"])
+
+
+class TestTableComputerProfiler(TestComputerProfiler):
+    computer_class = TableComputer
+
+
+class TestBlockComputerProfiler(TestProfiler):
+    computer_class = BlockComputer
+
+
+class TestPollingProfile(TestCase):
+    program = """
+             ORG 100
+        LOP, SKI
+             BUN LOP
+             INP
+             HLT
+             END
+    """
+
+    def test_polling_loop_iterations_are_counted(self):
+        # Idle polling isn't skipped while profiled, so the faster engines
+        # count every iteration, like Computer
+        profiles = []
+        for computer_class in (Computer, FastComputer, BlockComputer):
+            assembler = Assembler(self.program)
+            computer = computer_class()
+            computer.attach(InputDevice(b'x', latency=1000))
+            profiler = Profiler(computer, assembler)
+            computer.run(assembler.load(computer.ram))
+            profiler.close()
+            profiles.append(profiler.flat_profile())
+
+        self.assertEqual(profiles[0], profiles[1])
+        self.assertEqual(profiles[0], profiles[2])
+        self.assertTrue(profiles[0][0][3] > 100)
@@ -0,0 +1,82 @@
+import os
+import shutil
+import sys
+import tempfile
+from io import StringIO
+from unittest import TestCase
+from amitayh.mano.computer import HALTED, CYCLE_LIMIT, INFINITE_LOOP
+from amitayh.mano.runner import Job, main, run_many
+
+
+ADD_TWO_NUMBERS = """
+         ORG 100
+         LDA AAA
+         ADD BBB
+         STA CCC
+         HLT
+    AAA, DEC 83
+    BBB, DEC -23
+    CCC, HEX 0
+         END
+"""
+
+COUNT_FOREVER = """
+         ORG 100
+    LOP, INC
+         BUN LOP
+         END
+"""
+
+WAIT_FOREVER = """
+         ORG 100
+    LOP, BUN LOP
+         END
+"""
+
+
+class TestRunner(TestCase):
+    def test_run_many(self):
+        jobs = [
+            Job(ADD_TWO_NUMBERS),
+            Job(ADD_TWO_NUMBERS, patches=[(0x104, 10)]),
+            Job(COUNT_FOREVER, max_cycles=100),
+            Job(WAIT_FOREVER, max_cycles=100)
+        ]
+        results = sorted(run_many(jobs, workers=2))
+
+        self.assertEqual([0, 1, 2, 3], [result.index for result in results])
+        self.assertEqual(jobs, [result.job for result in results])
+
+        self.assertEqual(HALTED, results[0].reason)
+        self.assertEqual(60, results[0].ac)
+        self.assertEqual(21, results[0].cycles)
+        self.assertEqual(4, results[0].instructions)
+        self.assertEqual(b'\x3c\x00', results[0].ram[0x20C:0x20E])
+
+        self.assertEqual(0xFFF3, results[1].ac)
+
+        self.assertEqual(CYCLE_LIMIT, results[2].reason)
+        self.assertEqual(103, results[2].cycles)
+        self.assertEqual(12, results[2].ac)
+
+        self.assertEqual(INFINITE_LOOP, results[3].reason)
+        self.assertTrue(results[3].cycles < 100)
+        self.assertEqual(0x100, results[3].pc)
+
+    def test_command_line(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'add.asm')
+        with open(path, 'w') as source:
+            source.write(ADD_TWO_NUMBERS)
+
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            main(['-w', '1', '-p', '104=A', path])
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+            shutil.rmtree(directory)
+
+        self.assertTrue(output.startswith(
+            '%s: halted cycles=21 AC=FFF3 E=0 PC=104' % path))
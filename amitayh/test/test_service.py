@@ -0,0 +1,209 @@
+import asyncio
+import base64
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.computer import HALTED, CYCLE_LIMIT
+from amitayh.mano.service import Worker, Service, Client, OUTPUT, RESULT, \
+    ERROR
+
+
+PRINT_STRING = """
+         ORG 100
+    LOP, LDA PTR I
+         SZA
+         BUN PRT
+         HLT
+    PRT, SKO
+         BUN PRT
+         OUT
+         ISZ PTR
+         BUN LOP
+    PTR, HEX 200
+         ORG 200
+         HEX 48
+         HEX 69
+         HEX 0
+         END
+"""
+
+ECHO = """
+         ORG 100
+    LOP, SKI
+         BUN LOP
+         INP
+    OUT, SKO
+         BUN OUT
+         OUT
+         BUN LOP
+         END
+"""
+
+COUNT_FOREVER = """
+         ORG 100
+    LOP, INC
+         BUN LOP
+         END
+"""
+
+
+class TestWorker(TestCase):
+    def serve(self, *requests, **options):
+        lines = b''.join(json.dumps(request).encode('utf-8') + b'\n'
+                         for request in requests)
+        responses = io.BytesIO()
+        Worker(io.BytesIO(lines), responses, **options).serve()
+
+        return [json.loads(line) for line in
+                responses.getvalue().decode('utf-8').splitlines()]
+
+    def test_run_source(self):
+        output, result = self.serve({'id': 7, 'source': PRINT_STRING})
+
+        self.assertEqual({'id': 7, 'type': OUTPUT, 'data': 'Hi'}, output)
+        self.assertEqual(RESULT, result['type'])
+        self.assertEqual(7, result['id'])
+        self.assertEqual(HALTED, result['reason'])
+        self.assertEqual(17, result['instructions'])
+
+    def test_run_object_file(self):
+        image = Assembler(PRINT_STRING).object_file().to_bytes()
+        responses = self.serve(
+            {'id': 1, 'object': base64.b64encode(image).decode('ascii')})
+
+        self.assertEqual('Hi', responses[0]['data'])
+        self.assertEqual(HALTED, responses[1]['reason'])
+
+    def test_input(self):
+        responses = self.serve(
+            {'id': 1, 'source': ECHO, 'input': 'abc', 'max_cycles': 10000})
+
+        self.assertEqual('abc', ''.join(response['data'] for response in
+                                        responses[:-1]))
+        self.assertEqual(CYCLE_LIMIT, responses[-1]['reason'])
+
+    def test_cycle_limit(self):
+        responses = self.serve(
+            {'id': 1, 'source': COUNT_FOREVER, 'max_cycles': 1000},
+            {'id': 2, 'source': COUNT_FOREVER, 'max_cycles': 10 ** 9},
+            max_cycles=5000)
+
+        self.assertEqual(CYCLE_LIMIT, responses[0]['reason'])
+        self.assertTrue(1000 <= responses[0]['cycles'] < 1010)
+        self.assertTrue(5000 <= responses[1]['cycles'] < 5010)
+
+    def test_no_cycles(self):
+        responses = self.serve({'id': 1, 'source': COUNT_FOREVER,
+                                'max_cycles': 0})
+
+        self.assertEqual(CYCLE_LIMIT, responses[0]['reason'])
+        self.assertEqual(0, responses[0]['cycles'])
+
+    def test_machine_is_reset_between_requests(self):
+        responses = self.serve(
+            {'id': 1, 'source': COUNT_FOREVER, 'max_cycles': 1000},
+            {'id': 2, 'source': PRINT_STRING})
+
+        self.assertEqual('Hi', responses[1]['data'])
+        self.assertEqual(84, responses[2]['cycles'])
+
+    def test_errors(self):
+        responses = self.serve(
+            {'id': 1, 'source': 'ORG 100\nFOO\nEND'},
+            {'id': 2, 'object': 'AAAA'},
+            {'id': 3},
+            {'id': 4, 'source': PRINT_STRING})
+
+        self.assertEqual([ERROR] * 3 + [OUTPUT, RESULT],
+                         [response['type'] for response in responses])
+        self.assertTrue('FOO' in responses[0]['message'])
+
+
+class TestService(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_concurrent_requests(self):
+        async def run():
+            service = Service(workers=2, max_cycles=10000)
+            await service.start()
+            path = os.path.join(self.directory, 'mano.sock')
+            await service.listen(path=path)
+            client = await Client.connect(path=path)
+            try:
+                return await asyncio.gather(
+                    client.run(source=PRINT_STRING),
+                    client.run(source=COUNT_FOREVER),
+                    client.run(source=ECHO, input='xyz'),
+                    client.run(source='FOO'))
+            finally:
+                await client.close()
+                await service.close()
+
+        responses = asyncio.run(run())
+
+        self.assertEqual('Hi', responses[0][0])
+        self.assertEqual(HALTED, responses[0][1]['reason'])
+        self.assertEqual(CYCLE_LIMIT, responses[1][1]['reason'])
+        self.assertEqual('xyz', responses[2][0])
+        self.assertEqual(ERROR, responses[3][1]['type'])
+
+    def test_worker_is_replaced(self):
+        async def run():
+            service = Service(workers=1, max_cycles=10 ** 9)
+            await service.start()
+            path = os.path.join(self.directory, 'mano.sock')
+            await service.listen(path=path)
+            client = await Client.connect(path=path)
+            try:
+                worker = service.workers[0]
+                running = asyncio.ensure_future(
+                    client.run(source=COUNT_FOREVER))
+                await asyncio.sleep(0.2)
+                worker.kill()
+                failed = await asyncio.wait_for(running, 10)
+                replaced = service.workers[0] is not worker
+                return failed, replaced, await client.run(source=PRINT_STRING)
+            finally:
+                await client.close()
+                await service.close()
+
+        failed, replaced, responses = asyncio.run(run())
+
+        self.assertEqual(ERROR, failed[1]['type'])
+        self.assertTrue('exited' in failed[1]['message'])
+        self.assertTrue(replaced)
+        self.assertEqual('Hi', responses[0])
+
+    def test_large_requests(self):
+        # Well past asyncio's default line limit of 64 KiB
+        large = PRINT_STRING.replace(
+            'END', 'ORG 300\n' + (' ' * 40 + 'HEX 0\n') * 3000 + 'END')
+        self.assertTrue(len(large) > 1 << 17)
+
+        async def run(line_size):
+            service = Service(workers=1, line_size=line_size)
+            await service.start()
+            path = os.path.join(self.directory, 'mano.sock')
+            await service.listen(path=path)
+            client = await Client.connect(path=path)
+            try:
+                return await asyncio.wait_for(client.run(source=large), 10)
+            finally:
+                await client.close()
+                await service.close()
+
+        output, result = asyncio.run(run(line_size=1 << 24))
+        self.assertEqual('Hi', output)
+        self.assertEqual(HALTED, result['reason'])
+
+        with self.assertRaises(ConnectionError) as context:
+            asyncio.run(run(line_size=1 << 16))
+        self.assertTrue('longer than' in str(context.exception))
@@ -0,0 +1,188 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.computer import Computer
+from amitayh.mano.fast import FastComputer
+from amitayh.mano.memory import BankedMemory, HashedMemory, PagedMemory
+from amitayh.mano.snapshot import REGISTERS, Snapshot, StateSet
+
+
+COUNT_TO_TEN = """
+         ORG 100
+    LOP, ISZ CNT
+         BUN LOP
+         HLT
+    CNT, DEC -10
+         END
+"""
+
+
+class TestSnapshot(TestCase):
+    def setUp(self):
+        self.computer = FastComputer(memory=PagedMemory(1024 * 4))
+        self.program_start = Assembler(COUNT_TO_TEN).load(self.computer.ram)
+
+    def tearDown(self):
+        self.computer = None
+
+    def test_restore(self):
+        self.computer.run(self.program_start, max_instructions=5)
+        snapshot = self.computer.snapshot()
+        self.computer.resume()
+        self.assertEqual(0, self.computer.ram.read(0x103))
+
+        self.computer.restore(snapshot)
+        self.assertEqual(0xFFF9, self.computer.ram.read(0x103))
+        self.assertEqual(5, self.computer.instructions)
+        self.assertEqual(1, self.computer.s.word)
+
+        self.computer.resume()
+        self.computer.restore(snapshot)
+        self.assertEqual(0xFFF9, self.computer.ram.read(0x103))
+
+    def test_fork(self):
+        self.computer.run(self.program_start, max_instructions=5)
+        fork = self.computer.fork()
+        self.assertTrue(isinstance(fork, FastComputer))
+        self.assertEqual(self.state(self.computer), self.state(fork))
+
+        fork.resume()
+        self.assertEqual(0, fork.ram.read(0x103))
+        self.assertEqual(0xFFF9, self.computer.ram.read(0x103))
+        self.assertEqual(1, self.computer.s.word)
+
+        self.computer.resume()
+        self.assertEqual(self.state(self.computer), self.state(fork))
+
+    def test_fork_flat_memory(self):
+        computer = Computer()
+        Assembler(COUNT_TO_TEN).load(computer.ram)
+        fork = computer.fork()
+        fork.ram.write(0x103, 0)
+        self.assertEqual(0xFFF6, computer.ram.read(0x103))
+
+    def test_serialize(self):
+        self.computer.run(self.program_start, max_instructions=5)
+        data = self.computer.snapshot().to_bytes()
+        snapshot = Snapshot.from_bytes(data)
+
+        computer = FastComputer()
+        computer.restore(snapshot)
+        self.assertEqual(self.state(self.computer), self.state(computer))
+
+        computer.resume()
+        self.assertEqual(0, computer.ram.read(0x103))
+
+    def test_serialized_snapshot_only_has_dirty_pages(self):
+        data = self.computer.snapshot().to_bytes()
+        self.assertTrue(len(data) < 600)
+
+    def test_serialize_flat_memory(self):
+        computer = Computer()
+        Assembler(COUNT_TO_TEN).load(computer.ram)
+        snapshot = Snapshot.from_bytes(computer.snapshot().to_bytes())
+        self.assertEqual(computer.ram.dump(), snapshot.memory.dump())
+
+    def test_save_and_load(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'state.snap')
+        try:
+            self.computer.snapshot().save(path)
+            snapshot = Snapshot.load(path)
+        finally:
+            shutil.rmtree(directory)
+
+        self.assertEqual(self.computer.ram.dump(), snapshot.memory.dump())
+
+    def test_reject_invalid_data(self):
+        self.assertRaises(ValueError, Snapshot.from_bytes, b'FOO!' + b'0' * 64)
+
+    @staticmethod
+    def state(computer):
+        registers = [getattr(computer, name).word for name in REGISTERS]
+        counters = [computer.cycles, computer.instructions]
+
+        return registers, counters, computer.ram.dump()
+
+
+class TestStateHash(TestCase):
+    def test_equal_states(self):
+        computers = [FastComputer(memory=HashedMemory(1024 * 4)),
+                     Computer(memory=PagedMemory(1024 * 4))]
+        for computer in computers:
+            computer.run(Assembler(COUNT_TO_TEN).load(computer.ram),
+                         max_instructions=6)
+
+        self.assertEqual(computers[0].state_hash(),
+                         computers[1].state_hash())
+        self.assertTrue(computers[0].same_state(computers[1]))
+
+    def test_different_states(self):
+        computer = FastComputer(memory=HashedMemory(1024 * 4))
+        computer.run(Assembler(COUNT_TO_TEN).load(computer.ram),
+                     max_instructions=6)
+        fork = computer.fork()
+        initial = computer.state_hash()
+        self.assertEqual(initial, fork.state_hash())
+
+        fork.resume(max_instructions=2)
+        self.assertNotEqual(initial, fork.state_hash())
+        self.assertFalse(computer.same_state(fork))
+
+        computer.resume(max_instructions=2)
+        self.assertTrue(computer.same_state(fork))
+
+    def test_selected_bank_is_part_of_the_state(self):
+        computer = FastComputer(memory=BankedMemory(banks=2))
+        fork = computer.fork()
+        fork.select_bank(1)
+
+        self.assertNotEqual(computer.state_hash(), fork.state_hash())
+        self.assertFalse(computer.same_state(fork))
+
+        snapshot = fork.snapshot()
+        fork.select_bank(0)
+        fork.restore(snapshot)
+        self.assertEqual(1, fork.ram.bank)
+
+    def test_same_hash_is_confirmed(self):
+        computer, other = CollidingComputer(), CollidingComputer()
+        other.ram.write(0x100, 1)
+
+        self.assertFalse(computer.same_state(other))
+
+
+class TestStateSet(TestCase):
+    def test_repeated_state(self):
+        program = """
+                 ORG 100
+            LOP, CMA
+                 BUN LOP
+                 END
+        """
+        computer = FastComputer(memory=HashedMemory(1024 * 4))
+        computer.run(Assembler(program).load(computer.ram),
+                     max_instructions=0)
+        states = StateSet()
+        while not states.add(computer):
+            computer.resume(max_instructions=1)
+
+        self.assertEqual(5, computer.instructions)
+        self.assertEqual(5, len(states))
+        self.assertEqual(0xFFFF, computer.ac.word)
+
+    def test_colliding_states(self):
+        states = StateSet()
+        computer = CollidingComputer()
+        self.assertFalse(states.add(computer))
+        computer.ac.word = 1
+        self.assertFalse(states.add(computer))
+        self.assertTrue(states.add(computer))
+        self.assertEqual(2, len(states))
+
+
+class CollidingComputer(FastComputer):
+    def state_hash(self):
+        return 0
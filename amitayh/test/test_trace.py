@@ -0,0 +1,112 @@
+import io
+from unittest import TestCase
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.computer import Computer
+from amitayh.mano.devices import InputDevice
+from amitayh.mano.fast import FastComputer
+from amitayh.mano.jit import BlockComputer
+from amitayh.mano.trace import Tracer, TraceWriter, Access, read_trace, \
+    FETCH, INDIRECT, OPERAND, WRITE
+
+
+PROGRAM = """
+         ORG 100
+         LDA PTR I
+         ISZ CNT
+         STA SUM
+         HLT
+    PTR, HEX 200
+    CNT, DEC -2
+    SUM, HEX 0
+         ORG 200
+         HEX 1234
+         END
+"""
+
+EXPECTED = [
+    Access(1, 0x100, 0xA104, FETCH),
+    Access(3, 0x104, 0x0200, INDIRECT),
+    Access(4, 0x200, 0x1234, OPERAND),
+    Access(7, 0x101, 0x6105, FETCH),
+    Access(10, 0x105, 0xFFFE, OPERAND),
+    Access(12, 0x105, 0xFFFF, WRITE),
+    Access(14, 0x102, 0x3106, FETCH),
+    Access(17, 0x106, 0x1234, WRITE),
+    Access(19, 0x103, 0x7001, FETCH)
+]
+
+
+class TestTracer(TestCase):
+    computer_class = FastComputer
+
+    def trace(self, compress=False):
+        output = io.BytesIO()
+        computer = self.computer_class()
+        tracer = Tracer(computer, output, compress)
+        computer.run(Assembler(PROGRAM).load(computer.ram))
+        tracer.close()
+        output.seek(0)
+
+        return list(read_trace(output))
+
+    def test_trace(self):
+        self.assertEqual(EXPECTED, self.trace())
+
+    def test_compressed_trace(self):
+        self.assertEqual(EXPECTED, self.trace(compress=True))
+
+
+class TestComputerTracer(TestTracer):
+    computer_class = Computer
+
+
+class TestBlockComputerTracer(TestTracer):
+    computer_class = BlockComputer
+
+
+class TestPollingTrace(TestCase):
+    program = """
+             ORG 100
+        LOP, SKI
+             BUN LOP
+             INP
+             HLT
+             END
+    """
+
+    def test_polling_loop_iterations_are_traced(self):
+        # Idle polling isn't skipped while traced, so the faster engines
+        # record every iteration, like Computer
+        traces = []
+        for computer_class in (Computer, FastComputer, BlockComputer):
+            output = io.BytesIO()
+            computer = computer_class()
+            computer.attach(InputDevice(b'x', latency=1000))
+            tracer = Tracer(computer, output)
+            computer.run(Assembler(self.program).load(computer.ram))
+            tracer.close()
+            output.seek(0)
+            traces.append(list(read_trace(output)))
+
+        self.assertEqual(traces[0], traces[1])
+        self.assertEqual(traces[0], traces[2])
+        self.assertTrue(len(traces[0]) > 200)
+
+
+class TestTraceWriter(TestCase):
+    def test_records_are_written_in_chunks(self):
+        output = io.BytesIO()
+        writer = TraceWriter(output, chunk_size=2)
+        for cycle in range(5):
+            writer.write(cycle, cycle, cycle, WRITE)
+        self.assertEqual(4, len(list(read_trace(io.BytesIO(
+            output.getvalue())))))
+
+        writer.close()
+        output.seek(0)
+        self.assertEqual(list(range(5)),
+                         [access.cycle for access in read_trace(output)])
+
+    def test_invalid_trace(self):
+        trace = io.BytesIO(b'MANO\0\0')
+        self.assertRaises(ValueError, list, read_trace(trace))
@@ -0,0 +1,54 @@
+"""
+Assembler throughput on a large generated program, with and without the
+assembled-program cache.
+
+Usage: python -m benchmarks.assembler
+"""
+from timeit import default_timer
+from amitayh.mano import assembler
+from amitayh.mano.assembler import Assembler
+
+
+def generate(lines=10000, segment_size=500):
+    """
+    Program of many ORG segments, each referring to labels defined in the
+    next one (forward references) and the previous one (backward)
+    """
+    source = []
+    segments = lines // segment_size
+    for segment in range(segments):
+        source.append('ORG %X' % (segment * segment_size % 0x1000))
+        for line in range(segment_size - 1):
+            target = (segment + (1 if line % 2 else -1)) % segments
+            source.append('L%d_%d, LDA L%d_%d I' % (
+                segment, line, target, line))
+    source.append('END')
+
+    return '\n'.join(source)
+
+
+def measure(program, cached, number=5):
+    best = None
+    for _ in range(number):
+        if not cached:
+            assembler.cache.clear()
+        start = default_timer()
+        Assembler(program).assemble()
+        elapsed = default_timer() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+
+def main():
+    program = generate()
+    lines = program.count('\n') + 1
+    for name, cached in (('cold', False), ('cached', True)):
+        seconds = measure(program, cached)
+        print('%-8s %8.2f ms  %12.0f lines/s' % (
+            name, seconds * 1e3, lines / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Run one program over many inputs, machine by machine with FastComputer and
+in lockstep with BatchComputer (requires NumPy).
+
+Usage: python -m benchmarks.batch
+"""
+from timeit import default_timer
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.batch import BatchComputer
+from amitayh.mano.fast import FastComputer
+from benchmarks.engines import ADD_16_NUMBERS
+
+
+def run_fast(assembler, inputs):
+    results = []
+    for value in inputs:
+        computer = FastComputer()
+        program_start = assembler.load(computer.ram)
+        computer.ram.write(0x200, value)
+        computer.run(program_start)
+        results.append(computer.ac.word)
+
+    return results
+
+
+def run_batch(assembler, inputs):
+    computer = BatchComputer(len(inputs))
+    program_start = computer.load(assembler)
+    computer.write(0x200, inputs)
+
+    return list(computer.run(program_start).ac)
+
+
+def main(n=1000):
+    assembler = Assembler(ADD_16_NUMBERS)
+    inputs = list(range(n))
+    runners = (('FastComputer', run_fast), ('BatchComputer', run_batch))
+    for name, run in runners:
+        start = default_timer()
+        run(assembler, inputs)
+        elapsed = default_timer() - start
+        print('%-14s %6d machines %8.1f ms %10.0f machines/s' % (
+            name, n, elapsed * 1e3, n / elapsed))
+
+
+if __name__ == '__main__':
+    main()
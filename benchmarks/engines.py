@@ -0,0 +1,129 @@
+"""
+Compare the cycle-accurate Computer and TableComputer against the
+instruction-level FastComputer and the block-translating BlockComputer on
+the programs used by the test suite.
+
+Usage: python -m benchmarks.engines
+"""
+from timeit import default_timer
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.computer import Computer
+from amitayh.mano.control import TableComputer
+from amitayh.mano.fast import FastComputer
+from amitayh.mano.jit import BlockComputer
+
+
+ADD_16_NUMBERS = """
+         ORG 100
+         CLA
+    LOP, ADD PTR I
+         ISZ PTR
+         ISZ CNT
+         BUN LOP
+         STA SUM
+         HLT
+    SUM, HEX 0
+    PTR, HEX 200
+    CNT, DEC -16
+
+         ORG 200
+         HEX 10
+         HEX 20
+         HEX 30
+         HEX 40
+         HEX 50
+         HEX 60
+         HEX 70
+         HEX 80
+         HEX 90
+         HEX A0
+         HEX B0
+         HEX C0
+         HEX D0
+         HEX E0
+         HEX F0
+         HEX 100
+         END
+"""
+
+CALL_FUNCTION = """
+          ORG 10
+          BSA FUNC
+          DEC 5
+          HEX 40
+    SUM,  HEX 0
+          LDA SUM
+          HLT
+
+    PTR,  HEX 0
+    CNT,  HEX 0
+    FUNC, HEX 0
+          LDA FUNC I
+          CMA
+          INC
+          STA CNT
+          ISZ FUNC
+          LDA FUNC I
+          STA PTR
+          CLA
+    LOOP, ADD PTR I
+          ISZ PTR
+          ISZ CNT
+          BUN LOOP
+          ISZ FUNC
+          STA FUNC I
+          ISZ FUNC
+          BUN FUNC I
+
+          ORG 40
+    DATA, DEC 1
+          DEC 2
+          DEC 4
+          DEC 8
+          DEC 16
+          END
+"""
+
+PROGRAMS = (
+    ('add_16_numbers', ADD_16_NUMBERS),
+    ('call_function', CALL_FUNCTION)
+)
+
+ENGINES = (
+    ('Computer', Computer),
+    ('TableComputer', TableComputer),
+    ('FastComputer', FastComputer),
+    ('BlockComputer', BlockComputer)
+)
+
+
+def benchmark(engine, program, number=500):
+    """
+    Best time of a single run, excluding machine setup and assembly
+    """
+    assembler = Assembler(program)
+    best = None
+    for _ in range(number):
+        computer = engine()
+        program_start = assembler.load(computer.ram)
+        start = default_timer()
+        computer.run(program_start)
+        elapsed = default_timer() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+
+def main():
+    for name, program in PROGRAMS:
+        baseline = None
+        for engine_name, engine in ENGINES:
+            seconds = benchmark(engine, program)
+            baseline = baseline or seconds
+            print('%-16s %-14s %9.1f us/run  %5.2fx' % (
+                name, engine_name, seconds * 1e6, baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Cost of forking a machine, in time and memory per fork, with flat and
+copy-on-write paged memory.
+
+Usage: python -m benchmarks.fork
+"""
+import tracemalloc
+from timeit import default_timer
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.fast import FastComputer
+from amitayh.mano.memory import Memory, PagedMemory
+from benchmarks.engines import ADD_16_NUMBERS
+
+SIZES = (1024 * 4, 1024 * 64)
+
+MEMORIES = (
+    ('Memory', Memory),
+    ('PagedMemory', PagedMemory)
+)
+
+
+def measure(memory, forks=1000):
+    computer = FastComputer(memory=memory)
+    computer.run(Assembler(ADD_16_NUMBERS).load(computer.ram))
+
+    start = default_timer()
+    children = [computer.fork() for _ in range(forks)]
+    elapsed = default_timer() - start
+    del children
+
+    tracemalloc.start()
+    children = [computer.fork() for _ in range(forks)]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Touch one word per fork to show the cost of the first write
+    start = default_timer()
+    for child in children:
+        child.ram.write(0x200, 0)
+    write = default_timer() - start
+
+    return elapsed / forks, allocated / forks, write / forks
+
+
+def main():
+    for size in SIZES:
+        for name, memory_class in MEMORIES:
+            fork, allocated, write = measure(memory_class(size))
+            print('%3dK %-12s fork %7.1f us %9.0f bytes  first write '
+                  '%5.1f us' % (size // 1024, name, fork * 1e6, allocated,
+                                write * 1e6))
+
+
+if __name__ == '__main__':
+    main()
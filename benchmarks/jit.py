@@ -0,0 +1,58 @@
+"""
+Throughput of the block-translating BlockComputer against FastComputer on
+a long-running loop, in blocks and instructions per second.
+
+Usage: python -m benchmarks.jit
+"""
+from timeit import default_timer
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.fast import FastComputer
+from amitayh.mano.jit import BlockComputer
+
+# Sums 1..N over and over, 2^16 times
+SUM_LOOP = """
+         ORG 100
+    OUT, CLA
+         STA SUM
+         LDA N
+         STA CNT
+    LOP, LDA SUM
+         ADD CNT
+         STA SUM
+         ISZ CNT
+         BUN LOP
+         ISZ RPT
+         BUN OUT
+         HLT
+    SUM, HEX 0
+    CNT, HEX 0
+    N,   DEC -100
+    RPT, HEX 0
+         END
+"""
+
+
+def measure(engine, max_instructions=2000000):
+    computer = engine()
+    program_start = Assembler(SUM_LOOP).load(computer.ram)
+    start = default_timer()
+    result = computer.run(program_start, max_instructions=max_instructions)
+    elapsed = default_timer() - start
+
+    return result, elapsed, getattr(computer, 'blocks_executed', None)
+
+
+def main():
+    baseline = None
+    for engine in (FastComputer, BlockComputer):
+        result, seconds, blocks = measure(engine)
+        baseline = baseline or seconds
+        line = '%-14s %12.0f instructions/s' % (
+            engine.__name__, result.instructions / seconds)
+        if blocks is not None:
+            line += '  %10.0f blocks/s' % (blocks / seconds)
+        print('%s  %5.2fx' % (line, baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
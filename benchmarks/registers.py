@@ -0,0 +1,32 @@
+"""
+Micro-benchmarks of the Register operations used by the engines.
+
+Usage: python -m benchmarks.registers
+"""
+from timeit import repeat
+
+
+SETUP = """
+from amitayh.mano.computer import Register
+register = Register(16)
+register.word = 0x8421
+"""
+
+OPERATIONS = (
+    ('increment', 'register.increment()'),
+    ('add', 'register.add(0x1234)'),
+    ('shift_left', 'register.shift_left(1)'),
+    ('shift_right', 'register.shift_right(1)'),
+    ('word read', 'register.word'),
+    ('word write', 'register.word = 0x1234')
+)
+
+
+def main(number=1000000):
+    for name, statement in OPERATIONS:
+        seconds = min(repeat(statement, SETUP, number=number, repeat=5))
+        print('%-12s %6.1f ns' % (name, seconds / number * 1e9))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Load test of the emulation service: clients submit small programs
+concurrently to a local service and the latency of every request is
+measured, against starting a fresh interpreter per program.
+
+Usage: python -m benchmarks.service [-w WORKERS] [-c CLIENTS] [-n REQUESTS]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from timeit import default_timer
+from amitayh.mano.service import Service, Client
+from benchmarks.engines import ADD_16_NUMBERS
+from benchmarks.workloads import MULTIPLY
+
+PROGRAMS = (ADD_16_NUMBERS, MULTIPLY)
+
+
+def percentile(times, fraction):
+    return times[min(int(len(times) * fraction), len(times) - 1)]
+
+
+def report(name, times, seconds):
+    times = sorted(times)
+    print('%-8s %6d requests %8.1f req/s  p50 %7.2f ms  p90 %7.2f ms  '
+          'p99 %7.2f ms' % (
+              name, len(times), len(times) / seconds,
+              percentile(times, 0.5) * 1e3, percentile(times, 0.9) * 1e3,
+              percentile(times, 0.99) * 1e3))
+
+
+async def load(path, clients, requests):
+    times = []
+
+    async def client_session(index):
+        client = await Client.connect(path=path)
+        try:
+            for request in range(requests):
+                program = PROGRAMS[(index + request) % len(PROGRAMS)]
+                start = default_timer()
+                output, result = await client.run(source=program)
+                times.append(default_timer() - start)
+                assert result['type'] == 'result', result
+        finally:
+            await client.close()
+
+    start = default_timer()
+    await asyncio.gather(*(client_session(index)
+                           for index in range(clients)))
+
+    return times, default_timer() - start
+
+
+async def warm(workers, clients, requests):
+    service = Service(workers)
+    await service.start()
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'mano.sock')
+    await service.listen(path=path)
+    try:
+        # One round first, so the workers have imported everything
+        await load(path, service.size, 1)
+        return await load(path, clients, requests)
+    finally:
+        await service.close()
+        os.remove(path)
+        os.rmdir(directory)
+
+
+def cold(requests):
+    """
+    A fresh worker process per program
+    """
+    times = []
+    start = default_timer()
+    for request in range(requests):
+        program = PROGRAMS[request % len(PROGRAMS)]
+        line = json.dumps({'id': request, 'source': program}) + '\n'
+        request_start = default_timer()
+        subprocess.run([sys.executable, '-m', 'amitayh.mano.service',
+                        '--worker'], input=line.encode('utf-8'),
+                       stdout=subprocess.PIPE, check=True)
+        times.append(default_timer() - request_start)
+
+    return times, default_timer() - start
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Load test of the emulation service')
+    parser.add_argument('-w', '--workers', type=int, default=None)
+    parser.add_argument('-c', '--clients', type=int, default=16)
+    parser.add_argument('-n', '--requests', type=int, default=50,
+                        help='requests per client')
+    parser.add_argument('--cold', type=int, default=20,
+                        help='programs run in fresh processes')
+    args = parser.parse_args(args)
+
+    times, seconds = asyncio.run(
+        warm(args.workers, args.clients, args.requests))
+    report('warm', times, seconds)
+    if args.cold:
+        report('cold', *cold(args.cold))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Time to get a 4K-word program into memory: assembling the source (with an
+empty cache) against loading its object file.
+
+Usage: python -m benchmarks.startup
+"""
+from timeit import default_timer
+from amitayh.mano import assembler
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.memory import Memory
+from amitayh.mano.objfile import ObjectFile
+from benchmarks.assembler import generate
+
+
+def best(function, number=20):
+    times = []
+    for _ in range(number):
+        start = default_timer()
+        function()
+        times.append(default_timer() - start)
+
+    return min(times)
+
+
+def main():
+    program = generate(lines=1024 * 4, segment_size=1024)
+    data = Assembler(program).object_file().to_bytes()
+
+    def from_source():
+        assembler.cache.clear()
+        Assembler(program).load(Memory(1024 * 4))
+
+    def from_object_file():
+        ObjectFile.from_bytes(data).load(Memory(1024 * 4))
+
+    for name, function in (('source', from_source),
+                           ('object file', from_object_file)):
+        print('%-12s %9.1f us' % (name, best(function) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
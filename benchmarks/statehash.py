@@ -0,0 +1,68 @@
+"""
+Cost of keeping an incremental state hash: the workloads run with a plain
+Memory against a HashedMemory, then comparing two machines by state_hash()
+against comparing them in full.
+
+Usage: python -m benchmarks.statehash
+"""
+from timeit import default_timer
+from amitayh.mano.fast import FastComputer
+from amitayh.mano.jit import BlockComputer
+from amitayh.mano.memory import Memory, HashedMemory
+from benchmarks.workloads import WORKLOADS
+
+
+def run_time(engine, memory_class, workload):
+    """
+    Seconds to run a workload (all its runs), excluding setup
+    """
+    seconds = 0
+    for _ in range(workload.runs):
+        computer = workload.prepare(
+            lambda: engine(memory=memory_class(1024 * 4)))
+        start = default_timer()
+        computer.run(workload.start)
+        seconds += default_timer() - start
+
+    return seconds
+
+
+def best(function, number=1000):
+    times = []
+    for _ in range(number):
+        start = default_timer()
+        function()
+        times.append(default_timer() - start)
+
+    return min(times)
+
+
+def main():
+    for engine in (FastComputer, BlockComputer):
+        for workload in WORKLOADS:
+            plain = run_time(engine, Memory, workload)
+            hashed = run_time(engine, HashedMemory, workload)
+            print('%-14s %-16s %9.1f ms plain  %9.1f ms hashed  %+6.1f%%' % (
+                engine.__name__, workload.name, plain * 1e3, hashed * 1e3,
+                (hashed / plain - 1) * 100))
+
+    computers = []
+    for _ in range(2):
+        computer = FastComputer(memory=HashedMemory(1024 * 4))
+        computer.ram.write_block(0, range(1024 * 4))
+        computers.append(computer)
+
+    def compare_in_full():
+        first, second = computers
+        return (first.snapshot().registers == second.snapshot().registers
+                and first.ram.dump() == second.ram.dump())
+
+    hashed = best(lambda: computers[0].state_hash() ==
+                  computers[1].state_hash())
+    full = best(compare_in_full)
+    print('compare by hash   %9.2f us' % (hashed * 1e6))
+    print('compare in full   %9.2f us  %5.2fx' % (full * 1e6, full / hashed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+Benchmark suite: every workload on every engine, plus the assembler on a
+10K-line source. Reports cycles/s, instructions/s, lines/s and peak memory
+(traced in a separate, untimed run), optionally as JSON for comparing
+runs over time.
+
+Usage: python -m benchmarks.suite [-r REPEAT] [-w WORKLOAD] [-e ENGINE]
+                                  [--json PATH] [--compare PATH]
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from timeit import default_timer
+from amitayh.mano import assembler
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.computer import Computer
+from amitayh.mano.control import TableComputer
+from amitayh.mano.fast import FastComputer
+from amitayh.mano.jit import BlockComputer
+from benchmarks.workloads import WORKLOADS, ASSEMBLER_SOURCE
+
+ENGINES = (
+    ('Computer', Computer),
+    ('TableComputer', TableComputer),
+    ('FastComputer', FastComputer),
+    ('BlockComputer', BlockComputer)
+)
+
+
+def run_workload(engine, workload):
+    """
+    Run a workload once (all its runs), return (seconds, cycles,
+    instructions), timing only the runs themselves
+    """
+    seconds = cycles = instructions = 0
+    for _ in range(workload.runs):
+        computer = workload.prepare(engine)
+        start = default_timer()
+        result = computer.run(workload.start)
+        seconds += default_timer() - start
+        cycles += result.cycles
+        instructions += result.instructions
+
+    return seconds, cycles, instructions
+
+
+def peak_memory(function, *args):
+    """
+    Peak bytes allocated while calling function
+    """
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure_engine(name, engine, workload, repeat):
+    seconds, cycles, instructions = min(
+        run_workload(engine, workload) for _ in range(repeat))
+
+    return {
+        'workload': workload.name,
+        'engine': name,
+        'seconds': seconds,
+        'cycles': cycles,
+        'instructions': instructions,
+        'cycles_per_second': cycles / seconds,
+        'instructions_per_second': instructions / seconds,
+        'peak_memory': peak_memory(run_workload, engine, workload)
+    }
+
+
+def assemble_cold():
+    assembler.cache.clear()
+    Assembler(ASSEMBLER_SOURCE).assemble()
+
+
+def measure_assembler(repeat):
+    times = []
+    for _ in range(repeat):
+        start = default_timer()
+        assemble_cold()
+        times.append(default_timer() - start)
+    seconds = min(times)
+    lines = ASSEMBLER_SOURCE.count('\n') + 1
+
+    return {
+        'workload': 'assembler',
+        'engine': 'Assembler',
+        'seconds': seconds,
+        'lines': lines,
+        'lines_per_second': lines / seconds,
+        'peak_memory': peak_memory(assemble_cold)
+    }
+
+
+def rate(result):
+    if 'lines_per_second' in result:
+        return result['lines_per_second']
+
+    return result['cycles_per_second']
+
+
+def report(results, baseline=None):
+    previous = {}
+    for result in baseline or ():
+        previous[(result['workload'], result['engine'])] = result
+
+    for result in results:
+        if 'lines' in result:
+            line = '%-16s %-14s %12.0f lines/s  %31s' % (
+                result['workload'], result['engine'],
+                result['lines_per_second'], '')
+        else:
+            line = '%-16s %-14s %12.0f cycles/s %12.0f instructions/s' % (
+                result['workload'], result['engine'],
+                result['cycles_per_second'],
+                result['instructions_per_second'])
+        line += ' %8.1f KB' % (result['peak_memory'] / 1024.0)
+        old = previous.get((result['workload'], result['engine']))
+        if old is not None:
+            line += '  %5.2fx' % (rate(result) / rate(old))
+        print(line)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Run the benchmark suite')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='report the best of this many runs')
+    parser.add_argument('-w', '--workload', action='append',
+                        help='run only these workloads (and "assembler")')
+    parser.add_argument('-e', '--engine', action='append',
+                        help='run only these engines')
+    parser.add_argument('--json', metavar='PATH',
+                        help='write the results as JSON')
+    parser.add_argument('--compare', metavar='PATH',
+                        help='show speedups against an earlier JSON report')
+    args = parser.parse_args(args)
+
+    results = []
+    for workload in WORKLOADS:
+        if args.workload and workload.name not in args.workload:
+            continue
+        for name, engine in ENGINES:
+            if args.engine and name not in args.engine:
+                continue
+            results.append(
+                measure_engine(name, engine, workload, args.repeat))
+    if not args.workload or 'assembler' in args.workload:
+        results.append(measure_assembler(args.repeat))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as previous:
+            baseline = json.load(previous)['results']
+    report(results, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump({
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'results': results
+            }, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
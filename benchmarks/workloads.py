@@ -0,0 +1,157 @@
+"""
+Canonical Mano programs used by the benchmark suite. Each one loops enough
+to be measured, and all inputs are fixed so runs are reproducible.
+"""
+from amitayh.mano.assembler import Assembler
+from amitayh.mano.devices import InputDevice
+from benchmarks.assembler import generate
+from benchmarks.engines import ADD_16_NUMBERS
+
+# Multiply X by Y (shift-and-add), 200 times
+MULTIPLY = """
+         ORG 100
+    RPT, LDA X0
+         STA X
+         LDA Y0
+         STA Y
+         CLA
+         STA P
+         LDA M8
+         STA CTR
+    LOP, CLE
+         LDA Y
+         CIR
+         STA Y
+         SZE
+         BUN ONE
+         BUN ZRO
+    ONE, LDA X
+         ADD P
+         STA P
+         CLE
+    ZRO, LDA X
+         CIL
+         STA X
+         ISZ CTR
+         BUN LOP
+         ISZ CNT
+         BUN RPT
+         HLT
+    CTR, HEX 0
+    M8,  DEC -8
+    X0,  HEX F
+    Y0,  HEX B
+    X,   HEX 0
+    Y,   HEX 0
+    P,   HEX 0
+    CNT, DEC -200
+         END
+"""
+
+# Two levels of BSA calls, 6000 calls in all
+SUBROUTINES = """
+         ORG 100
+    LOP, BSA TWO
+         BSA TWO
+         ISZ CNT
+         BUN LOP
+         HLT
+    TWO, HEX 0
+         BSA ONE
+         BSA ONE
+         BUN TWO I
+    ONE, HEX 0
+         LDA SUM
+         INC
+         STA SUM
+         BUN ONE I
+    SUM, HEX 0
+    CNT, DEC -1000
+         END
+"""
+
+# Patches an instruction in the loop body twice per iteration
+SELF_MODIFYING = """
+         ORG 100
+    LOP, LDA NEW
+         STA PAT
+    PAT, CLA
+         LDA OLD
+         STA PAT
+         ISZ CNT
+         BUN LOP
+         HLT
+    NEW, ISZ SUM
+    OLD, CLA
+    SUM, HEX 0
+    CNT, DEC -2000
+         END
+"""
+
+# Sums characters from an input device in an interrupt handler, while the
+# main loop keeps counting
+INTERRUPT_IO = """
+         ORG 0
+    ZRO, HEX 0
+         BUN SRV
+
+         ORG 100
+         ION
+    LOP, ISZ WRK
+         BUN LOP
+         BUN LOP
+
+    SRV, STA SAC
+         CLA
+         INP
+         SZA
+         BUN ACC
+         HLT
+    ACC, ADD SUM
+         STA SUM
+         LDA SAC
+         ION
+         BUN ZRO I
+    SAC, HEX 0
+    SUM, HEX 0
+    WRK, HEX 0
+         END
+"""
+
+INTERRUPT_INPUT = b'\x01' * 1000 + b'\x00'
+
+
+class Workload(object):
+    """
+    A program and how to set up a machine to run it. Short programs are
+    run `runs` times on fresh machines.
+    """
+    def __init__(self, name, source, start=0x100, runs=1, input_data=None,
+                 latency=0):
+        self.name = name
+        self.source = source
+        self.start = start
+        self.runs = runs
+        self.input_data = input_data
+        self.latency = latency
+
+    def prepare(self, engine):
+        computer = engine()
+        Assembler(self.source).load(computer.ram)
+        if self.input_data is not None:
+            computer.attach(InputDevice(self.input_data, self.latency))
+
+        return computer
+
+
+WORKLOADS = (
+    Workload('add_16_numbers', ADD_16_NUMBERS, runs=100),
+    Workload('multiply', MULTIPLY),
+    Workload('subroutines', SUBROUTINES),
+    Workload('self_modifying', SELF_MODIFYING),
+    Workload('interrupt_io', INTERRUPT_IO, input_data=INTERRUPT_INPUT,
+             latency=50)
+)
+
+# Source of the assembler workload
+ASSEMBLER_SOURCE = generate(lines=10000)